@@ -0,0 +1,73 @@
+"""
+Batch squad optimization on a process pool.
+
+Solver runs are CPU-bound and hold a worker for up to their time limit,
+so batches run in a bounded pool of worker processes instead of the
+API's threads. The parent serializes each prediction set once per data
+version; workers unpickle it and build its SquadModel on first use, then
+keep the model (an LRU per worker) so later configs on the same set only
+re-solve. Workers are spawned, not forked: the API process has threads
+and open SQLite connections.
+"""
+
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from optimizer import OptimizedSquad, SquadConstraints, SquadModel
+from predictor import PredictionTable
+from solver import SolverConfig
+
+MAX_WORKERS = int(os.environ.get("OPTIMIZE_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_MODELS = 8  # SquadModels kept per worker
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_models: OrderedDict = OrderedDict()  # worker side: (token, max_per_club) -> SquadModel
+
+
+def serialize(table: PredictionTable) -> bytes:
+    return pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def submit(token, payload: bytes, max_per_club: int, risk_profile: str, budget: float,
+           config: SolverConfig) -> Future:
+    """
+    Queue one solve. token identifies the prediction set behind payload (its
+    serialize() bytes): equal tokens must mean equal data.
+    """
+    return _executor().submit(_solve, token, payload, max_per_club, risk_profile, budget, config)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _solve(token, payload: bytes, max_per_club: int, risk_profile: str, budget: float,
+           config: SolverConfig) -> OptimizedSquad | None:
+    """Worker side: solve on the cached model for this prediction set and club limit."""
+    key = (token, max_per_club)
+    model = _models.get(key)
+    if model is None:
+        model = SquadModel(pickle.loads(payload), SquadConstraints(max_per_club=max_per_club))
+        _models[key] = model
+        if len(_models) > MAX_MODELS:
+            _models.popitem(last=False)
+    else:
+        _models.move_to_end(key)
+    return model.solve(risk_profile, budget, config)
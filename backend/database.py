@@ -1,190 +1,369 @@
 """
 Database layer - SQLite for MVP.
+
+Connections are pooled per thread: each worker thread keeps one read-write
+and one read-only connection open and reuses them across requests, instead
+of paying connect/close on every db_session(). Every connection is put in
+WAL mode so readers never block behind a UEFA import that is writing.
 """
 
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
 
 DB_PATH = os.environ.get("DB_PATH", "/app/data/fantasy.db")
 
+# Per-connection tuning, applied once when a pooled connection is opened
+CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-20000"))  # negative = KiB (~20 MB)
+MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is safe with WAL
+BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+_local = threading.local()
+_all_conns = []  # every pooled connection, so close_all() can reach other threads' too
+_all_lock = threading.Lock()
+
+
+class _PooledConn:
+    """A pooled connection plus its session nesting depth."""
+    __slots__ = ("conn", "depth")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 0
+
+
+def connect(db_path=None, readonly=False, check_same_thread=True):
+    """Open a new configured connection (WAL, pragmas, Row factory).
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+    Used by the pool and by standalone scripts (import, fetch results)
+    that manage their own connection lifetime.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {CACHE_SIZE}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
 
+def _pooled(readonly=False) -> _PooledConn:
+    """Get (or lazily open) this thread's connection for DB_PATH."""
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+    key = (DB_PATH, readonly)
+    pc = pool.get(key)
+    if pc is None:
+        # Only the owning thread uses it; check_same_thread=False just lets
+        # close_all() close it from the shutdown thread.
+        pc = pool[key] = _PooledConn(connect(DB_PATH, readonly, check_same_thread=False))
+        with _all_lock:
+            _all_conns.append(pc.conn)
+    return pc
+
+
+def get_db(readonly=False):
+    """This thread's pooled connection. Do not close it; use db_session()."""
+    return _pooled(readonly).conn
+
+
 @contextmanager
-def db_session():
-    conn = get_db()
+def db_session(readonly=False):
+    """Transaction scope on this thread's pooled connection.
+
+    Nested sessions share the connection; only the outermost read-write
+    session commits. An exception rolls the whole transaction back.
+    Read-only sessions run on a separate query_only connection.
+    """
+    pc = _pooled(readonly)
+    conn = pc.conn
+    pc.depth += 1
     try:
         yield conn
-        conn.commit()
+        if pc.depth == 1 and conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if pc.depth == 1 and conn.in_transaction:
+            conn.rollback()
+        raise
     finally:
+        pc.depth -= 1
+
+
+def close_all():
+    """Close every pooled connection (app shutdown)."""
+    with _all_lock:
+        conns = list(_all_conns)
+        _all_conns.clear()
+    for conn in conns:
         conn.close()
+    _local.pool = {}
+
+
+# ─── Schema migrations ───
+#
+# schema_version is the single source of schema truth: each migration runs
+# once, in order, inside its own transaction, and records its version.
+# Once the database is current, init_db() does no DDL at all.
+# Append new migrations to MIGRATIONS; never edit one that has shipped.
+
+_INITIAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS players (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uefa_id TEXT UNIQUE,
+        name TEXT NOT NULL,
+        club TEXT NOT NULL,
+        club_code TEXT,
+        position TEXT NOT NULL CHECK(position IN ('GK','DEF','MID','FWD')),
+        price REAL NOT NULL DEFAULT 0,
+        is_starter INTEGER DEFAULT 1,
+        is_set_piece_taker INTEGER DEFAULT 0,
+        injury_status TEXT DEFAULT 'fit',
+        total_points INTEGER DEFAULT 0,
+        avg_points REAL DEFAULT 0,
+        goals INTEGER DEFAULT 0,
+        assists INTEGER DEFAULT 0,
+        clean_sheets INTEGER DEFAULT 0,
+        minutes_played INTEGER DEFAULT 0,
+        balls_recovered INTEGER DEFAULT 0,
+        selection_pct REAL DEFAULT 0,
+        form_rating REAL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS matchdays (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        stage TEXT NOT NULL DEFAULT 'league_phase',
+        deadline TEXT,
+        is_active INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS fixtures (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        matchday_id INTEGER REFERENCES matchdays(id),
+        home_club TEXT NOT NULL,
+        home_code TEXT,
+        away_club TEXT NOT NULL,
+        away_code TEXT,
+        home_strength REAL DEFAULT 0.5,
+        away_strength REAL DEFAULT 0.5,
+        match_date TEXT,
+        kick_off TEXT,
+        status TEXT DEFAULT 'scheduled',
+        home_score INTEGER,
+        away_score INTEGER,
+        result TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS match_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER REFERENCES players(id),
+        matchday_id INTEGER REFERENCES matchdays(id),
+        fixture_id INTEGER REFERENCES fixtures(id),
+        minutes INTEGER DEFAULT 0,
+        goals INTEGER DEFAULT 0,
+        goals_outside_box INTEGER DEFAULT 0,
+        assists INTEGER DEFAULT 0,
+        balls_recovered INTEGER DEFAULT 0,
+        player_of_match INTEGER DEFAULT 0,
+        penalty_won INTEGER DEFAULT 0,
+        penalty_conceded INTEGER DEFAULT 0,
+        penalty_missed INTEGER DEFAULT 0,
+        penalty_saved INTEGER DEFAULT 0,
+        yellow_card INTEGER DEFAULT 0,
+        red_card INTEGER DEFAULT 0,
+        own_goal INTEGER DEFAULT 0,
+        saves INTEGER DEFAULT 0,
+        goals_conceded INTEGER DEFAULT 0,
+        clean_sheet INTEGER DEFAULT 0,
+        fantasy_points INTEGER DEFAULT 0,
+        UNIQUE(player_id, matchday_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS my_squad (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER REFERENCES players(id),
+        is_captain INTEGER DEFAULT 0,
+        is_vice_captain INTEGER DEFAULT 0,
+        is_starting INTEGER DEFAULT 1,
+        added_matchday INTEGER REFERENCES matchdays(id),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(player_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS transfers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        matchday_id INTEGER REFERENCES matchdays(id),
+        player_in_id INTEGER REFERENCES players(id),
+        player_out_id INTEGER REFERENCES players(id),
+        is_free INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS boosters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        used_matchday_id INTEGER,
+        is_available INTEGER DEFAULT 1
+    );
+
+    CREATE TABLE IF NOT EXISTS player_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER REFERENCES players(id),
+        matchday_id INTEGER REFERENCES matchdays(id),
+        total_points_before INTEGER DEFAULT 0,
+        total_points_after INTEGER,
+        matchday_points INTEGER,
+        UNIQUE(player_id, matchday_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER REFERENCES players(id),
+        matchday_id INTEGER REFERENCES matchdays(id),
+        price REAL,
+        total_points INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(player_id, matchday_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS squads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        matchday_id INTEGER REFERENCES matchdays(id),
+        profile TEXT DEFAULT 'balanced',
+        squad_json TEXT,
+        total_expected REAL,
+        total_cost REAL,
+        actual_points INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def _seed_boosters(conn):
+    if conn.execute("SELECT COUNT(*) FROM boosters").fetchone()[0] == 0:
+        conn.execute("INSERT INTO boosters (name) VALUES ('wildcard')")
+        conn.execute("INSERT INTO boosters (name) VALUES ('limitless')")
+
+
+def _add_fixture_live_columns(conn):
+    """DBs created before live results tracking lack these fixture columns."""
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(fixtures)")}
+    for col, decl in [
+        ("kick_off", "TEXT"),
+        ("status", "TEXT DEFAULT 'scheduled'"),
+        ("home_score", "INTEGER"),
+        ("away_score", "INTEGER"),
+    ]:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE fixtures ADD COLUMN {col} {decl}")
+
+
+# Indexes for the hot query patterns in main.py. UNIQUE constraints already
+# give (player_id, matchday_id) lookups and players.uefa_id; these cover the rest.
+_HOT_PATH_INDEXES = [
+    # get_predictions / archive / calendar: fixtures of one matchday
+    "CREATE INDEX IF NOT EXISTS idx_fixtures_matchday ON fixtures(matchday_id)",
+    # form window: WHERE player_id=? ORDER BY matchday_id DESC, covering the selected columns
+    "CREATE INDEX IF NOT EXISTS idx_match_stats_player_form "
+    "ON match_stats(player_id, matchday_id, fantasy_points, minutes)",
+    "CREATE INDEX IF NOT EXISTS idx_match_stats_matchday ON match_stats(matchday_id)",
+    # stats CSV import / rebuild-squad look players up by name
+    "CREATE INDEX IF NOT EXISTS idx_players_name ON players(name)",
+    "CREATE INDEX IF NOT EXISTS idx_players_club ON players(club)",
+    # archive top performers: WHERE matchday_id=? ORDER BY matchday_points DESC
+    "CREATE INDEX IF NOT EXISTS idx_snapshots_matchday_points "
+    "ON player_snapshots(matchday_id, matchday_points)",
+    # price changes: latest matchdays + per-matchday join
+    "CREATE INDEX IF NOT EXISTS idx_price_history_matchday "
+    "ON price_history(matchday_id, player_id, price)",
+    "CREATE INDEX IF NOT EXISTS idx_transfers_matchday ON transfers(matchday_id)",
+]
+
+def _add_matchday_season(conn):
+    """Season a matchday's stats are scored under (NULL = from its deadline, else the latest rules)."""
+    existing = {r["name"] for r in conn.execute("PRAGMA table_info(matchdays)")}
+    if "season" not in existing:
+        conn.execute("ALTER TABLE matchdays ADD COLUMN season TEXT")
+
+
+# (version, description, steps) — a step is an SQL string or a callable(conn)
+MIGRATIONS = [
+    (1, "initial schema", [_INITIAL_SCHEMA, _seed_boosters]),
+    (2, "fixture live-result columns", [_add_fixture_live_columns]),
+    (3, "hot-path indexes", _HOT_PATH_INDEXES),
+    (4, "matchday season", [_add_matchday_season]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    """Current schema version (0 for a fresh or pre-migrations database)."""
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not has_table:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations on conn. Returns the resulting schema version."""
+    current = schema_version(conn)
+    if current >= LATEST_VERSION:
+        return current
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for version, description, steps in MIGRATIONS:
+        # BEGIN IMMEDIATE takes the write lock, so re-check under it
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    for stmt in step.split(";"):
+                        if stmt.strip():
+                            conn.execute(stmt)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        print(f"Applied migration {version}: {description}")
+    return LATEST_VERSION
 
 
 def init_db():
     with db_session() as conn:
-        conn.executescript("""
-        CREATE TABLE IF NOT EXISTS players (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            uefa_id TEXT UNIQUE,
-            name TEXT NOT NULL,
-            club TEXT NOT NULL,
-            club_code TEXT,
-            position TEXT NOT NULL CHECK(position IN ('GK','DEF','MID','FWD')),
-            price REAL NOT NULL DEFAULT 0,
-            is_starter INTEGER DEFAULT 1,
-            is_set_piece_taker INTEGER DEFAULT 0,
-            injury_status TEXT DEFAULT 'fit',
-            total_points INTEGER DEFAULT 0,
-            avg_points REAL DEFAULT 0,
-            goals INTEGER DEFAULT 0,
-            assists INTEGER DEFAULT 0,
-            clean_sheets INTEGER DEFAULT 0,
-            minutes_played INTEGER DEFAULT 0,
-            balls_recovered INTEGER DEFAULT 0,
-            selection_pct REAL DEFAULT 0,
-            form_rating REAL DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS matchdays (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            stage TEXT NOT NULL DEFAULT 'league_phase',
-            deadline TEXT,
-            is_active INTEGER DEFAULT 0
-        );
-
-        CREATE TABLE IF NOT EXISTS fixtures (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            matchday_id INTEGER REFERENCES matchdays(id),
-            home_club TEXT NOT NULL,
-            home_code TEXT,
-            away_club TEXT NOT NULL,
-            away_code TEXT,
-            home_strength REAL DEFAULT 0.5,
-            away_strength REAL DEFAULT 0.5,
-            match_date TEXT,
-            kick_off TEXT,
-            status TEXT DEFAULT 'scheduled',
-            home_score INTEGER,
-            away_score INTEGER,
-            result TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS match_stats (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id INTEGER REFERENCES players(id),
-            matchday_id INTEGER REFERENCES matchdays(id),
-            fixture_id INTEGER REFERENCES fixtures(id),
-            minutes INTEGER DEFAULT 0,
-            goals INTEGER DEFAULT 0,
-            goals_outside_box INTEGER DEFAULT 0,
-            assists INTEGER DEFAULT 0,
-            balls_recovered INTEGER DEFAULT 0,
-            player_of_match INTEGER DEFAULT 0,
-            penalty_won INTEGER DEFAULT 0,
-            penalty_conceded INTEGER DEFAULT 0,
-            penalty_missed INTEGER DEFAULT 0,
-            penalty_saved INTEGER DEFAULT 0,
-            yellow_card INTEGER DEFAULT 0,
-            red_card INTEGER DEFAULT 0,
-            own_goal INTEGER DEFAULT 0,
-            saves INTEGER DEFAULT 0,
-            goals_conceded INTEGER DEFAULT 0,
-            clean_sheet INTEGER DEFAULT 0,
-            fantasy_points INTEGER DEFAULT 0,
-            UNIQUE(player_id, matchday_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS my_squad (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id INTEGER REFERENCES players(id),
-            is_captain INTEGER DEFAULT 0,
-            is_vice_captain INTEGER DEFAULT 0,
-            is_starting INTEGER DEFAULT 1,
-            added_matchday INTEGER REFERENCES matchdays(id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(player_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS transfers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            matchday_id INTEGER REFERENCES matchdays(id),
-            player_in_id INTEGER REFERENCES players(id),
-            player_out_id INTEGER REFERENCES players(id),
-            is_free INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS boosters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            used_matchday_id INTEGER,
-            is_available INTEGER DEFAULT 1
-        );
-
-        CREATE TABLE IF NOT EXISTS player_snapshots (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id INTEGER REFERENCES players(id),
-            matchday_id INTEGER REFERENCES matchdays(id),
-            total_points_before INTEGER DEFAULT 0,
-            total_points_after INTEGER,
-            matchday_points INTEGER,
-            UNIQUE(player_id, matchday_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS price_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id INTEGER REFERENCES players(id),
-            matchday_id INTEGER REFERENCES matchdays(id),
-            price REAL,
-            total_points INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(player_id, matchday_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS squads (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            matchday_id INTEGER REFERENCES matchdays(id),
-            profile TEXT DEFAULT 'balanced',
-            squad_json TEXT,
-            total_expected REAL,
-            total_cost REAL,
-            actual_points INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """)
-        
-        # Migration: add columns if missing (for existing DBs)
-        # Init boosters if empty
-        if conn.execute("SELECT COUNT(*) FROM boosters").fetchone()[0] == 0:
-            conn.execute("INSERT INTO boosters (name) VALUES ('wildcard')")
-            conn.execute("INSERT INTO boosters (name) VALUES ('limitless')")
-        
-        try:
-            conn.execute("ALTER TABLE fixtures ADD COLUMN kick_off TEXT")
-        except:
-            pass
-        try:
-            conn.execute("ALTER TABLE fixtures ADD COLUMN status TEXT DEFAULT 'scheduled'")
-        except:
-            pass
-        try:
-            conn.execute("ALTER TABLE fixtures ADD COLUMN home_score INTEGER")
-        except:
-            pass
-        try:
-            conn.execute("ALTER TABLE fixtures ADD COLUMN away_score INTEGER")
-        except:
-            pass
+        migrate(conn)
@@ -5,10 +5,11 @@ Run via cron after match days.
 """
 
 import requests
-import sqlite3
 import os
 from datetime import datetime, timedelta
 
+from database import connect
+
 DB_PATH = os.environ.get("DB_PATH", "/app/data/fantasy.db")
 # football-data.org free tier: 10 requests/min, UCL competition code = CL
 API_URL = "https://api.football-data.org/v4/competitions/CL/matches"
@@ -72,8 +73,7 @@ def fetch_and_update(db_path=DB_PATH):
     matches = data.get("matches", [])
     print(f"Fetched {len(matches)} matches from football-data.org")
 
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = connect(db_path)
     
     updated = 0
     for m in matches:
@@ -0,0 +1,126 @@
+"""
+Multi-matchday prediction horizon.
+
+Predicts expected points for every player in each of the next N matchdays
+in one pass: players are loaded and profiled once, the stored fixtures of
+each matchday become (players × matchdays) opponent/home/knockout columns,
+and predict_points_batch scores the whole grid. Cells without a fixture
+are 0. Column 0 matches /api/predictions for the same matchday.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from predictor import predict_points_batch
+from prediction_context import build_profile, load_fixtures, load_form
+
+DEFAULT_HORIZON = 3
+
+
+@dataclass
+class HorizonMatrix:
+    matchdays: list[dict]  # id, name, stage — one per column
+    players: list[dict]  # player_id, name, club, position, price — one per row
+    expected: np.ndarray  # int64 (players × matchdays)
+    has_fixture: np.ndarray  # bool (players × matchdays)
+    played: np.ndarray  # bool: fixture already played
+
+    def totals(self, skip_played: bool = True) -> np.ndarray:
+        """Horizon total per player (optionally ignoring played fixtures)."""
+        pts = np.where(self.played, 0, self.expected) if skip_played else self.expected
+        return pts.sum(axis=1)
+
+    def row_index(self) -> dict[int, int]:
+        return {p["player_id"]: i for i, p in enumerate(self.players)}
+
+    def to_dict(self) -> dict:
+        totals = self.totals()
+        return {
+            "matchdays": self.matchdays,
+            "players": [
+                {
+                    **p,
+                    "expected": self.expected[i].tolist(),
+                    "has_fixture": self.has_fixture[i].tolist(),
+                    "played": self.played[i].tolist(),
+                    "total": int(totals[i]),
+                }
+                for i, p in enumerate(self.players)
+            ],
+        }
+
+
+def upcoming_matchdays(conn, start_matchday_id: int | None = None, n: int = DEFAULT_HORIZON) -> list[dict]:
+    """The start matchday (active by default) and the next n-1 by id."""
+    if start_matchday_id is None:
+        md = conn.execute("SELECT id FROM matchdays WHERE is_active = 1").fetchone()
+        if not md:
+            return []
+        start_matchday_id = md["id"]
+    rows = conn.execute(
+        "SELECT * FROM matchdays WHERE id >= ? ORDER BY id ASC LIMIT ?", (start_matchday_id, n)
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def load_horizon(conn, start_matchday_id: int | None = None, n: int = DEFAULT_HORIZON) -> HorizonMatrix | None:
+    """Expected points for every player over the next n matchdays."""
+    matchdays = upcoming_matchdays(conn, start_matchday_id, n)
+    if not matchdays:
+        return None
+
+    players = conn.execute("SELECT * FROM players").fetchall()
+    form = load_form(conn)
+    fixtures = [load_fixtures(conn, md) for md in matchdays]
+
+    n_players, n_mds = len(players), len(matchdays)
+    opp = np.full((n_players, n_mds), 0.5)
+    home = np.zeros((n_players, n_mds), dtype=bool)
+    has_fixture = np.zeros((n_players, n_mds), dtype=bool)
+    played = np.zeros((n_players, n_mds), dtype=bool)
+    ko = np.array([md["stage"] != "league_phase" for md in matchdays])[None, :]
+
+    profiles = []
+    for i, p in enumerate(players):
+        profiles.append(build_profile(p, form.get(p["id"])))
+        code = p["club_code"] or ""
+        for j, (club_fixtures, played_clubs) in enumerate(fixtures):
+            fix = club_fixtures.get(p["club"]) or club_fixtures.get(code)
+            if not fix:
+                continue
+            has_fixture[i, j] = True
+            opp[i, j] = fix.opponent_strength
+            home[i, j] = fix.is_home
+            played[i, j] = p["club"] in played_clubs or bool(code and code in played_clubs)
+
+    def column(attr):
+        # object dtype: np.array would turn Position members into "Pos"
+        return np.array([getattr(pr, attr) for pr in profiles], dtype=object)[:, None]
+
+    batch = predict_points_batch(
+        price=column("price"),
+        avg_points=column("avg_points_last5"),
+        matches_played=column("matches_played"),
+        avg_minutes=column("avg_minutes_last5"),
+        is_starter=column("is_starter"),
+        opponent_strength=opp,
+        is_home=home,
+        is_knockout=ko,
+        position=column("position"),
+        injury_status=column("injury_status"),
+        is_set_piece_taker=column("is_set_piece_taker"),
+    ) if profiles else None
+    expected = np.where(has_fixture, batch.expected_points, 0) if batch else np.zeros((0, n_mds), dtype=np.int64)
+
+    return HorizonMatrix(
+        matchdays=[{"id": md["id"], "name": md["name"], "stage": md["stage"]} for md in matchdays],
+        players=[
+            {"player_id": pr.player_id, "name": pr.name, "club": pr.club,
+             "position": pr.position.value, "price": pr.price}
+            for pr in profiles
+        ],
+        expected=expected,
+        has_fixture=has_fixture,
+        played=played,
+    )
@@ -4,12 +4,22 @@ Usage: python import_uefa.py <players_json_path>
 
 On re-import: uses lastGdPoints from UEFA data for accurate matchday points
 (instead of diffing old vs new totPts which breaks if import timing is off).
+
+The feed is parsed incrementally: playerList entries are decoded one at a
+time from the stream (a file or an upload) by a reader thread while the
+import writes the previous ones, so memory does not grow with the feed.
 """
 
+import codecs
 import json
+import queue
+import re
 import sys
-import sqlite3
 import os
+import threading
+import time
+
+from database import connect, migrate
 
 DB_PATH = os.environ.get("DB_PATH", "/app/data/fantasy.db")
 
@@ -36,294 +46,310 @@ STRENGTH = {
     "Qarabağ": 0.3,
 }
 
+READ_CHUNK = 64 * 1024  # bytes per read from the feed
+PREFETCH_BATCHES = 8  # parsed batches the reader thread may run ahead
+PREFETCH_BATCH = 64  # players per batch
+
+_PLAYER_LIST = re.compile(r'"playerList"\s*:\s*\[')
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_player_list(stream, chunk_size=READ_CHUNK):
+    """
+    Yield the entries of data.value.playerList one at a time from a binary
+    (or text) stream, holding only the current entry and one read chunk.
+    The array is found by its "playerList" key; everything after it is
+    never read.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf, pos, eof = "", 0, False
+
+    def more(size=chunk_size):
+        # Append the next chunk to buf[pos:]; False at end of stream
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        data = stream.read(size)
+        eof = not data
+        text = utf8.decode(data, final=eof) if isinstance(data, bytes) else data
+        buf, pos = buf[pos:] + text, 0
+        return not eof or bool(text)
+
+    while (match := _PLAYER_LIST.search(buf, pos)) is None:
+        pos = max(pos, len(buf) - 64)  # keep a tail: the key may straddle two chunks
+        if not more():
+            raise ValueError("UEFA feed has no playerList")
+    pos = match.end()
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if not more():
+                raise ValueError("UEFA feed ends inside playerList")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            entry, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Entry cut off by the chunk boundary: read on (doubling, so a
+            # huge entry is retried a logarithmic number of times)
+            size = chunk_size
+            while True:
+                if not more(size):
+                    raise
+                try:
+                    entry, end = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    size *= 2
+        yield entry
+        pos = _WHITESPACE.match(buf, end).end()
+        while pos == len(buf) and more():
+            pos = _WHITESPACE.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ",":
+            pos += 1
+        elif pos == len(buf) or buf[pos] != "]":
+            raise ValueError(f"UEFA feed: expected ',' or ']' in playerList at offset {pos}")
+
+
+def _prefetch(entries, batch=PREFETCH_BATCH, depth=PREFETCH_BATCHES):
+    """
+    Run an iterator in a reader thread, PREFETCH_BATCHES batches ahead, so
+    parsing overlaps with the consumer's writes (sqlite releases the GIL).
+    """
+    batches = queue.Queue(depth)
+    stop = threading.Event()
+    done = object()
 
-def import_players(json_path, db_path=DB_PATH):
-    with open(json_path) as f:
-        data = json.load(f)
-
-    players = data["data"]["value"]["playerList"]
-    print(f"Found {len(players)} players")
-
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-
-    # Init tables if needed
-    conn.executescript("""
-    CREATE TABLE IF NOT EXISTS player_snapshots (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        player_id INTEGER REFERENCES players(id),
-        matchday_id INTEGER REFERENCES matchdays(id),
-        total_points_before INTEGER DEFAULT 0,
-        total_points_after INTEGER,
-        matchday_points INTEGER,
-        UNIQUE(player_id, matchday_id)
-    );
-    CREATE TABLE IF NOT EXISTS players (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        uefa_id TEXT UNIQUE,
-        name TEXT NOT NULL,
-        club TEXT NOT NULL,
-        club_code TEXT,
-        position TEXT NOT NULL CHECK(position IN ('GK','DEF','MID','FWD')),
-        price REAL NOT NULL DEFAULT 0,
-        is_starter INTEGER DEFAULT 1,
-        is_set_piece_taker INTEGER DEFAULT 0,
-        injury_status TEXT DEFAULT 'fit',
-        total_points INTEGER DEFAULT 0,
-        avg_points REAL DEFAULT 0,
-        goals INTEGER DEFAULT 0,
-        assists INTEGER DEFAULT 0,
-        clean_sheets INTEGER DEFAULT 0,
-        minutes_played INTEGER DEFAULT 0,
-        balls_recovered INTEGER DEFAULT 0,
-        selection_pct REAL DEFAULT 0,
-        form_rating REAL DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    CREATE TABLE IF NOT EXISTS matchdays (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        stage TEXT NOT NULL DEFAULT 'league_phase',
-        deadline TEXT,
-        is_active INTEGER DEFAULT 0
-    );
-    CREATE TABLE IF NOT EXISTS fixtures (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        matchday_id INTEGER REFERENCES matchdays(id),
-        home_club TEXT NOT NULL,
-        home_code TEXT,
-        away_club TEXT NOT NULL,
-        away_code TEXT,
-        home_strength REAL DEFAULT 0.5,
-        away_strength REAL DEFAULT 0.5,
-        match_date TEXT,
-        kick_off TEXT,
-        status TEXT DEFAULT 'scheduled',
-        home_score INTEGER,
-        away_score INTEGER,
-        result TEXT
-    );
-    CREATE TABLE IF NOT EXISTS match_stats (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        player_id INTEGER REFERENCES players(id),
-        matchday_id INTEGER REFERENCES matchdays(id),
-        fixture_id INTEGER REFERENCES fixtures(id),
-        minutes INTEGER DEFAULT 0,
-        goals INTEGER DEFAULT 0,
-        goals_outside_box INTEGER DEFAULT 0,
-        assists INTEGER DEFAULT 0,
-        balls_recovered INTEGER DEFAULT 0,
-        player_of_match INTEGER DEFAULT 0,
-        penalty_won INTEGER DEFAULT 0,
-        penalty_conceded INTEGER DEFAULT 0,
-        penalty_missed INTEGER DEFAULT 0,
-        penalty_saved INTEGER DEFAULT 0,
-        yellow_card INTEGER DEFAULT 0,
-        red_card INTEGER DEFAULT 0,
-        own_goal INTEGER DEFAULT 0,
-        saves INTEGER DEFAULT 0,
-        goals_conceded INTEGER DEFAULT 0,
-        clean_sheet INTEGER DEFAULT 0,
-        fantasy_points INTEGER DEFAULT 0,
-        UNIQUE(player_id, matchday_id)
-    );
-    CREATE TABLE IF NOT EXISTS squads (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        matchday_id INTEGER REFERENCES matchdays(id),
-        profile TEXT DEFAULT 'balanced',
-        squad_json TEXT,
-        total_expected REAL,
-        total_cost REAL,
-        actual_points INTEGER,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """)
-
-    existing_count = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
-    is_reimport = existing_count > 0
-
-    # Save old uefa_id -> db_id mapping for squad fix
-    old_id_map = {}
-    if is_reimport:
-        for row in conn.execute("SELECT id, uefa_id FROM players").fetchall():
-            old_id_map[row["id"]] = row["uefa_id"]
-
-    # Clear existing players
-    conn.execute("DELETE FROM players")
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read():
+        try:
+            pending = []
+            for entry in entries:
+                pending.append(entry)
+                if len(pending) == batch:
+                    put(pending)
+                    pending = []
+            put(pending)
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    reader = threading.Thread(target=read, name="uefa-feed", daemon=True)
+    reader.start()
+    try:
+        while (item := batches.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+        reader.join()
+
+
+def import_players(source, db_path=DB_PATH):
+    """
+    Import the feed from source: a path or a binary file object (an upload).
+
+    One transaction: players are written (executemany) as the feed streams
+    in, then uefa_id -> id is read once and every other table is written in
+    bulk from it, so readers see either the old import or the new one.
+    Returns the counts and per-phase timings (seconds).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as stream:
+            return import_players(stream, db_path)
+
+    timings = {}
+    clock = time.perf_counter()
+
+    def phase(name):
+        nonlocal clock
+        now = time.perf_counter()
+        timings[name] = round(now - clock, 4)
+        clock = now
+
+    conn = connect(db_path)
+
+    # Bring the schema up to date (no-op when current)
+    migrate(conn)
 
     # Collect fixtures from player data
     fixtures_seen = set()
     fixture_data = []
 
-    count = 0
-    for p in players:
-        pos = SKILL_TO_POS.get(p.get("skill", 3), "MID")
-        status = STATUS_MAP.get(p.get("pStatus", ""), "fit")
-        trained = p.get("trained", "")
-        is_starter = 1
-        if "Unlikely" in trained:
-            is_starter = 0
-        elif status == "out":
-            is_starter = 0
-        elif p.get("minsPlyd", 0) == 0:
-            is_starter = 0
-        is_sp = 1 if p.get("pE", 0) > 0 else 0
-
-        conn.execute("""
+    # All the later phases need from each player; the entries themselves
+    # (with their match lists) are dropped as soon as they are written
+    totals = []  # (uefa_id, totPts, lastGdPoints)
+
+    def player_rows():
+        for p in _prefetch(iter_player_list(source)):
+            totals.append((str(p["id"]), p.get("totPts", 0) or 0, p.get("lastGdPoints", 0) or 0))
+            _collect_fixtures(p, fixtures_seen, fixture_data)
+            yield _player_row(p)
+
+    summary = {}
+    try:
+        # Take the write lock up front: the old ids read here are the ones replaced
+        conn.execute("BEGIN IMMEDIATE")
+
+        # Save old db_id -> uefa_id mapping for squad fix
+        old_id_map = dict(conn.execute("SELECT id, uefa_id FROM players").fetchall())
+        is_reimport = bool(old_id_map)
+        active_md = conn.execute("SELECT id FROM matchdays WHERE is_active=1").fetchone()
+
+        # Clear existing players
+        conn.execute("DELETE FROM players")
+        conn.executemany("""
             INSERT OR REPLACE INTO players 
             (uefa_id, name, club, club_code, position, price, is_starter, 
              is_set_piece_taker, injury_status, total_points, avg_points,
              goals, assists, clean_sheets, minutes_played, balls_recovered,
              selection_pct, form_rating)
             VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (
-            p["id"], p["pFName"], p["tName"], p.get("cCode", ""),
-            pos, p.get("value", 0), is_starter, is_sp, status,
-            p.get("totPts", 0), p.get("avgPlayerPts", 0),
-            p.get("gS", 0), p.get("assist", 0), p.get("cS", 0),
-            p.get("minsPlyd", 0), p.get("bR", 0),
-            p.get("selPer", 0), p.get("rating", 0),
-        ))
-        count += 1
-
-        # Extract fixtures
-        for match in p.get("currentMatchesList", []):
-            if match.get("mdId") and match.get("tSCode"):
-                if match.get("tLoc") == "H":
-                    home, home_code = match["tSCode"], match.get("cCode", "")
-                    away, away_code = match.get("vsTSCode", ""), match.get("vsCCode", "")
-                else:
-                    home, home_code = match.get("vsTSCode", ""), match.get("vsCCode", "")
-                    away, away_code = match["tSCode"], match.get("cCode", "")
-                key = f"{home}-{away}"
-                rev_key = f"{away}-{home}"
-                if key not in fixtures_seen and rev_key not in fixtures_seen:
-                    fixtures_seen.add(key)
-                    fixture_data.append({
-                        "home": home, "home_code": home_code,
-                        "away": away, "away_code": away_code,
-                        "date": match.get("matchDate", ""),
-                        "kick_off": match.get("kickOffTime", match.get("matchDate", "")),
-                    })
-
-    conn.commit()
-    print(f"Imported {count} players")
-
-    # Save price history
-    active_md = conn.execute("SELECT id FROM matchdays WHERE is_active=1").fetchone()
-    if active_md:
-        md_id = active_md[0]
-        # Ensure table exists
-        conn.execute("""CREATE TABLE IF NOT EXISTS price_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            player_id INTEGER REFERENCES players(id),
-            matchday_id INTEGER REFERENCES matchdays(id),
-            price REAL, total_points INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(player_id, matchday_id))""")
-        ph_count = 0
-        for p in players:
-            uefa_id = str(p["id"])
-            row = conn.execute("SELECT id, price, total_points FROM players WHERE uefa_id=?", (uefa_id,)).fetchone()
-            if row:
-                conn.execute("""INSERT OR REPLACE INTO price_history 
-                    (player_id, matchday_id, price, total_points) VALUES (?,?,?,?)""",
-                    (row[0], md_id, row[1], row[2]))
-                ph_count += 1
-        conn.commit()
-        print(f"Saved price history for {ph_count} players")
-
-    # Create snapshots using lastGdPoints (accurate matchday points from UEFA)
-    active_md = conn.execute("SELECT id FROM matchdays WHERE is_active=1").fetchone()
-    if is_reimport and active_md:
-        md_id = active_md[0]
-        updated = 0
-        for p in players:
-            uefa_id = str(p["id"])
-            tot_pts = p.get("totPts", 0) or 0
-            last_gd = p.get("lastGdPoints", 0) or 0
-            before_pts = tot_pts - last_gd
-
-            row = conn.execute("SELECT id FROM players WHERE uefa_id=?", (uefa_id,)).fetchone()
-            if row:
-                conn.execute("""
-                    INSERT OR REPLACE INTO player_snapshots 
-                    (player_id, matchday_id, total_points_before, total_points_after, matchday_points)
-                    VALUES (?,?,?,?,?)
-                """, (row[0], md_id, int(before_pts), tot_pts, int(last_gd)))
-                updated += 1
-        conn.commit()
-        print(f"Updated matchday points (via lastGdPoints) for {updated} players")
-
-    # Fix my_squad references (remap old player IDs to new ones via uefa_id)
-    if is_reimport and old_id_map:
-        old_squad = conn.execute("SELECT * FROM my_squad").fetchall()
-        if old_squad:
-            # Build old_db_id -> uefa_id -> new_db_id
-            conn_temp = conn  # same connection
-            remapped = 0
-            new_squad = []
-            for sq in old_squad:
-                old_pid = sq["player_id"]
-                uefa_id = old_id_map.get(old_pid)
-                if not uefa_id:
-                    continue
-                new_row = conn.execute("SELECT id FROM players WHERE uefa_id=?", (uefa_id,)).fetchone()
-                if not new_row:
-                    continue
-                new_squad.append((new_row["id"], sq["is_captain"], sq["is_vice_captain"],
-                                  sq["is_starting"], sq["added_matchday"]))
-                remapped += 1
-            
+        """, player_rows())
+        summary["players"] = len(totals)
+        phase("players")
+
+        ids = dict(conn.execute("SELECT uefa_id, id FROM players").fetchall())
+        phase("id_map")
+
+        # Save price history
+        if active_md:
+            md_id = active_md[0]
+            # players holds exactly this feed now
+            cur = conn.execute("""
+                INSERT OR REPLACE INTO price_history (player_id, matchday_id, price, total_points)
+                SELECT id, ?, price, total_points FROM players
+            """, (md_id,))
+            summary["price_history"] = cur.rowcount
+            phase("price_history")
+
+        # Create snapshots using lastGdPoints (accurate matchday points from UEFA)
+        if is_reimport and active_md:
+            md_id = active_md[0]
+            snapshots = [(ids[uefa_id], md_id, int(tot_pts - last_gd), tot_pts, int(last_gd))
+                         for uefa_id, tot_pts, last_gd in totals if uefa_id in ids]
+            conn.executemany("""
+                INSERT OR REPLACE INTO player_snapshots 
+                (player_id, matchday_id, total_points_before, total_points_after, matchday_points)
+                VALUES (?,?,?,?,?)
+            """, snapshots)
+            summary["snapshots"] = len(snapshots)
+            phase("snapshots")
+
+        # Fix my_squad references (remap old player IDs to new ones via uefa_id)
+        if is_reimport:
+            old_squad = conn.execute("SELECT * FROM my_squad").fetchall()
+            new_squad = [
+                (ids[uefa_id], sq["is_captain"], sq["is_vice_captain"], sq["is_starting"], sq["added_matchday"])
+                for sq in old_squad
+                if (uefa_id := old_id_map.get(sq["player_id"])) and uefa_id in ids
+            ]
             if new_squad:
                 conn.execute("DELETE FROM my_squad")
-                for ns in new_squad:
-                    conn.execute("""
-                        INSERT INTO my_squad (player_id, is_captain, is_vice_captain, is_starting, added_matchday)
-                        VALUES (?,?,?,?,?)
-                    """, ns)
-                conn.commit()
-                print(f"Remapped {remapped}/{len(old_squad)} squad players")
-
-    # Create matchday and fixtures
-    if fixture_data:
-        conn.execute("UPDATE matchdays SET is_active = 0")
-        cur = conn.execute(
-            "INSERT INTO matchdays (name, stage, deadline, is_active) VALUES (?,?,?,1)",
-            ("Knockout Play-offs", "ko_playoffs", fixture_data[0].get("date", ""))
-        )
-        md_id = cur.lastrowid
-
-        for fix in fixture_data:
-            h_str = STRENGTH.get(fix["home"], 0.5)
-            a_str = STRENGTH.get(fix["away"], 0.5)
-            conn.execute("""
+                conn.executemany("""
+                    INSERT INTO my_squad (player_id, is_captain, is_vice_captain, is_starting, added_matchday)
+                    VALUES (?,?,?,?,?)
+                """, new_squad)
+                summary["squad_remapped"] = f"{len(new_squad)}/{len(old_squad)}"
+            phase("squad")
+
+        # Create matchday and fixtures
+        if fixture_data:
+            conn.execute("UPDATE matchdays SET is_active = 0")
+            cur = conn.execute(
+                "INSERT INTO matchdays (name, stage, deadline, is_active) VALUES (?,?,?,1)",
+                ("Knockout Play-offs", "ko_playoffs", fixture_data[0].get("date", ""))
+            )
+            md_id = cur.lastrowid
+            conn.executemany("""
                 INSERT INTO fixtures (matchday_id, home_club, home_code, away_club, away_code, 
                                       home_strength, away_strength, match_date, kick_off, status)
                 VALUES (?,?,?,?,?,?,?,?,?,?)
-            """, (md_id, fix["home"], fix["home_code"], fix["away"], fix["away_code"],
-                  h_str, a_str, fix.get("date", ""), fix.get("kick_off", ""), "scheduled"))
+            """, [(md_id, fix["home"], fix["home_code"], fix["away"], fix["away_code"],
+                   STRENGTH.get(fix["home"], 0.5), STRENGTH.get(fix["away"], 0.5),
+                   fix.get("date", ""), fix.get("kick_off", ""), "scheduled") for fix in fixture_data])
+            summary["matchday"] = md_id
+            summary["fixtures"] = len(fixture_data)
+
+            # Create baseline snapshots on first import
+            if not is_reimport:
+                conn.executemany("""
+                    INSERT OR IGNORE INTO player_snapshots 
+                    (player_id, matchday_id, total_points_before, total_points_after, matchday_points)
+                    VALUES (?,?,?,NULL,NULL)
+                """, [(ids[uefa_id], md_id, tot_pts) for uefa_id, tot_pts, _ in totals if uefa_id in ids])
+            phase("fixtures")
 
         conn.commit()
-        print(f"Created matchday {md_id} with {len(fixture_data)} fixtures")
-
-        # Create baseline snapshots on first import
-        if not is_reimport:
-            for p in players:
-                uefa_id = str(p["id"])
-                row = conn.execute("SELECT id FROM players WHERE uefa_id=?", (uefa_id,)).fetchone()
-                if row:
-                    conn.execute("""
-                        INSERT OR IGNORE INTO player_snapshots 
-                        (player_id, matchday_id, total_points_before, total_points_after, matchday_points)
-                        VALUES (?,?,?,NULL,NULL)
-                    """, (row[0], md_id, p.get("totPts", 0) or 0))
-            conn.commit()
-            print("Created baseline snapshots")
-
-    conn.close()
-    print("Done!")
+        phase("commit")
+    except BaseException:
+        # Malformed or truncated feed (or a failed write): keep the current data
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    summary["timings"] = timings
+    print(f"Imported {summary['players']} players in {sum(timings.values()):.3f}s")
+    for name, value in summary.items():
+        if name not in ("players", "timings"):
+            print(f"  {name}: {value}")
+    print("  " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+    return summary
+
+
+def _player_row(p):
+    pos = SKILL_TO_POS.get(p.get("skill", 3), "MID")
+    status = STATUS_MAP.get(p.get("pStatus", ""), "fit")
+    trained = p.get("trained", "")
+    is_starter = 1
+    if "Unlikely" in trained:
+        is_starter = 0
+    elif status == "out":
+        is_starter = 0
+    elif p.get("minsPlyd", 0) == 0:
+        is_starter = 0
+    is_sp = 1 if p.get("pE", 0) > 0 else 0
+    return (
+        p["id"], p["pFName"], p["tName"], p.get("cCode", ""),
+        pos, p.get("value", 0), is_starter, is_sp, status,
+        p.get("totPts", 0), p.get("avgPlayerPts", 0),
+        p.get("gS", 0), p.get("assist", 0), p.get("cS", 0),
+        p.get("minsPlyd", 0), p.get("bR", 0),
+        p.get("selPer", 0), p.get("rating", 0),
+    )
+
+
+def _collect_fixtures(p, fixtures_seen, fixture_data):
+    for match in p.get("currentMatchesList", []):
+        if match.get("mdId") and match.get("tSCode"):
+            if match.get("tLoc") == "H":
+                home, home_code = match["tSCode"], match.get("cCode", "")
+                away, away_code = match.get("vsTSCode", ""), match.get("vsCCode", "")
+            else:
+                home, home_code = match.get("vsTSCode", ""), match.get("vsCCode", "")
+                away, away_code = match["tSCode"], match.get("cCode", "")
+            key = f"{home}-{away}"
+            rev_key = f"{away}-{home}"
+            if key not in fixtures_seen and rev_key not in fixtures_seen:
+                fixtures_seen.add(key)
+                fixture_data.append({
+                    "home": home, "home_code": home_code,
+                    "away": away, "away_code": away_code,
+                    "date": match.get("matchDate", ""),
+                    "kick_off": match.get("kickOffTime", match.get("matchDate", "")),
+                })
 
 
 if __name__ == "__main__":
@@ -4,14 +4,21 @@ UCL Fantasy Assistant - FastAPI Backend
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import csv
 import io
 import json
 import os
+import uuid
+from collections import Counter
+from concurrent.futures import as_completed
+from dataclasses import asdict
 from typing import Optional
 
+import numpy as np
+
 ADMIN_KEY = os.environ.get("ADMIN_KEY", "ucl-admin-2026")
 
 
@@ -20,10 +27,19 @@ def require_admin(x_admin_key: str = Header(None)):
         raise HTTPException(403, "Admin access required")
     return True
 
-from database import init_db, db_session
-from scoring import Position, MatchStats, calculate_fantasy_points
-from predictor import PlayerProfile, FixtureInfo, predict_points, Prediction
-from optimizer import optimize_squad, SquadConstraints, OptimizedSquad
+from database import init_db, db_session, close_all
+from scoring import STAT_FIELDS, FLAG_FIELDS, calculate_fantasy_points_batch, scoring_rules
+import rescore
+from predictor import predict_points, Prediction, PredictionTable
+from prediction_context import load_prediction_context, build_profile
+from prediction_cache import predictions_cache, distributions_cache, horizon_cache, bump_data_version
+from horizon import load_horizon, HorizonMatrix, DEFAULT_HORIZON
+from transfer_planner import plan_transfers, DEFAULT_TIME_LIMIT as DEFAULT_PLAN_TIME_LIMIT
+from transfer_engine import TransferEngine, SquadMember, MAX_TRANSFERS
+from simulation import simulate_matchday, HAUL_POINTS
+import batch_optimizer
+from optimizer import SquadModel, SquadConstraints, OptimizedSquad, RISK_PROFILES
+from solver import SolverConfig, resolve_backend, DEFAULT_TIME_LIMIT as DEFAULT_SOLVER_TIME_LIMIT
 from import_uefa import import_players, STRENGTH
 from difficulty import get_club_strength, fixture_difficulty, difficulty_label
 from rules import get_stage_rules, get_all_stages, STAGES
@@ -44,6 +60,12 @@ def startup():
     init_db()
 
 
+@app.on_event("shutdown")
+def shutdown():
+    batch_optimizer.shutdown()
+    close_all()
+
+
 # ─── Players ───
 
 class PlayerCreate(BaseModel):
@@ -58,7 +80,7 @@ class PlayerCreate(BaseModel):
 
 @app.get("/api/players")
 def get_players(position: Optional[str] = None, club: Optional[str] = None):
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         q = "SELECT * FROM players WHERE 1=1"
         params = []
         if position:
@@ -79,7 +101,8 @@ def create_player(p: PlayerCreate):
             "INSERT INTO players (name, club, position, price, is_starter, is_set_piece_taker, injury_status) VALUES (?,?,?,?,?,?,?)",
             (p.name, p.club, p.position, p.price, p.is_starter, p.is_set_piece_taker, p.injury_status)
         )
-        return {"status": "ok"}
+    bump_data_version()
+    return {"status": "ok"}
 
 
 @app.post("/api/players/import-csv")
@@ -110,6 +133,7 @@ async def import_players_csv(file: UploadFile = File(...), admin=Depends(require
             ))
             count += 1
 
+    bump_data_version()
     return {"imported": count}
 
 
@@ -117,34 +141,29 @@ async def import_players_csv(file: UploadFile = File(...), admin=Depends(require
 def delete_all_players(admin=Depends(require_admin)):
     with db_session() as conn:
         conn.execute("DELETE FROM players")
-        return {"status": "cleared"}
+    bump_data_version()
+    return {"status": "cleared"}
 
 
 @app.post("/api/players/import-uefa")
-async def import_uefa_json(file: UploadFile = File(...), admin=Depends(require_admin)):
-    """Import players directly from UEFA Fantasy JSON (players_80_en_10.json)."""
-    import tempfile, os
-    content = await file.read()
-    
-    # Save to temp file
-    with tempfile.NamedTemporaryFile(mode='wb', suffix='.json', delete=False, dir='/app/data') as tmp:
-        tmp.write(content)
-        tmp_path = tmp.name
-    
+def import_uefa_json(file: UploadFile = File(...), admin=Depends(require_admin)):
+    """
+    Import players directly from UEFA Fantasy JSON (players_80_en_10.json).
+    The upload is parsed as a stream while the import writes (see import_uefa).
+    """
+    db_path = os.environ.get("DB_PATH", "/app/data/fantasy.db")
     try:
-        db_path = os.environ.get("DB_PATH", "/app/data/fantasy.db")
-        import_players(tmp_path, db_path)
-        
-        # Count results
-        import sqlite3
-        conn = sqlite3.connect(db_path)
+        summary = import_players(file.file, db_path)
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid UEFA feed: {e}")
+    bump_data_version()
+
+    # Count results
+    with db_session(readonly=True) as conn:
         players = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
         fixtures = conn.execute("SELECT COUNT(*) FROM fixtures WHERE matchday_id = (SELECT id FROM matchdays WHERE is_active=1)").fetchone()[0]
-        conn.close()
-        
-        return {"players": players, "fixtures": fixtures, "status": "ok"}
-    finally:
-        os.unlink(tmp_path)
+
+    return {"players": players, "fixtures": fixtures, "status": "ok", "timings": summary["timings"]}
 
 
 # ─── Matchdays & Fixtures ───
@@ -153,6 +172,7 @@ class MatchdayCreate(BaseModel):
     name: str
     stage: str = "knockout"
     deadline: Optional[str] = None
+    season: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")  # e.g. "2025-26"; default: from deadline
 
 
 class FixtureCreate(BaseModel):
@@ -165,7 +185,7 @@ class FixtureCreate(BaseModel):
 
 @app.get("/api/matchdays")
 def get_matchdays():
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         rows = conn.execute("SELECT * FROM matchdays ORDER BY id DESC").fetchall()
         return [dict(r) for r in rows]
 
@@ -173,9 +193,10 @@ def get_matchdays():
 @app.patch("/api/matchdays/{matchday_id}")
 def update_matchday(matchday_id: int, m: MatchdayCreate):
     with db_session() as conn:
-        conn.execute("UPDATE matchdays SET name=?, stage=?, deadline=? WHERE id=?",
-                     (m.name, m.stage, m.deadline, matchday_id))
-        return {"status": "ok"}
+        conn.execute("UPDATE matchdays SET name=?, stage=?, deadline=?, season=? WHERE id=?",
+                     (m.name, m.stage, m.deadline, m.season, matchday_id))
+    bump_data_version()
+    return {"status": "ok"}
 
 
 @app.post("/api/matchdays")
@@ -184,15 +205,16 @@ def create_matchday(m: MatchdayCreate):
         # Deactivate all, activate new
         conn.execute("UPDATE matchdays SET is_active = 0")
         cur = conn.execute(
-            "INSERT INTO matchdays (name, stage, deadline, is_active) VALUES (?,?,?,1)",
-            (m.name, m.stage, m.deadline)
+            "INSERT INTO matchdays (name, stage, deadline, season, is_active) VALUES (?,?,?,?,1)",
+            (m.name, m.stage, m.deadline, m.season)
         )
-        return {"id": cur.lastrowid}
+    bump_data_version()
+    return {"id": cur.lastrowid}
 
 
 @app.get("/api/fixtures")
 def get_fixtures(matchday_id: int):
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         rows = conn.execute("SELECT * FROM fixtures WHERE matchday_id = ?", (matchday_id,)).fetchall()
         return [dict(r) for r in rows]
 
@@ -204,7 +226,8 @@ def create_fixture(f: FixtureCreate):
             "INSERT INTO fixtures (matchday_id, home_club, away_club, home_strength, away_strength) VALUES (?,?,?,?,?)",
             (f.matchday_id, f.home_club, f.away_club, f.home_strength, f.away_strength)
         )
-        return {"id": cur.lastrowid}
+    bump_data_version()
+    return {"id": cur.lastrowid}
 
 
 class FixtureUpdate(BaseModel):
@@ -235,13 +258,16 @@ def update_fixture(fixture_id: int, update: FixtureUpdate):
             return {"status": "nothing to update"}
         params.append(fixture_id)
         conn.execute(f"UPDATE fixtures SET {', '.join(parts)} WHERE id = ?", params)
-        return {"status": "ok"}
+        changed = _fixture_clubs(conn, [fixture_id])
+    bump_data_version(_prediction_patch(changed))
+    return {"status": "ok"}
 
 
 @app.post("/api/fixtures/bulk-update")
 def bulk_update_fixtures(updates: list[dict]):
     """Bulk update fixture statuses and scores."""
     with db_session() as conn:
+        updated_ids = []
         for u in updates:
             fid = u.get("id")
             if not fid:
@@ -255,6 +281,9 @@ def bulk_update_fixtures(updates: list[dict]):
             if parts:
                 params.append(fid)
                 conn.execute(f"UPDATE fixtures SET {', '.join(parts)} WHERE id = ?", params)
+                updated_ids.append(fid)
+        changed = _fixture_clubs(conn, updated_ids)
+    bump_data_version(_prediction_patch(changed))
     return {"status": "ok"}
 
 
@@ -280,7 +309,7 @@ class SetLineupRequest(BaseModel):
 
 @app.get("/api/my-squad")
 def get_my_squad():
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         squad = conn.execute("""
             SELECT ms.*, p.name, p.club, p.club_code, p.position, p.price, 
                    p.total_points, p.avg_points, p.injury_status
@@ -308,7 +337,7 @@ def get_my_squad():
         
         total_value = sum(dict(s)["price"] for s in squad)
         # Check if user has a custom budget stored
-        budget_row = conn.execute("SELECT value FROM settings WHERE key='budget'").fetchone() if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'").fetchone() else None
+        budget_row = conn.execute("SELECT value FROM settings WHERE key='budget'").fetchone()
         budget = float(budget_row["value"]) if budget_row else rules["budget"]
         # If squad costs more than budget, adjust (user has gains from price rises)
         if total_value > budget:
@@ -333,7 +362,7 @@ def get_my_squad():
 @app.get("/api/rules")
 def get_rules():
     """Get current rules based on active matchday stage."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         md = conn.execute("SELECT * FROM matchdays WHERE is_active=1").fetchone()
         stage = md["stage"] if md else "league_phase"
         rules = get_stage_rules(stage)
@@ -344,6 +373,7 @@ def get_rules():
             "max_per_club": rules["max_per_club"],
             "free_transfers": rules["free_transfers"],
             "transfer_penalty": rules["transfer_penalty"],
+            "scoring_version": (rescore.matchday_scoring_rules(conn, md["id"]) if md else scoring_rules()).version,
             "all_stages": {k: {"label": v["label"], "budget": v["budget"], "max_per_club": v["max_per_club"]} for k, v in STAGES.items()},
         }
 
@@ -358,9 +388,7 @@ def set_budget(budget: float = Query(...), admin=Depends(require_admin)):
 
 @app.get("/api/settings")
 def get_settings():
-    with db_session() as conn:
-        if not conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='settings'").fetchone():
-            return {"budget": 105.0}
+    with db_session(readonly=True) as conn:
         rows = conn.execute("SELECT key, value FROM settings").fetchall()
         return {r["key"]: r["value"] for r in rows}
 
@@ -559,7 +587,7 @@ def set_lineup(req: SetLineupRequest):
 @app.get("/api/my-squad/suggestions")
 def transfer_suggestions():
     """Smart transfer suggestions with reasoning."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         squad = conn.execute("""
             SELECT ms.player_id, ms.is_starting, ms.is_captain, p.name, p.club, p.club_code, 
                    p.position, p.price, p.avg_points, p.total_points, p.injury_status
@@ -585,11 +613,15 @@ def transfer_suggestions():
     
     # Get predictions for upcoming matchday
     try:
-        preds = get_predictions()
+        entry = _predictions_entry()
+        preds, table = entry.value, entry.derived("table", PredictionTable.from_rows)  # row i = preds[i]
     except:
         return {"suggestions": [], "summary": "No predictions available.", "actions": []}
     
     pred_map = {p["player_id"]: p for p in preds}
+    engine = _transfer_engine(entry)
+    in_squad = np.isin(table.player_id, list(squad_ids))
+    explained = _explain_predictions(None, squad_ids)
     
     # Analyze each squad player
     squad_analysis = []
@@ -597,9 +629,17 @@ def transfer_suggestions():
         s = dict(s)
         pred = pred_map.get(s["player_id"], {})
         s["expected"] = pred.get("expected_points", 0)
-        s["fixture_info"] = pred.get("reasoning", [])
+        s["fixture_info"] = explained.get(s["player_id"], {}).get("reasoning", [])
         s["fixture_played"] = pred.get("fixture_played", False)
         squad_analysis.append(s)
+    squad_cost = sum(sq["price"] for sq in squad_analysis)
+    club_counts = Counter(sq["club"] for sq in squad_analysis)
+    
+    def replacements(s, min_gain):
+        """Non-squad players of s's position beating s by more than min_gain, best (then cheapest) first."""
+        rows = engine.by_position.get(s["position"], np.empty(0, dtype=np.int64))
+        rows = rows[~in_squad[rows] & (table.expected_points[rows] > s["expected"] + min_gain)]
+        return [preds[i] for i in rows]
     
     # Find issues and opportunities
     suggestions = []
@@ -610,21 +650,12 @@ def transfer_suggestions():
     targets = injured + low_expected[:3]  # prioritize injured, then lowest-expected starters
     
     for s in targets:
-        squad_cost = sum(sq["price"] for sq in squad_analysis)
         budget_avail = rules["budget"] - squad_cost + s["price"]
         
-        # Find best replacement (same position, not in squad)
-        candidates = []
-        for p in preds:
-            if p["player_id"] in squad_ids:
-                continue
-            if p["position"] != s["position"]:
-                continue
-            if p["expected_points"] <= s["expected"]:
-                continue
-            
+        # Best two replacements (same position, not in squad, better prediction)
+        for p in replacements(s, 0)[:2]:
             # Check club limit
-            club_count = sum(1 for sq in squad_analysis if sq["club"] == p.get("club", "") and sq["player_id"] != s["player_id"])
+            club_count = club_counts[p["club"]] - (s["club"] == p["club"])
             over_club = club_count >= rules["max_per_club"]
             
             over_budget = p["price"] > budget_avail
@@ -637,12 +668,8 @@ def transfer_suggestions():
             else:
                 reason_parts.append(f"{s['name']} expected only {s['expected']} pts")
             reason_parts.append(f"{p['name']} predicted {p['expected_points']} pts")
-            if p.get("reasoning"):
-                fix_info = [r for r in p["reasoning"] if "vs" in r]
-                if fix_info:
-                    reason_parts.append(fix_info[0])
             
-            candidates.append({
+            suggestions.append({
                 "player_in": p,
                 "player_out": s,
                 "points_gain": round(p["expected_points"] - s["expected"]),
@@ -651,39 +678,35 @@ def transfer_suggestions():
                 "priority": "high" if s["injury_status"] in ("out", "doubt") else "medium",
                 "warning": "over budget" if over_budget else "club limit" if over_club else None,
             })
-        
-        candidates.sort(key=lambda x: (-x["points_gain"], x["cost_diff"]))
-        suggestions.extend(candidates[:2])
+
+    # Fixture line for the chosen replacements only (reasoning is rendered on demand)
+    explained = _explain_predictions(None, [sg["player_in"]["player_id"] for sg in suggestions])
+    for sg in suggestions:
+        reasoning = explained.get(sg["player_in"]["player_id"], {}).get("reasoning", [])
+        fix_info = [r for r in reasoning if "vs" in r]
+        if fix_info:
+            sg["reason"] += f". {fix_info[0]}"
     
     # Also add "upgrade" suggestions for bench/starters even if not injured
     all_squad_sorted = sorted(squad_analysis, key=lambda x: x["expected"])
     for s in all_squad_sorted[:5]:
         if any(sg["player_out"]["player_id"] == s["player_id"] for sg in suggestions):
             continue
-        squad_cost = sum(sq["price"] for sq in squad_analysis)
         budget_avail = rules["budget"] - squad_cost + s["price"]
         
-        best = None
-        for p in preds:
-            if p["player_id"] in squad_ids:
-                continue
-            if p["position"] != s["position"]:
-                continue
-            if p["expected_points"] <= s["expected"] + 2:  # only suggest if significant upgrade
-                continue
-            gain = p["expected_points"] - s["expected"]
-            if best is None or gain > best["points_gain"]:
-                best = {
-                    "player_in": p,
-                    "player_out": s,
-                    "points_gain": round(gain),
-                    "cost_diff": round(p["price"] - s["price"], 1),
-                    "reason": f"Upgrade: {p['name']} ({p['expected_points']} pts) over {s['name']} ({s['expected']} pts)",
-                    "priority": "low",
-                    "warning": None if p["price"] <= budget_avail else "over budget",
-                }
-        if best:
-            suggestions.append(best)
+        # only suggest if significant upgrade
+        upgrades = replacements(s, 2)
+        if upgrades:
+            p = upgrades[0]
+            suggestions.append({
+                "player_in": p,
+                "player_out": s,
+                "points_gain": round(p["expected_points"] - s["expected"]),
+                "cost_diff": round(p["price"] - s["price"], 1),
+                "reason": f"Upgrade: {p['name']} ({p['expected_points']} pts) over {s['name']} ({s['expected']} pts)",
+                "priority": "low",
+                "warning": None if p["price"] <= budget_avail else "over budget",
+            })
     
     suggestions.sort(key=lambda x: ({"high": 0, "medium": 1, "low": 2}[x["priority"]], -x["points_gain"]))
     
@@ -717,6 +740,56 @@ def transfer_suggestions():
     }
 
 
+@app.get("/api/my-squad/best-transfers")
+def best_transfers(k: int = Query(2, ge=1, le=MAX_TRANSFERS)):
+    """Provably best 1..k transfers for the current squad under budget and club limits."""
+    with db_session(readonly=True) as conn:
+        # Price, club and position from players: members without a prediction still count
+        squad_rows = conn.execute(
+            "SELECT p.id, p.name, p.position, p.price, p.club FROM my_squad s JOIN players p ON p.id = s.player_id"
+        ).fetchall()
+        squad = [SquadMember(r["id"], r["position"], r["price"], r["club"]) for r in squad_rows]
+        if not squad:
+            raise HTTPException(400, "No squad set")
+        md = conn.execute("SELECT * FROM matchdays WHERE is_active=1").fetchone()
+        rules = get_stage_rules(md["stage"] if md else "league_phase")
+        transfers_made = conn.execute(
+            "SELECT COUNT(*) as c FROM transfers WHERE matchday_id=?", (md["id"],)
+        ).fetchone()["c"] if md else 0
+    free_left = None if rules["free_transfers"] == "unlimited" else max(0, rules["free_transfers"] - transfers_made)
+
+    entry = _predictions_entry()
+    pred_map = {p["player_id"]: p for p in entry.value}
+    for r in squad_rows:
+        if r["id"] not in pred_map:  # no fixture: sold at 0 expected points
+            pred_map[r["id"]] = {"player_id": r["id"], "name": r["name"], "club": r["club"],
+                                 "position": r["position"], "price": r["price"], "expected_points": 0}
+    levels = _transfer_engine(entry).best(squad, k, rules["budget"], rules["max_per_club"])
+    result = []
+    for level in levels:
+        hits = 0 if free_left is None else max(0, len(level.moves) - free_left)
+        penalty = hits * rules["transfer_penalty"]
+        result.append({
+            "max_transfers": level.max_transfers,
+            "transfers": len(level.moves),
+            "points_gain": level.points_gain,
+            "penalty": penalty,
+            "net_gain": level.points_gain - penalty,
+            "cost_diff": level.cost_diff,
+            "moves": [
+                {**asdict(m), "player_out": pred_map.get(m.out_id), "player_in": pred_map.get(m.in_id)}
+                for m in level.moves
+            ],
+        })
+    return {"levels": result, "free_transfers_left": free_left, "budget": rules["budget"]}
+
+
+def _transfer_engine(entry) -> TransferEngine:
+    """TransferEngine for a cached prediction entry, indexed once per entry."""
+    table = entry.derived("table", PredictionTable.from_rows)
+    return entry.derived("transfer_engine", lambda _: TransferEngine(table))
+
+
 # ─── Auto-fetch Results ───
 
 @app.post("/api/fetch-results")
@@ -725,7 +798,15 @@ def fetch_results():
     from fetch_results import fetch_and_update
     import os
     db_path = os.environ.get("DB_PATH", "/app/data/fantasy.db")
+    state_sql = "SELECT id, status, home_score, away_score FROM fixtures"
+    with db_session(readonly=True) as conn:
+        before = {tuple(r) for r in conn.execute(state_sql)}
     updated = fetch_and_update(db_path)
+    if updated:
+        with db_session(readonly=True) as conn:
+            after = {tuple(r) for r in conn.execute(state_sql)}
+            changed = _fixture_clubs(conn, {r[0] for r in after - before})
+        bump_data_version(_prediction_patch(changed))
     return {"updated": updated}
 
 
@@ -743,196 +824,262 @@ async def import_stats_csv(matchday_id: int, file: UploadFile = File(...)):
     text = content.decode("utf-8-sig")
     reader = csv.DictReader(io.StringIO(text))
 
-    count = 0
     with db_session() as conn:
-        for row in reader:
-            # Find player
-            player = conn.execute(
-                "SELECT id, position FROM players WHERE name = ?",
-                (row["player_name"].strip(),)
-            ).fetchone()
-            if not player:
-                continue
+        by_name = {}
+        for player in conn.execute("SELECT id, name, position FROM players ORDER BY id"):
+            by_name.setdefault(player["name"], player)
+        matched = [(by_name[row["player_name"].strip()], row) for row in reader
+                   if row["player_name"].strip() in by_name]
+
+        # Score all rows at once
+        columns = {field: np.array([int(row.get(field, 0)) for _, row in matched], dtype=np.int64)
+                   for field in STAT_FIELDS}
+        for field in FLAG_FIELDS:
+            columns[field] = (columns[field] != 0).astype(np.int64)
+        positions = np.array([player["position"] for player, _ in matched], dtype=str)
+        rules = rescore.matchday_scoring_rules(conn, matchday_id)
+        fps = calculate_fantasy_points_batch(positions, **columns, rules=rules) if matched else []
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO match_stats
+            (player_id, matchday_id, minutes, goals, goals_outside_box, assists,
+            balls_recovered, player_of_match, penalty_won, penalty_conceded,
+            penalty_missed, penalty_saved, yellow_card, red_card, own_goal,
+            saves, goals_conceded, clean_sheet, fantasy_points)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """, [
+            (player["id"], matchday_id, *(int(columns[field][k]) for field in STAT_FIELDS), int(fps[k]))
+            for k, (player, _) in enumerate(matched)
+        ])
+        count = len(matched)
+
+    bump_data_version()
+    return {"imported": count}
 
-            stats = MatchStats(
-                player_id=player["id"],
-                position=Position(player["position"]),
-                minutes=int(row.get("minutes", 0)),
-                goals=int(row.get("goals", 0)),
-                goals_outside_box=int(row.get("goals_outside_box", 0)),
-                assists=int(row.get("assists", 0)),
-                balls_recovered=int(row.get("balls_recovered", 0)),
-                player_of_match=bool(int(row.get("player_of_match", 0))),
-                penalty_won=int(row.get("penalty_won", 0)),
-                penalty_conceded=int(row.get("penalty_conceded", 0)),
-                penalty_missed=int(row.get("penalty_missed", 0)),
-                penalty_saved=int(row.get("penalty_saved", 0)),
-                yellow_card=bool(int(row.get("yellow_card", 0))),
-                red_card=bool(int(row.get("red_card", 0))),
-                own_goal=int(row.get("own_goal", 0)),
-                saves=int(row.get("saves", 0)),
-                goals_conceded=int(row.get("goals_conceded", 0)),
-                clean_sheet=bool(int(row.get("clean_sheet", 0))),
-            )
-            fps = calculate_fantasy_points(stats)
 
-            conn.execute("""
-                INSERT OR REPLACE INTO match_stats
-                (player_id, matchday_id, minutes, goals, goals_outside_box, assists,
-                balls_recovered, player_of_match, penalty_won, penalty_conceded,
-                penalty_missed, penalty_saved, yellow_card, red_card, own_goal,
-                saves, goals_conceded, clean_sheet, fantasy_points)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """, (
-                player["id"], matchday_id,
-                stats.minutes, stats.goals, stats.goals_outside_box, stats.assists,
-                stats.balls_recovered, int(stats.player_of_match),
-                stats.penalty_won, stats.penalty_conceded, stats.penalty_missed,
-                stats.penalty_saved, int(stats.yellow_card), int(stats.red_card),
-                stats.own_goal, stats.saves, stats.goals_conceded,
-                int(stats.clean_sheet), fps
-            ))
-            count += 1
+@app.post("/api/admin/rescore")
+def start_rescore(admin=Depends(require_admin)):
+    """
+    Recompute fantasy_points for all match_stats under each matchday's
+    season rules, in chunks, carrying changes into snapshots and player
+    totals. Runs in the background; poll GET /api/admin/rescore.
+    """
+    def done(job):
+        if job.changed:
+            bump_data_version()
+
+    job = rescore.start_job(on_done=done)
+    if job is None:
+        raise HTTPException(409, "A rescore is already running")
+    return job.to_dict()
 
-    return {"imported": count}
+
+@app.get("/api/admin/rescore")
+def rescore_progress():
+    job = rescore.current_job()
+    return job.to_dict() if job else {"status": "idle"}
 
 
 # ─── Predictions ───
 
 @app.get("/api/predictions")
-def get_predictions(matchday_id: Optional[int] = None):
-    """Get expected points predictions for all players in current/specified matchday."""
-    with db_session() as conn:
-        # Get active matchday
-        if matchday_id:
-            md = conn.execute("SELECT * FROM matchdays WHERE id = ?", (matchday_id,)).fetchone()
-        else:
-            md = conn.execute("SELECT * FROM matchdays WHERE is_active = 1").fetchone()
+def predictions_endpoint(matchday_id: Optional[int] = None, explain: bool = False):
+    """Get expected points predictions for all players in current/specified matchday.
 
-        if not md:
-            raise HTTPException(404, "No active matchday")
+    Reasoning text is only rendered with explain=true (not cached).
+    """
+    if explain:
+        return _compute_predictions(matchday_id, explain=True)
+    return Response(_predictions_entry(matchday_id).json, media_type="application/json")
+
+
+@app.get("/api/predictions/{player_id}/explain")
+def explain_prediction(player_id: int, matchday_id: Optional[int] = None):
+    """Structured factors and reasoning text for one player's prediction."""
+    explained = _explain_predictions(matchday_id, [player_id])
+    if player_id not in explained:
+        raise HTTPException(404, "No prediction for this player")
+    return explained[player_id]
+
+
+def _explain_predictions(matchday_id: Optional[int], player_ids) -> dict[int, dict]:
+    """player_id -> {expected_points, factors, reasoning}, loading only their clubs."""
+    player_ids = set(player_ids)
+    if not player_ids:
+        return {}
+    with db_session(readonly=True) as conn:
+        marks = ",".join("?" * len(player_ids))
+        clubs = {r["club"] for r in conn.execute(
+            f"SELECT club FROM players WHERE id IN ({marks})", list(player_ids))}
+        ctx = load_prediction_context(conn, matchday_id, clubs=clubs) if clubs else None
+    if not ctx:
+        return {}
+
+    explained = {}
+    for p in ctx.players:
+        if p["id"] not in player_ids:
+            continue
+        fixture = ctx.fixture_for(p)
+        if not fixture:
+            continue
+        pred = predict_points(build_profile(p, ctx.form.get(p["id"])), fixture)
+        explained[p["id"]] = {
+            "player_id": p["id"],
+            "expected_points": pred.expected_points,
+            "factors": [list(f) for f in pred.factors],
+            "reasoning": pred.reasoning,
+        }
+    return explained
 
-        fixtures = conn.execute("SELECT * FROM fixtures WHERE matchday_id = ?", (md["id"],)).fetchall()
-        players = conn.execute("SELECT * FROM players").fetchall()
 
-        # Build club -> fixture mapping (try both name and code)
-        club_fixtures = {}
-        played_clubs = set()  # clubs whose fixtures are already played
-        for f in fixtures:
-            home_name = f["home_club"]
-            away_name = f["away_club"]
-            home_code = f["home_code"] if "home_code" in f.keys() else ""
-            away_code = f["away_code"] if "away_code" in f.keys() else ""
-            f_status = f["status"] if "status" in f.keys() else "scheduled"
-            
-            if f_status == "played":
-                played_clubs.add(home_name)
-                played_clubs.add(away_name)
-                if home_code:
-                    played_clubs.add(home_code)
-                if away_code:
-                    played_clubs.add(away_code)
-            
-            home_fix = FixtureInfo(
-                opponent_club=away_name,
-                opponent_strength=f["away_strength"],
-                is_home=True,
-                is_knockout=md["stage"] != "league_phase"
-            )
-            away_fix = FixtureInfo(
-                opponent_club=home_name,
-                opponent_strength=f["home_strength"],
-                is_home=False,
-                is_knockout=md["stage"] != "league_phase"
+def _predictions_entry(matchday_id: Optional[int] = None):
+    return predictions_cache.get_or_compute(matchday_id, lambda: _compute_predictions(matchday_id))
+
+
+def get_predictions(matchday_id: Optional[int] = None) -> list[dict]:
+    """Cached predictions for internal callers. Shared list: do not mutate."""
+    return _predictions_entry(matchday_id).value
+
+
+def get_prediction_table(matchday_id: Optional[int] = None) -> PredictionTable:
+    """Columnar view of get_predictions, built once per cached set."""
+    return _predictions_entry(matchday_id).derived("table", PredictionTable.from_rows)
+
+
+def _compute_predictions(matchday_id: Optional[int] = None, explain: bool = False) -> list[dict]:
+    with db_session(readonly=True) as conn:
+        ctx = load_prediction_context(conn, matchday_id)
+    if not ctx:
+        raise HTTPException(404, "No active matchday")
+
+    results = _prediction_rows(ctx, explain)
+    results.sort(key=_prediction_order)
+    return results
+
+
+def _prediction_order(row: dict):
+    return -row["expected_points"], row["player_id"]
+
+
+def _prediction_rows(ctx, explain: bool = False) -> list[dict]:
+    """Unsorted prediction rows for the players of a PredictionContext."""
+    results = []
+    for p in ctx.players:
+        fixture = ctx.fixture_for(p)
+        if not fixture:
+            continue  # club not playing this matchday
+
+        profile = build_profile(p, ctx.form.get(p["id"]))
+        pred = predict_points(profile, fixture)
+
+        # Check if this player's fixture is already played
+        is_played = ctx.is_played(p)
+
+        row = {
+            "player_id": pred.player_id,
+            "name": pred.name,
+            "position": pred.position.value,
+            "club": pred.club,
+            "price": pred.price,
+            "expected_points": pred.expected_points,
+            "points_per_million": pred.points_per_million,
+            "confidence": pred.confidence,
+            "risk_level": pred.risk_level,
+            "fixture_played": is_played,
+            "actual_points": ctx.actual_points(p["id"], is_played),
+        }
+        if explain:
+            row["reasoning"] = pred.reasoning
+        results.append(row)
+    return results
+
+
+def _fixture_clubs(conn, fixture_ids) -> dict[int, set[str]]:
+    """matchday_id -> club names/codes of the given fixtures."""
+    clubs = {}
+    for fid in fixture_ids:
+        f = conn.execute(
+            "SELECT matchday_id, home_club, away_club, home_code, away_code FROM fixtures WHERE id = ?", (fid,)
+        ).fetchone()
+        if f:
+            clubs.setdefault(f["matchday_id"], set()).update(
+                c for c in (f["home_club"], f["away_club"], f["home_code"], f["away_code"]) if c
             )
-            club_fixtures[home_name] = home_fix
-            club_fixtures[away_name] = away_fix
-            if home_code:
-                club_fixtures[home_code] = home_fix
-            if away_code:
-                club_fixtures[away_code] = away_fix
-
-        # Get historical stats for form
-        results = []
-        for p in players:
-            club_key = p["club"]
-            club_code = p["club_code"] if "club_code" in p.keys() else ""
-            if club_key not in club_fixtures and club_code not in club_fixtures:
-                continue  # club not playing this matchday
-
-            fixture = club_fixtures.get(club_key) or club_fixtures.get(club_code)
-
-            # Use UEFA avg stats if no historical match_stats
-            stats = conn.execute("""
-                SELECT fantasy_points, minutes FROM match_stats
-                WHERE player_id = ? ORDER BY matchday_id DESC LIMIT 5
-            """, (p["id"],)).fetchall()
-
-            if stats:
-                avg_pts = sum(s["fantasy_points"] for s in stats) / max(len(stats), 1)
-                avg_min = sum(s["minutes"] for s in stats) / max(len(stats), 1)
-                matches = len(stats)
+    return clubs
+
+
+def _prediction_patch(changed: dict[int, set[str]]):
+    """bump_data_version patch that re-predicts only the players of changed clubs.
+
+    A fixture's status/score only moves fixture_played and actual_points for
+    the two clubs playing it; every other cached row carries over as is.
+    """
+    def patch(matchday_id, rows):
+        with db_session(readonly=True) as conn:
+            if matchday_id is None:
+                md = conn.execute("SELECT id FROM matchdays WHERE is_active = 1").fetchone()
+                if not md:
+                    return None
+                md_id = md["id"]
             else:
-                # Use UEFA data
-                _avg_pts = p["avg_points"] if "avg_points" in p.keys() else 0
-                _tot_pts = p["total_points"] if "total_points" in p.keys() else 0
-                _mins = p["minutes_played"] if "minutes_played" in p.keys() else 0
-                avg_pts = _avg_pts or (_tot_pts / max(1, (_mins // 90)))
-                avg_min = _mins / max(1, 8)
-                matches = max(1, _mins // 60) if _mins > 0 else 0
-
-            profile = PlayerProfile(
-                player_id=p["id"],
-                name=p["name"],
-                club=p["club"],
-                position=Position(p["position"]),
-                price=p["price"],
-                avg_minutes_last5=avg_min,
-                avg_points_last5=avg_pts if avg_pts else (p["avg_points"] if "avg_points" in p.keys() else 0),
-                matches_played=matches,
-                is_starter=bool(p["is_starter"]),
-                is_set_piece_taker=bool(p["is_set_piece_taker"]),
-                injury_status=p["injury_status"],
-            )
+                md_id = matchday_id
+            clubs = changed.get(md_id)
+            if not clubs:
+                return rows
+            ctx = load_prediction_context(conn, md_id, clubs=clubs)
+        if not ctx:
+            return None
+        affected = {p["id"] for p in ctx.players}
+        patched = [r for r in rows if r["player_id"] not in affected] + _prediction_rows(ctx)
+        patched.sort(key=_prediction_order)
+        return patched
+    return {predictions_cache: patch}
+
+
+@app.get("/api/predictions/distribution")
+def predictions_distribution(
+    matchday_id: Optional[int] = None,
+    draws: int = Query(20000, ge=1000, le=100000),
+    seed: Optional[int] = None,
+    haul_points: int = Query(HAUL_POINTS, ge=1, le=40),
+):
+    """Monte Carlo points distribution (mean, p10/p50/p90, haul probability) per player."""
+    def compute():
+        with db_session(readonly=True) as conn:
+            ctx = load_prediction_context(conn, matchday_id)
+        if not ctx:
+            raise HTTPException(404, "No active matchday")
+        dists = simulate_matchday(ctx, draws=draws, seed=seed, haul_points=haul_points)
+        dists.sort(key=lambda x: -x["mean"])
+        return {"matchday_id": ctx.matchday["id"], "draws": draws, "haul_points": haul_points, "players": dists}
+
+    entry = distributions_cache.get_or_compute((matchday_id, draws, seed, haul_points), compute)
+    return Response(entry.json, media_type="application/json")
+
+
+def _horizon_entry(matchday_id: Optional[int], matchdays: int):
+    def compute():
+        with db_session(readonly=True) as conn:
+            horizon = load_horizon(conn, matchday_id, matchdays)
+        if not horizon:
+            raise HTTPException(404, "No active matchday")
+        return horizon
+    return horizon_cache.get_or_compute((matchday_id, matchdays), compute)
 
-            pred = predict_points(profile, fixture)
-            
-            # Check if this player's fixture is already played
-            is_played = p["club"] in played_clubs or (club_code and club_code in played_clubs)
-            
-            # Get actual fantasy points from snapshots or match_stats
-            actual_pts = None
-            snap = conn.execute(
-                "SELECT matchday_points FROM player_snapshots WHERE player_id = ? AND matchday_id = ?",
-                (p["id"], md["id"])
-            ).fetchone()
-            if snap and snap["matchday_points"] is not None:
-                actual_pts = snap["matchday_points"]
-            elif is_played:
-                actual_row = conn.execute(
-                    "SELECT fantasy_points FROM match_stats WHERE player_id = ? AND matchday_id = ?",
-                    (p["id"], md["id"])
-                ).fetchone()
-                if actual_row:
-                    actual_pts = actual_row["fantasy_points"]
-            
-            results.append({
-                "player_id": pred.player_id,
-                "name": pred.name,
-                "position": pred.position.value,
-                "club": pred.club,
-                "price": pred.price,
-                "expected_points": pred.expected_points,
-                "points_per_million": pred.points_per_million,
-                "confidence": pred.confidence,
-                "risk_level": pred.risk_level,
-                "reasoning": pred.reasoning,
-                "fixture_played": is_played,
-                "actual_points": actual_pts,
-            })
 
-        results.sort(key=lambda x: -x["expected_points"])
-        return results
+def get_horizon(matchday_id: Optional[int] = None, matchdays: int = DEFAULT_HORIZON) -> HorizonMatrix:
+    """Cached players × matchdays expected points. Shared matrix: do not mutate."""
+    return _horizon_entry(matchday_id, matchdays).value
+
+
+@app.get("/api/predictions/horizon")
+def predictions_horizon(
+    matchday_id: Optional[int] = None,
+    matchdays: int = Query(DEFAULT_HORIZON, ge=1, le=17),
+):
+    """Expected points per player for each of the next N matchdays (from matchday_id or the active one)."""
+    entry = _horizon_entry(matchday_id, matchdays)
+    return Response(entry.json, media_type="application/json")
 
 
 # ─── Squad Optimizer ───
@@ -940,40 +1087,181 @@ def get_predictions(matchday_id: Optional[int] = None):
 class OptimizeRequest(BaseModel):
     matchday_id: Optional[int] = None
     budget: float = 105.0
-    max_per_club: int = 4
+    max_per_club: int = Field(4, ge=1)
     risk_profile: str = "balanced"  # safe, balanced, aggressive
+    mode: str = "exact"  # exact (MILP) or fast (in-process heuristic, a few ms, gap reported)
+    solver: str = "auto"  # auto, highs, cbc, python
+    time_limit: float = Field(DEFAULT_SOLVER_TIME_LIMIT, gt=0, le=30)  # seconds per solve
+    gap: Optional[float] = Field(None, ge=0, le=1)  # relative optimality gap to stop at
+    threads: Optional[int] = Field(None, ge=1, le=16)
+
+
+def _solver_config(req: OptimizeRequest) -> SolverConfig:
+    if req.mode not in ("exact", "fast"):
+        raise HTTPException(400, f"Unknown mode: {req.mode}")
+    backend = "python" if req.mode == "fast" else req.solver
+    config = SolverConfig(backend=backend, time_limit=req.time_limit, gap_rel=req.gap, threads=req.threads)
+    try:
+        resolve_backend(config.backend)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return config
 
 
 @app.post("/api/optimize")
 def optimize(req: OptimizeRequest):
     """Build optimal squad from predictions. Excludes players from already-played fixtures."""
-    preds_raw = get_predictions(req.matchday_id)
-
-    predictions = [
-        Prediction(
-            player_id=p["player_id"],
-            name=p["name"],
-            position=Position(p["position"]),
-            club=p["club"],
-            price=p["price"],
-            expected_points=p["expected_points"],
-            points_per_million=p["points_per_million"],
-            confidence=p["confidence"],
-            risk_level=p["risk_level"],
-            reasoning=p["reasoning"],
+    model = _squad_model(req.matchday_id, req.max_per_club)
+    result = model.solve(req.risk_profile, req.budget, _solver_config(req))
+    if not result:
+        raise HTTPException(400, "Could not find optimal squad with these constraints")
+    return {**_squad_response(result), "pool": model.pool}
+
+
+@app.post("/api/optimize/profiles")
+def optimize_profiles(req: OptimizeRequest):
+    """Optimal squads for every risk profile in one call (one shared model, warm-started)."""
+    model = _squad_model(req.matchday_id, req.max_per_club)
+    solver = _solver_config(req)
+    profiles = {}
+    for risk_profile in RISK_PROFILES:
+        result = model.solve(risk_profile, req.budget, solver)
+        profiles[risk_profile] = _squad_response(result) if result else None
+    if not any(profiles.values()):
+        raise HTTPException(400, "Could not find optimal squad with these constraints")
+    return {"profiles": profiles, "pool": model.pool}
+
+
+class AlternativesRequest(OptimizeRequest):
+    count: int = Field(5, ge=1, le=20)
+    min_difference: int = Field(1, ge=1, le=15)  # players each squad must change vs every earlier one
+
+
+@app.post("/api/optimize/alternatives")
+def optimize_alternatives(req: AlternativesRequest):
+    """The `count` best distinct squads for one profile (no-good cuts on the shared model)."""
+    try:
+        results = _squad_model(req.matchday_id, req.max_per_club, prune=False).solve_top(
+            req.count, req.min_difference, req.risk_profile, req.budget, _solver_config(req)
         )
-        for p in preds_raw
-    ]
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if not results:
+        raise HTTPException(400, "Could not find optimal squad with these constraints")
+    best_ids = {p.player_id for p in results[0].squad}
+    squads = []
+    for result in results:
+        response = _squad_response(result)
+        response["changes_vs_best"] = sum(1 for p in result.squad if p.player_id not in best_ids)
+        squads.append(response)
+    return {"squads": squads}
+
+
+BATCH_MAX_CONFIGS = 50
+
+
+class BatchOptimizeRequest(BaseModel):
+    configs: list[OptimizeRequest] = Field(..., min_length=1, max_length=BATCH_MAX_CONFIGS)
+
+
+@app.post("/api/optimize/batch")
+def optimize_batch(req: BatchOptimizeRequest):
+    """
+    Solve many optimize configs on the worker process pool. Streams NDJSON,
+    one line per config as it finishes: {"index", "result"} or {"index", "error"}.
+    Each prediction set is computed and serialized once for the whole batch.
+    """
+    payloads, lines, futures = {}, [], {}
+    for index, config in enumerate(req.configs):
+        try:
+            solver = _solver_config(config)
+            if config.matchday_id not in payloads:
+                payloads[config.matchday_id] = _batch_payload(config.matchday_id)
+            token, payload = payloads[config.matchday_id]
+        except HTTPException as e:
+            lines.append({"index": index, "error": e.detail})
+            continue
+        future = batch_optimizer.submit(token, payload, config.max_per_club, config.risk_profile, config.budget, solver)
+        futures[future] = index
+
+    def stream():
+        for line in lines:
+            yield json.dumps(line) + "\n"
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                line = {"index": index, "error": f"Solve failed: {e}"}
+            else:
+                line = ({"index": index, "result": _squad_response(result)} if result
+                        else {"index": index, "error": "Could not find optimal squad with these constraints"})
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    constraints = SquadConstraints(
-        budget=req.budget,
-        max_per_club=req.max_per_club,
+
+def _batch_payload(matchday_id: Optional[int]) -> tuple[str, bytes]:
+    """(token, serialized PredictionTable) for a cached prediction set; the token is unique per entry."""
+    entry = _predictions_entry(matchday_id)
+    table = entry.derived("table", PredictionTable.from_rows)
+    return entry.derived("batch_payload", lambda _: (uuid.uuid4().hex, batch_optimizer.serialize(table)))
+
+
+FRONTIER_MAX_POINTS = 201
+
+
+class FrontierRequest(OptimizeRequest):
+    budget_min: float = Field(90.0, gt=0)
+    budget_max: float = Field(110.0, gt=0)
+    step: float = Field(0.5, gt=0)
+
+
+@app.post("/api/optimize/frontier")
+def optimize_frontier(req: FrontierRequest):
+    """
+    Best expected points for every budget in [budget_min, budget_max] on one
+    shared model, plus the squad at each breakpoint (where the squad changes).
+    """
+    if req.budget_max < req.budget_min:
+        raise HTTPException(400, "budget_max must be at least budget_min")
+    n = int(round((req.budget_max - req.budget_min) / req.step, 9)) + 1
+    if n > FRONTIER_MAX_POINTS:
+        raise HTTPException(400, f"At most {FRONTIER_MAX_POINTS} budgets per sweep")
+    budgets = [round(req.budget_min + k * req.step, 2) for k in range(n)]
+    frontier = _squad_model(req.matchday_id, req.max_per_club).frontier(budgets, req.risk_profile, _solver_config(req))
+
+    curve, breakpoints, previous = [], [], None
+    for point in frontier:
+        ids = frozenset(p.player_id for p in point.squad.squad) if point.squad else None
+        curve.append({
+            "budget": point.budget,
+            "total_expected": point.squad.total_expected if point.squad else None,
+            "objective": point.squad.solve_stats.objective if point.squad else None,
+            "total_cost": point.squad.total_cost if point.squad else None,
+            "solved_at": point.solved_at,
+        })
+        if ids and ids != previous:
+            breakpoints.append({"budget": point.budget, **_squad_response(point.squad)})
+        previous = ids
+    return {
+        "risk_profile": req.risk_profile,
+        "curve": curve,
+        "breakpoints": breakpoints,
+    }
+
+
+def _squad_model(matchday_id: Optional[int], max_per_club: int, prune: bool = True) -> SquadModel:
+    """SquadModel for a cached prediction set, built once per (set, club limit, pruning)."""
+    entry = _predictions_entry(matchday_id)
+    table = entry.derived("table", PredictionTable.from_rows)
+    return entry.derived(
+        ("squad_model", max_per_club, prune),
+        lambda _: SquadModel(table, SquadConstraints(max_per_club=max_per_club), prune),
     )
 
-    result = optimize_squad(predictions, constraints, req.risk_profile)
-    if not result:
-        raise HTTPException(400, "Could not find optimal squad with these constraints")
 
+def _squad_response(result: OptimizedSquad) -> dict:
     def player_dict(p: Prediction, is_captain=False):
         return {
             "player_id": p.player_id,
@@ -984,7 +1272,6 @@ def optimize(req: OptimizeRequest):
             "expected_points": p.expected_points * (2 if is_captain else 1),
             "confidence": p.confidence,
             "risk_level": p.risk_level,
-            "reasoning": p.reasoning,
             "is_captain": is_captain,
         }
 
@@ -996,6 +1283,7 @@ def optimize(req: OptimizeRequest):
         "starting_xi": [player_dict(p, p.player_id == result.captain.player_id) for p in result.starting_xi],
         "bench": [player_dict(p) for p in result.bench],
         "squad": [player_dict(p, p.player_id == result.captain.player_id) for p in result.squad],
+        "solver": asdict(result.solve_stats) if result.solve_stats else None,
     }
 
 
@@ -1003,7 +1291,7 @@ def optimize(req: OptimizeRequest):
 
 @app.get("/api/dashboard")
 def dashboard():
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         player_count = conn.execute("SELECT COUNT(*) as c FROM players").fetchone()["c"]
         md = conn.execute("SELECT * FROM matchdays WHERE is_active = 1").fetchone()
         fixture_count = 0
@@ -1016,12 +1304,14 @@ def dashboard():
             "active_matchday": dict(md) if md else None,
             "fixtures": fixture_count,
             "total_stats_records": stats_count,
+            "prediction_cache": predictions_cache.stats(),
+            "horizon_cache": horizon_cache.stats(),
         }
 
 
 @app.get("/api/clubs")
 def get_clubs():
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         rows = conn.execute("SELECT DISTINCT club FROM players ORDER BY club").fetchall()
         return [r["club"] for r in rows]
 
@@ -1122,6 +1412,7 @@ async def fix_snapshots(file: UploadFile = File(...), matchday_id: int = Query(1
                 FROM player_snapshots ps JOIN players p ON p.id=ps.player_id 
                 WHERE ps.matchday_id=? ORDER BY ps.matchday_points DESC LIMIT 10
             """, (matchday_id,)).fetchall()
+        bump_data_version()
         
         return {
             "updated": updated,
@@ -1191,7 +1482,7 @@ def rebuild_squad(req: RebuildSquadRequest, admin=Depends(require_admin)):
 def get_fixture_calendar():
     """Get fixture difficulty calendar for all clubs across upcoming matchdays.
     Returns a grid: clubs × matchdays with difficulty ratings."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         # Get all matchdays
         matchdays = conn.execute("SELECT * FROM matchdays ORDER BY id ASC").fetchall()
         if not matchdays:
@@ -1272,7 +1563,7 @@ def get_fixture_calendar():
 def get_hot_picks():
     """Players with best combination of form + easy upcoming fixture.
     Perfect for transfer targets."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         # Get active matchday
         md = conn.execute("SELECT * FROM matchdays WHERE is_active=1").fetchone()
         if not md:
@@ -1437,7 +1728,7 @@ def rollback_limitless(admin=Depends(require_admin)):
 @app.get("/api/boosters")
 def get_boosters():
     """Get booster status."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         boosters = conn.execute("SELECT * FROM boosters").fetchall()
         md = conn.execute("SELECT * FROM matchdays WHERE is_active=1").fetchone()
         
@@ -1459,7 +1750,7 @@ def get_boosters():
 @app.get("/api/players/{player_id}/form")
 def get_player_form(player_id: int):
     """Get player form trend: points per matchday over time."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         player = conn.execute("SELECT * FROM players WHERE id=?", (player_id,)).fetchone()
         if not player:
             raise HTTPException(404, "Player not found")
@@ -1481,9 +1772,7 @@ def get_player_form(player_id: int):
             JOIN matchdays m ON m.id = ph.matchday_id
             WHERE ph.player_id = ?
             ORDER BY ph.matchday_id ASC
-        """, (player_id,)).fetchall() if conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='price_history'"
-        ).fetchone() else []
+        """, (player_id,)).fetchall()
         
         points_list = [dict(s) for s in snapshots]
         prices_list = [dict(p) for p in prices]
@@ -1522,10 +1811,7 @@ def get_player_form(player_id: int):
 @app.get("/api/price-changes")
 def get_price_changes():
     """Get players whose price changed between matchdays."""
-    with db_session() as conn:
-        if not conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='price_history'").fetchone():
-            return {"risers": [], "fallers": []}
-        
+    with db_session(readonly=True) as conn:
         # Get last two matchday IDs that have price data
         mds = conn.execute("""
             SELECT DISTINCT matchday_id FROM price_history ORDER BY matchday_id DESC LIMIT 2
@@ -1559,7 +1845,7 @@ def get_price_changes():
 @app.get("/api/knockout-path")
 def get_knockout_path():
     """Get knockout bracket with advancing probabilities and player value."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         # Get all knockout matchdays and fixtures
         matchdays = conn.execute("""
             SELECT * FROM matchdays WHERE stage != 'league_phase' ORDER BY id ASC
@@ -1635,7 +1921,7 @@ def compare_players(ids: str = Query(..., description="Comma-separated player ID
     if not player_ids or len(player_ids) > 6:
         raise HTTPException(400, "Provide 1-6 player IDs")
     
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         matchdays = conn.execute("SELECT * FROM matchdays ORDER BY id ASC").fetchall()
         
         result = []
@@ -1672,7 +1958,7 @@ def compare_players(ids: str = Query(..., description="Comma-separated player ID
 @app.get("/api/players/search-for-compare")
 def search_players_for_compare(q: str = Query("", description="Search query")):
     """Search players for comparison tool."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         if q:
             rows = conn.execute(
                 "SELECT id, name, club, position, price, avg_points FROM players WHERE name LIKE ? ORDER BY total_points DESC LIMIT 20",
@@ -1690,7 +1976,7 @@ def search_players_for_compare(q: str = Query("", description="Search query")):
 @app.get("/api/my-squad/suggestions-multi")
 def transfer_suggestions_multi():
     """Transfer suggestions considering 2+ upcoming matchdays for long-term value."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         squad = conn.execute("""
             SELECT ms.player_id, ms.is_starting, ms.is_captain, p.name, p.club, p.club_code,
                    p.position, p.price, p.avg_points, p.total_points, p.injury_status
@@ -1708,12 +1994,12 @@ def transfer_suggestions_multi():
         stage = md["stage"]
         rules = get_stage_rules(stage)
         
-        # Get ALL matchdays to find upcoming ones
-        all_mds = conn.execute("SELECT * FROM matchdays ORDER BY id ASC").fetchall()
-        active_idx = next((i for i, m in enumerate(all_mds) if m["id"] == md["id"]), 0)
-        upcoming_mds = [dict(m) for m in all_mds[active_idx:active_idx + 3]]  # current + next 2
-        
-        # Get fixtures for all upcoming matchdays
+        # Get fixtures for all upcoming matchdays (for the run descriptions)
+        try:
+            horizon = get_horizon(md["id"])
+        except HTTPException:
+            return {"suggestions": [], "summary": "No predictions available"}
+        upcoming_mds = horizon.matchdays
         upcoming_fixtures = {}  # club -> [{matchday, opponent, difficulty}]
         for umd in upcoming_mds:
             fixtures = conn.execute("SELECT * FROM fixtures WHERE matchday_id=?", (umd["id"],)).fetchall()
@@ -1731,42 +2017,26 @@ def transfer_suggestions_multi():
                         "is_home": home,
                         "difficulty": diff,
                     })
-    
-    # Get current matchday predictions
-    try:
-        preds = get_predictions()
-    except:
-        return {"suggestions": [], "summary": "No predictions available"}
-    
-    pred_map = {p["player_id"]: p for p in preds}
-    
-    # Score each player: current prediction + future fixture ease + club quality
-    def multi_md_score(player_id, club):
-        current_pred = pred_map.get(player_id, {}).get("expected_points", 0)
-        future_fixtures = upcoming_fixtures.get(club, [])
-        
-        if not future_fixtures:
-            return current_pred
-        
-        # Future ease score
-        future_ease = sum((6 - f["difficulty"]) for f in future_fixtures) / len(future_fixtures)
-        ease_mult = future_ease / 3.0
-        
-        # Club strength factor: stronger clubs more likely to advance = more fixtures ahead
-        # Scale: strength 5.0 (elite) → 1.3x, strength 2.0 (weak) → 0.7x
-        club_str = get_club_strength(club)
-        advance_mult = 0.5 + club_str * 0.16  # 2.0→0.82, 3.0→0.98, 4.5→1.22, 5.0→1.3
-        
-        # Blend: 50% current, 25% fixture ease, 25% club quality (longevity)
-        score = current_pred * 0.50 + current_pred * ease_mult * 0.25 + current_pred * advance_mult * 0.25
-        return score
-    
+
+    # Long-term value = predicted points summed over the unplayed horizon fixtures
+    rows = horizon.row_index()
+    totals = horizon.totals()
+    current = horizon.expected[:, 0]
+
+    def multi_md_score(player_id):
+        i = rows.get(player_id)
+        return int(totals[i]) if i is not None else 0
+
+    def current_expected(player_id):
+        i = rows.get(player_id)
+        return int(current[i]) if i is not None else 0
+
     # Analyze squad
     squad_analysis = []
     for s in squad:
         s = dict(s)
-        s["multi_score"] = multi_md_score(s["player_id"], s["club"])
-        s["expected"] = pred_map.get(s["player_id"], {}).get("expected_points", 0)
+        s["multi_score"] = multi_md_score(s["player_id"])
+        s["expected"] = current_expected(s["player_id"])
         s["fixture_run"] = upcoming_fixtures.get(s["club"], [])
         squad_analysis.append(s)
     
@@ -1777,17 +2047,18 @@ def transfer_suggestions_multi():
         budget_avail = rules["budget"] - squad_cost + s["price"]
         
         best = None
-        for p in preds:
-            if p["player_id"] in squad_ids:
+        for hp in horizon.players:
+            if hp["player_id"] in squad_ids:
                 continue
-            if p["position"] != s["position"]:
+            if hp["position"] != s["position"]:
                 continue
             
-            p_multi = multi_md_score(p["player_id"], p.get("club", ""))
+            p_multi = multi_md_score(hp["player_id"])
             if p_multi <= s["multi_score"] + 1:
                 continue
             
             gain = round(p_multi - s["multi_score"], 1)
+            p = {**hp, "expected_points": current_expected(hp["player_id"]), "horizon_points": p_multi}
             
             # Fixture run description
             p_fixtures = upcoming_fixtures.get(p.get("club", ""), [])
@@ -1829,6 +2100,42 @@ def transfer_suggestions_multi():
     }
 
 
+# ─── Multi-Matchday Transfer Planner ───
+
+@app.get("/api/my-squad/plan")
+def transfer_plan(
+    matchdays: int = Query(3, ge=1, le=8),
+    time_limit: float = Query(DEFAULT_PLAN_TIME_LIMIT, gt=0, le=30),
+):
+    """Transfers to make before each of the next N matchdays (one ILP over the horizon)."""
+    with db_session(readonly=True) as conn:
+        squad_ids = [r["player_id"] for r in conn.execute("SELECT player_id FROM my_squad")]
+        if not squad_ids:
+            raise HTTPException(400, "No squad set")
+        md = conn.execute("SELECT * FROM matchdays WHERE is_active=1").fetchone()
+        if not md:
+            raise HTTPException(404, "No active matchday")
+        prev = conn.execute(
+            "SELECT stage FROM matchdays WHERE id < ? ORDER BY id DESC LIMIT 1", (md["id"],)
+        ).fetchone()
+        transfers_made = conn.execute(
+            "SELECT COUNT(*) as c FROM transfers WHERE matchday_id=?", (md["id"],)
+        ).fetchone()["c"]
+
+    horizon = get_horizon(md["id"], matchdays)
+    plan = plan_transfers(
+        horizon, squad_ids,
+        previous_stage=prev["stage"] if prev else None,
+        transfers_made=transfers_made,
+        time_limit=time_limit,
+    )
+    if plan.status == "infeasible":
+        raise HTTPException(400, "No feasible plan for this squad under the stage rules")
+    if not plan.matchdays:
+        raise HTTPException(503, f"Solver stopped without a plan ({plan.status}); try a longer time limit")
+    return asdict(plan)
+
+
 import os
 if os.path.exists("/app/frontend/dist"):
     app.mount("/", StaticFiles(directory="/app/frontend/dist", html=True), name="frontend")
@@ -1841,7 +2148,7 @@ if os.path.exists("/app/frontend/dist"):
 @app.get("/api/archive")
 def get_archive():
     """Get all past matchdays with fixtures and top performers."""
-    with db_session() as conn:
+    with db_session(readonly=True) as conn:
         matchdays = conn.execute("""
             SELECT * FROM matchdays ORDER BY id DESC
         """).fetchall()
@@ -1969,6 +2276,7 @@ def matchday_wizard(
     except Exception as e:
         # API failed — matchday created but no fixtures (user can add manually or via UEFA import)
         pass
+    bump_data_version()
     
     return {
         "matchday_id": md_id,
@@ -1,12 +1,20 @@
 """
 Squad Optimizer using Integer Linear Programming.
-Builds optimal 15-man squad under UCL Fantasy constraints.
+Builds optimal 15-man squad, starting XI, captain and bench order under
+UCL Fantasy constraints.
 """
 
-from pulp import LpMaximize, LpProblem, LpVariable, lpSum, LpStatus
+import threading
+import time
 from dataclasses import dataclass
+
+from pulp import LpMaximize, LpProblem, LpVariable, lpSum
+
+import numpy as np
+
 from scoring import Position
-from predictor import Prediction
+from predictor import Prediction, PredictionTable
+from solver import SolverConfig, SolveStats, relative_gap, resolve_backend, solve as solve_milp
 
 
 @dataclass
@@ -18,6 +26,7 @@ class SquadConstraints:
     def_count: int = 5
     mid_count: int = 5
     fwd_count: int = 3
+    starters: int = 11
 
 
 @dataclass
@@ -29,102 +38,617 @@ class OptimizedSquad:
     total_expected: float
     total_cost: float
     formation: str  # e.g. "3-4-3"
+    solve_stats: SolveStats | None = None
 
 
-def optimize_squad(
-    predictions: list[Prediction],
-    constraints: SquadConstraints = SquadConstraints(),
-    risk_profile: str = "balanced",  # safe, balanced, aggressive
-) -> OptimizedSquad | None:
+@dataclass
+class FrontierPoint:
+    budget: float
+    squad: OptimizedSquad | None  # None: no squad fits this budget
+    solved_at: float | None = None  # budget of the solve that produced the squad
+
+
+def adjusted_points(table: PredictionTable, risk_profile: str) -> np.ndarray:
     """
-    Find optimal 15-man squad using ILP.
-    Risk profiles:
+    Objective weight per row for a risk profile:
     - safe: penalize high-risk players
     - balanced: as-is expected points
     - aggressive: boost high-ceiling players (differential picks)
     """
-    prob = LpProblem("UCL_Fantasy_Squad", LpMaximize)
-
-    # Filter out unavailable
-    players = [p for p in predictions if p.expected_points > 0]
-
-    # Decision variables: 1 if player is in squad
-    x = {p.player_id: LpVariable(f"x_{p.player_id}", cat="Binary") for p in players}
-
-    # Adjust points by risk profile
-    def adjusted_points(p: Prediction) -> float:
-        base = p.expected_points
-        if risk_profile == "safe":
-            # Pure value-per-million strategy with consistency bonus
-            # Favor proven, high-confidence, low-risk starters
-            base = p.points_per_million * p.price  # reset to base
-            if p.confidence == "high":
-                base *= 1.4
-            elif p.confidence == "medium":
-                base *= 1.0
-            else:
-                base *= 0.4
-            if p.risk_level == "high":
-                base *= 0.2
-            elif p.risk_level == "medium":
-                base *= 0.7
-            # Prefer cheaper reliable players
-            base += p.points_per_million * 0.5
-        elif risk_profile == "aggressive":
-            # High-ceiling differential strategy
-            # Favor expensive stars and high-upside picks
-            if p.price >= 9:
-                base *= 1.5  # premium player boost
-            elif p.price >= 7:
-                base *= 1.2
-            if p.risk_level == "high":
-                base *= 1.3
-            if p.confidence == "low":
-                base *= 1.4  # differential boost
-            # Favor attacking players
-            if p.position in (Position.FWD, Position.MID):
-                base *= 1.15
-        return base
-
-    # Objective: maximize total expected points
-    prob += lpSum(adjusted_points(p) * x[p.player_id] for p in players)
-
-    # Budget constraint
-    prob += lpSum(p.price * x[p.player_id] for p in players) <= constraints.budget
-
-    # Squad size
-    prob += lpSum(x[p.player_id] for p in players) == constraints.squad_size
-
-    # Position constraints
+    base = table.expected_points.astype(np.float64)
+    if risk_profile == "safe":
+        # Pure value-per-million strategy with consistency bonus
+        # Favor proven, high-confidence, low-risk starters
+        ppm = table.points_per_million
+        base = ppm * table.price  # reset to base
+        base = np.where(table.confidence == "high", base * 1.4,
+                        np.where(table.confidence == "medium", base * 1.0, base * 0.4))
+        base = np.where(table.risk_level == "high", base * 0.2,
+                        np.where(table.risk_level == "medium", base * 0.7, base))
+        # Prefer cheaper reliable players
+        base = base + ppm * 0.5
+    elif risk_profile == "aggressive":
+        # High-ceiling differential strategy
+        # Favor expensive stars and high-upside picks
+        price = table.price
+        base = np.where(price >= 9, base * 1.5, np.where(price >= 7, base * 1.2, base))  # premium boost
+        base = np.where(table.risk_level == "high", base * 1.3, base)
+        base = np.where(table.confidence == "low", base * 1.4, base)  # differential boost
+        # Favor attacking players
+        attacking = (table.position == Position.FWD.value) | (table.position == Position.MID.value)
+        base = np.where(attacking, base * 1.15, base)
+    return base
+
+
+RISK_PROFILES = ("safe", "balanced", "aggressive")
+
+# Starting XI formation bounds (min, max) per position
+FORMATION_BOUNDS = {
+    Position.GK: (1, 1),
+    Position.DEF: (3, 5),
+    Position.MID: (2, 5),
+    Position.FWD: (1, 3),
+}
+# Objective weight of a bench player's points, by outfield bench priority (1st sub first)
+BENCH_WEIGHTS = (0.10, 0.05, 0.02)
+BENCH_GK_WEIGHT = 0.02
+
+
+def prune_dominated(table: PredictionTable, rows: np.ndarray, constraints: SquadConstraints) -> np.ndarray:
+    """
+    Rows that can still be in an optimal squad for every risk profile and budget.
+
+    Within a position, d dominates c when it costs no more and weighs at least
+    as much under every risk profile (ties broken by a fixed order). Swapping
+    c for an unused dominator keeps the objective, budget and formation, and
+    the club limit when d is from c's club or from a club that isn't full.
+    At most count-1 dominators are in the squad and at most
+    (squad_size-1) // max_per_club other clubs are full, so c is dropped
+    when its same-club dominators plus the distinct other clubs among its
+    dominators reach count + that many full clubs.
+    """
+    if not len(rows):
+        return rows
+    weights = np.stack([adjusted_points(table, profile)[rows] for profile in RISK_PROFILES])
+    price = table.price[rows]
+    _, club = np.unique(table.club[rows].astype(str), return_inverse=True)
+    full_clubs = (constraints.squad_size - 1) // constraints.max_per_club
+    keep = np.ones(len(rows), dtype=bool)
     for pos, count in [
         (Position.GK, constraints.gk_count),
         (Position.DEF, constraints.def_count),
         (Position.MID, constraints.mid_count),
         (Position.FWD, constraints.fwd_count),
     ]:
-        prob += lpSum(x[p.player_id] for p in players if p.position == pos) == count
+        members = np.flatnonzero(table.position[rows] == pos.value)
+        order = members[np.lexsort((table.player_id[rows][members], price[members], -weights[:, members].sum(axis=0)))]
+        w, p, cl = weights[:, order], price[order], club[order]
+        dominates = np.tri(len(order), k=-1, dtype=bool) & (p[None, :] <= p[:, None])
+        for wp in w:
+            dominates &= wp[None, :] >= wp[:, None]
+        same_club = cl[None, :] == cl[:, None]
+        other_clubs = ((dominates & ~same_club).astype(np.int32) @ np.eye(club.max() + 1, dtype=np.int32)[cl]) > 0
+        usable = (dominates & same_club).sum(axis=1) + other_clubs.sum(axis=1)
+        keep[order[usable >= count + full_clubs]] = False
+    return rows[keep]
+
+
+class SquadModel:
+    """
+    Squad, starting XI, captain and bench order in one ILP, built once per
+    prediction set and re-solved.
+
+    Per player: x (in squad), s (starts), c (captain) and, for outfield
+    players, b[k] (k-th bench priority). Objective: XI points + captain
+    bonus + bench points weighted by priority. Only the objective
+    coefficients and the budget RHS depend on the risk profile / budget, so
+    solve() swaps those and warm-starts CBC from the previous solution.
+    Solves are serialised: the model is shared between requests.
+    """
 
-    # Club limit
-    clubs = set(p.club for p in players)
-    for club in clubs:
-        prob += lpSum(x[p.player_id] for p in players if p.club == club) <= constraints.max_per_club
+    def __init__(self, predictions: PredictionTable | list[Prediction],
+                 constraints: SquadConstraints = SquadConstraints(), prune: bool = True):
+        table = predictions if isinstance(predictions, PredictionTable) else PredictionTable.from_predictions(predictions)
+        self.table = table
+        self.constraints = constraints
+        self._lock = threading.Lock()
+        self._weights = {}  # risk_profile -> adjusted_points column
+        self._ilp_bounds = {}  # (risk_profile, budget) -> last MILP bound, to grade fast solves
 
-    # Solve
-    prob.solve()
+        # Filter out unavailable, then players that can't be in an optimal squad
+        # (keep them all to enumerate squads beyond the optimum: solve_top)
+        available = np.flatnonzero(table.expected_points > 0)
+        self.rows = prune_dominated(table, available, constraints) if prune else available
+        self.pool = {"available": len(available), "kept": len(self.rows)}
+        self.outfield = [i for i in self.rows if table.position[i] != Position.GK.value]
+        self.keepers = [i for i in self.rows if table.position[i] == Position.GK.value]
+        prob = LpProblem("UCL_Fantasy_Squad", LpMaximize)
 
-    if LpStatus[prob.status] != "Optimal":
-        return None
+        def binary(prefix, i):
+            return LpVariable(f"{prefix}_{table.player_id[i]}", cat="Binary")
 
-    # Extract squad
-    squad = [p for p in players if x[p.player_id].varValue == 1]
-    squad.sort(key=lambda p: (-adjusted_points(p)))
+        x = {i: binary("x", i) for i in self.rows}
+        s = {i: binary("s", i) for i in self.rows}
+        c = {i: binary("c", i) for i in self.rows}
+        b = [{i: binary(f"b{k}", i) for i in self.outfield} for k in range(len(BENCH_WEIGHTS))]
 
-    # Pick starting XI (best 11 with valid formation: 1 GK, 3+ DEF, 2+ MID, 1+ FWD)
-    starting_xi = _pick_starting_xi(squad)
-    bench = [p for p in squad if p not in starting_xi]
+        # Budget constraint (RHS updated per solve)
+        prob += lpSum(float(table.price[i]) * x[i] for i in self.rows) <= constraints.budget, "budget"
 
-    # Captain = highest expected points in starting XI
-    captain = max(starting_xi, key=lambda p: p.expected_points)
+        # Squad size, XI size, one captain
+        prob += lpSum(x.values()) == constraints.squad_size, "squad_size"
+        prob += lpSum(s.values()) == constraints.starters, "xi_size"
+        prob += lpSum(c.values()) == 1, "captain"
+
+        # Starters come from the squad, the captain from the starters; every
+        # outfield squad player either starts or takes exactly one bench slot
+        for i in self.rows:
+            prob += s[i] <= x[i]
+            prob += c[i] <= s[i]
+        for i in self.outfield:
+            prob += s[i] + lpSum(slot[i] for slot in b) == x[i]
+        for k, slot in enumerate(b):
+            prob += lpSum(slot.values()) == 1, f"bench_{k + 1}"
+
+        # Squad composition and XI formation, grouped in one pass
+        by_pos, by_club = {}, {}
+        for i in self.rows:
+            by_pos.setdefault(table.position[i], []).append(i)
+            by_club.setdefault(table.club[i], []).append(x[i])
+        for pos, count in [
+            (Position.GK, constraints.gk_count),
+            (Position.DEF, constraints.def_count),
+            (Position.MID, constraints.mid_count),
+            (Position.FWD, constraints.fwd_count),
+        ]:
+            members = by_pos.get(pos.value, [])
+            lo, hi = FORMATION_BOUNDS[pos]
+            prob += lpSum(x[i] for i in members) == count, f"pos_{pos.value}"
+            prob += lpSum(s[i] for i in members) >= lo, f"xi_min_{pos.value}"
+            prob += lpSum(s[i] for i in members) <= hi, f"xi_max_{pos.value}"
+        for n, members in enumerate(by_club.values()):
+            prob += lpSum(members) <= constraints.max_per_club, f"club_{n}"
+
+        self.prob = prob
+        self.x, self.s, self.c, self.b = x, s, c, b
+
+    def weights(self, risk_profile: str) -> np.ndarray:
+        if risk_profile not in self._weights:
+            self._weights[risk_profile] = adjusted_points(self.table, risk_profile)
+        return self._weights[risk_profile]
+
+    def objective(self, weight: np.ndarray):
+        """XI + captain bonus + priority-weighted bench (bench GK = squad GK not starting)."""
+        w = {i: float(weight[i]) for i in self.rows}
+        return lpSum(
+            [w[i] * (self.s[i] + self.c[i]) for i in self.rows]
+            + [bw * w[i] * slot[i] for bw, slot in zip(BENCH_WEIGHTS, self.b) for i in self.outfield]
+            + [BENCH_GK_WEIGHT * w[i] * (self.x[i] - self.s[i]) for i in self.keepers]
+        )
+
+    def solve(self, risk_profile: str = "balanced", budget: float | None = None,
+              solver: SolverConfig = SolverConfig()) -> OptimizedSquad | None:
+        weight = self.weights(risk_profile)
+        budget = self.constraints.budget if budget is None else budget
+        if resolve_backend(solver.backend) == "python":
+            rows, stats = fast_squad(self.table, self.rows, weight, self.constraints, budget)
+            ilp_bound = self._ilp_bounds.get((risk_profile, budget))
+            if rows and ilp_bound is not None and ilp_bound < stats.bound:
+                stats.bound, stats.bound_source = ilp_bound, "ilp"
+                stats.gap = relative_gap(stats.objective, ilp_bound)
+        else:
+            with self._lock:
+                self._prepare(weight, budget)
+                rows, stats = self._solve_rows(solver)
+            if stats.bound is not None:
+                self._ilp_bounds[(risk_profile, budget)] = stats.bound
+        return _build_squad(self.table, *rows, weight, stats) if rows else None
+
+    def solve_top(self, k: int, min_difference: int = 1, risk_profile: str = "balanced",
+                  budget: float | None = None, solver: SolverConfig = SolverConfig()) -> list[OptimizedSquad]:
+        """
+        Up to k best distinct squads, best first, each differing from every
+        earlier one by at least min_difference players. After each solve a
+        no-good cut (sum of x over that squad <= squad_size - min_difference)
+        is added to this model and the next solve continues from it; the cuts
+        are removed before returning. Fewer than k if the cuts leave no
+        feasible squad. Exact only on a model built with prune=False: the
+        runners-up may use dominated players. Needs an MILP backend.
+        """
+        if resolve_backend(solver.backend) == "python":
+            raise ValueError("Alternative squads need an MILP solver backend")
+        weight = self.weights(risk_profile)
+        found = []
+        with self._lock:
+            self._prepare(weight, self.constraints.budget if budget is None else budget)
+            cuts = []
+            try:
+                while len(found) < k:
+                    rows, stats = self._solve_rows(solver)
+                    if not rows:
+                        break
+                    found.append((rows, stats))
+                    name = f"nogood_{len(cuts)}"
+                    self.prob += (lpSum(self.x[i] for i in rows[0])
+                                  <= self.constraints.squad_size - min_difference), name
+                    cuts.append(name)
+            finally:
+                for name in cuts:
+                    del self.prob.constraints[name]
+        return [_build_squad(self.table, *rows, weight, stats) for rows, stats in found]
+
+    def frontier(self, budgets, risk_profile: str = "balanced",
+                 solver: SolverConfig = SolverConfig()) -> list[FrontierPoint]:
+        """
+        Best squad at every budget, ascending. Budgets are swept from the
+        top: a squad costing c that is proven optimal at budget B is optimal
+        for every budget in [c, B], so only budgets below its cost need
+        another solve, warm-started from the fast squad that fits. A squad
+        found for a lower budget is affordable at every higher one, so a
+        time-limited or fast solve never reports less than it: the curve is
+        nondecreasing.
+        """
+        points, last = {}, None  # last: (budget solved at, result)
+        for budget in sorted(set(budgets), reverse=True):
+            if last and last[1].solve_stats.status == "optimal" and last[1].total_cost <= budget + 1e-9:
+                points[budget] = FrontierPoint(budget, last[1], last[0])
+                continue
+            result = self.solve(risk_profile, budget, solver)
+            points[budget] = FrontierPoint(budget, result, budget if result else None)
+            if result:
+                last = (budget, result)
+
+        curve, best = [], None
+        for budget in sorted(points):
+            point = points[budget]
+            if point.squad and (best is None or point.squad.solve_stats.objective >= best.squad.solve_stats.objective):
+                best = point
+            curve.append(FrontierPoint(budget, best.squad, best.solved_at) if best else point)
+        return curve
+
+    def _prepare(self, weight: np.ndarray, budget: float):
+        self.prob.setObjective(self.objective(weight))
+        self.prob.constraints["budget"].changeRHS(budget)
+        current = [i for i in self.rows if self.x[i].varValue is not None and self.x[i].varValue > 0.5]
+        if not current or float(self.table.price[current].sum()) > budget + 1e-9:
+            self._seed(weight, budget)
+
+    def _seed(self, weight: np.ndarray, budget: float):
+        """Start from the fast squad when there's no previous solution or it no longer fits the budget."""
+        rows, _ = fast_squad(self.table, self.rows, weight, self.constraints, budget)
+        if not rows:
+            return
+        squad, xi, captain, bench = (set(rows[0]), set(rows[1]), rows[2], rows[3])
+        for i in self.rows:
+            self.x[i].setInitialValue(int(i in squad))
+            self.s[i].setInitialValue(int(i in xi))
+            self.c[i].setInitialValue(int(i == captain))
+        for k, slot in enumerate(self.b):
+            for i in self.outfield:
+                slot[i].setInitialValue(int(k < len(bench) and bench[k] == i))
+
+    def _solve_rows(self, solver: SolverConfig):
+        """Solve as set up: ((squad, xi, captain, bench) rows or None, stats). Lock held."""
+        # The variables' current values (the previous solution, or the fast
+        # squad if that no longer fits) are the warm start
+        stats = solve_milp(self.prob, solver, warm_start=True)
+        if not stats.has_solution:
+            return None, stats
+
+        def picked(var):
+            return var.varValue is not None and var.varValue > 0.5
+
+        squad = [i for i in self.rows if picked(self.x[i])]
+        xi = [i for i in squad if picked(self.s[i])]
+        captain = next(i for i in xi if picked(self.c[i]))
+        bench = [i for slot in self.b for i in self.outfield if picked(slot[i])]
+        bench += [i for i in squad if i in self.keepers and not picked(self.s[i])]
+        return (squad, xi, captain, bench), stats
+
+
+def _pick_lineup(table: PredictionTable, squad_rows, weight: np.ndarray, starters: int = 11):
+    """Best XI by weight within FORMATION_BOUNDS, captain, and bench (outfield by weight, then GK)."""
+    squad_rows = list(squad_rows)
+    position = dict(zip(squad_rows, table.position[squad_rows].tolist()))
+    by_weight = sorted(squad_rows, key=lambda i: -weight[i])
+    xi = []
+    for pos, (lo, _) in FORMATION_BOUNDS.items():
+        xi += [i for i in by_weight if position[i] == pos.value][:lo]
+    room = {pos.value: hi - lo for pos, (lo, hi) in FORMATION_BOUNDS.items()}
+    for i in by_weight:
+        if len(xi) == starters:
+            break
+        if i not in xi and room[position[i]] > 0:
+            xi.append(i)
+            room[position[i]] -= 1
+    captain = max(xi, key=lambda i: weight[i])
+    bench = [i for i in by_weight if i not in xi and position[i] != Position.GK.value]
+    bench += [i for i in by_weight if i not in xi and position[i] == Position.GK.value]
+    return xi, captain, bench
+
+
+def _lineup_value(xi, captain, bench, weight: np.ndarray) -> float:
+    """SquadModel's objective for a picked lineup."""
+    outfield_bench = bench[:len(BENCH_WEIGHTS)]
+    return float(sum(weight[i] for i in xi) + weight[captain]
+                 + sum(bw * weight[i] for bw, i in zip(BENCH_WEIGHTS, outfield_bench))
+                 + sum(BENCH_GK_WEIGHT * weight[i] for i in bench[len(BENCH_WEIGHTS):]))
+
+
+FAST_BISECTION_STEPS = 20
+FAST_MAX_SWAPS = 50
+
+
+def fast_squad(table: PredictionTable, rows: np.ndarray, weight: np.ndarray,
+               constraints: SquadConstraints, budget: float):
+    """
+    In-process squad heuristic (the "python" backend, fast mode): a few ms,
+    no solver process.
+
+    Relaxing the budget with a price multiplier lam makes every position
+    independent: its starters are its top players by weight - lam*price and
+    its bench the top by bench weight - lam*price, for the best formation.
+    Bisection finds the smallest lam whose squad fits the budget; club
+    limits are then repaired by the cheapest-loss swaps and the squad is
+    improved by single and two-swap moves into the leftover budget.
+
+    Each lam also bounds the MILP optimum from above (clubs relaxed, every
+    bench player at the top bench weight, the best player as captain), so
+    the result comes with a gap. Returns ((squad, xi, captain, bench) rows
+    or None, stats).
+    """
+    started = time.perf_counter()
+    counts = {Position.GK.value: constraints.gk_count, Position.DEF.value: constraints.def_count,
+              Position.MID.value: constraints.mid_count, Position.FWD.value: constraints.fwd_count}
+    outfield_starters = constraints.starters - FORMATION_BOUNDS[Position.GK][0]
+    (d_lo, d_hi), (m_lo, m_hi), (f_lo, f_hi) = (FORMATION_BOUNDS[p] for p in (Position.DEF, Position.MID, Position.FWD))
+    formations = [
+        {Position.GK.value: FORMATION_BOUNDS[Position.GK][0], Position.DEF.value: d,
+         Position.MID.value: m, Position.FWD.value: outfield_starters - d - m}
+        for d in range(d_lo, d_hi + 1) for m in range(m_lo, m_hi + 1)
+        if f_lo <= outfield_starters - d - m <= f_hi
+    ]
+    by_pos = {pos: rows[table.position[rows] == pos] for pos in counts}
+    if any(len(by_pos[pos]) < n for pos, n in counts.items()):
+        return None, SolveStats("python", "infeasible", round(time.perf_counter() - started, 3))
+    bench_weight = {pos: BENCH_GK_WEIGHT if pos == Position.GK.value else BENCH_WEIGHTS[0] for pos in counts}
+    captain_bound = float(weight[rows].max())
+    columns = {pos: (members, weight[members], table.price[members]) for pos, members in by_pos.items()}
+
+    def relaxed(lam):
+        """(squad rows, cost) of the best formation at lam, and the upper bound it gives."""
+        picks, best = {}, None
+        for pos, (members, w, p) in columns.items():
+            start_key, bench_key = w - lam * p, bench_weight[pos] * w - lam * p
+            start_order, bench_order = np.argsort(-start_key, kind="stable"), np.argsort(-bench_key, kind="stable")
+            picks[pos] = (members, start_order, bench_order,
+                          np.concatenate(([0.0], np.cumsum(start_key[start_order]))),
+                          np.concatenate(([0.0], np.cumsum(bench_key[bench_order]))))
+        for formation in formations:
+            value = sum(picks[pos][3][a] + picks[pos][4][counts[pos] - a] for pos, a in formation.items())
+            if best is None or value > best[0]:
+                best = (value, formation)
+        value, formation = best
+        squad = []
+        for pos, a in formation.items():
+            members, start_order, bench_order = picks[pos][:3]
+            starters = members[start_order[:a]]
+            taken = set(starters.tolist())
+            bench = [i for i in members[bench_order].tolist() if i not in taken][:counts[pos] - a]
+            squad += starters.tolist() + bench
+        return squad, float(table.price[squad].sum()), lam * budget + value + captain_bound
+
+    squad, cost, bound = relaxed(0.0)
+    if cost > budget:
+        lo, hi = 0.0, 1.0
+        while True:
+            squad, cost, ub = relaxed(hi)
+            bound = min(bound, ub)
+            if cost <= budget:
+                break
+            if hi > 1e6:
+                return None, SolveStats("python", "infeasible", round(time.perf_counter() - started, 3))
+            lo, hi = hi, hi * 2
+        for _ in range(FAST_BISECTION_STEPS):
+            mid = (lo + hi) / 2
+            candidate, mid_cost, ub = relaxed(mid)
+            bound = min(bound, ub)
+            if mid_cost <= budget:
+                hi, squad, cost = mid, candidate, mid_cost
+            else:
+                lo = mid
+
+    squad = _repair_clubs(table, rows, weight, constraints, budget, squad)
+    if squad is None:
+        return None, SolveStats("python", "no_solution", round(time.perf_counter() - started, 3))
+    squad = _improve_by_swaps(table, rows, weight, constraints, budget, squad)
+    xi, captain, bench = _pick_lineup(table, squad, weight, constraints.starters)
+    objective = _lineup_value(xi, captain, bench, weight)
+    stats = SolveStats("python", "feasible", round(time.perf_counter() - started, 3),
+                       gap=relative_gap(objective, bound), objective=round(objective, 4),
+                       bound=round(bound, 4), bound_source="lagrangian")
+    return (squad, xi, captain, bench), stats
+
+
+def _repair_clubs(table, rows, weight, constraints, budget, squad):
+    """
+    Swap players out of over-limit clubs, losing as little weight as possible.
+    When no swap fits the money left, the cheapest replacement is taken and
+    the overspend won back by downgrades (_repair_budget). None if stuck.
+    """
+    squad = list(squad)
+    price, position, club = table.price[rows], table.position[rows], table.club[rows]
+    for _ in range(constraints.squad_size):
+        clubs, n = np.unique(table.club[squad].astype(str), return_counts=True)
+        over = clubs[n > constraints.max_per_club]
+        if not len(over):
+            return _repair_budget(table, rows, weight, constraints, budget, squad)
+        full = clubs[n >= constraints.max_per_club]
+        open_ = ~np.isin(rows, squad) & ~np.isin(club.astype(str), full)
+        slack = budget - float(table.price[squad].sum())
+        best, cheapest = None, None
+        for o in (i for i in squad if table.club[i] == over[0]):
+            same = open_ & (position == table.position[o])
+            mask = same & (price <= slack + table.price[o])
+            if mask.any():
+                i = rows[mask][np.argmax(weight[rows[mask]])]
+                if best is None or weight[o] - weight[i] < best[0]:
+                    best = (weight[o] - weight[i], o, i)
+            elif same.any():
+                i = rows[same][np.argmin(price[same])]
+                if cheapest is None or table.price[i] - table.price[o] < cheapest[0]:
+                    cheapest = (table.price[i] - table.price[o], o, i)
+        best = best or cheapest
+        if best is None:
+            return None
+        squad[squad.index(best[1])] = best[2]
+    return None
+
+
+def _repair_budget(table, rows, weight, constraints, budget, squad):
+    """Downgrades until the squad fits the budget, least weight lost per million saved first. None if stuck."""
+    price, position, club = table.price[rows], table.position[rows], table.club[rows].astype(str)
+    for _ in range(constraints.squad_size):
+        over = float(table.price[squad].sum()) - budget
+        if over <= 1e-9:
+            return squad
+        clubs, n = np.unique(table.club[squad].astype(str), return_counts=True)
+        full = clubs[n >= constraints.max_per_club]
+        free = ~np.isin(rows, squad)
+        best = None
+        for o in squad:
+            mask = free & (position == table.position[o]) & (price < table.price[o]) & (
+                ~np.isin(club, full) | (club == str(table.club[o])))
+            if not mask.any():
+                continue
+            # Per candidate: weight lost per million saved (a full fix counts the overspend only)
+            saved = np.minimum(table.price[o] - price[mask], over)
+            rate = (weight[o] - weight[rows[mask]]) / saved
+            k = np.argmin(rate)
+            if best is None or rate[k] < best[0]:
+                best = (rate[k], o, rows[mask][k])
+        if best is None:
+            return None
+        squad[squad.index(best[1])] = best[2]
+    return None
+
+
+FAST_CHAIN_EVALS = 4  # two-swap moves scored exactly per pass
+
+
+def _improve_by_swaps(table, rows, weight, constraints, budget, squad):
+    """
+    Local search until no move improves the objective: the best single swap
+    per player, and two-swap chains where an upgrade blocked by its club's
+    limit or the budget is paired with a second swap that frees the club
+    slot or the money. Chains are ranked by the players' current roles
+    (starter, captain, bench slot) and only the best few are scored exactly.
+    """
+    squad = list(squad)
+    price, position, w = table.price[rows], table.position[rows], weight[rows]
+    _, code = np.unique(table.club[rows].astype(str), return_inverse=True)
+    at = {int(r): k for k, r in enumerate(rows)}  # table row -> index into rows
+
+    def value(candidate):
+        return _lineup_value(*_pick_lineup(table, candidate, weight, constraints.starters), weight)
+
+    current = value(squad)
+    for _ in range(FAST_MAX_SWAPS):
+        xi, captain, bench = _pick_lineup(table, squad, weight, constraints.starters)
+        role = {i: 1.0 for i in xi}
+        role[captain] = 2.0
+        role.update(zip(bench[:len(BENCH_WEIGHTS)], BENCH_WEIGHTS))
+        role.update((i, BENCH_GK_WEIGHT) for i in bench[len(BENCH_WEIGHTS):])
+        members = np.array([at[i] for i in squad])
+        free = np.ones(len(rows), dtype=bool)
+        free[members] = False
+        counts = np.bincount(code[members], minlength=code.max() + 1)
+        slack = budget - float(price[members].sum())
+
+        singles, chains = [], []
+        for o in squad:
+            ko = at[o]
+            better = free & (position == position[ko]) & (w > w[ko])
+            fits = better & ((counts[code] < constraints.max_per_club) | (code == code[ko])) & (price <= slack + price[ko])
+            if fits.any():
+                singles.append((o, int(rows[fits][np.argmax(w[fits])])))
+            blocked = better & ~fits
+            if not blocked.any():
+                continue
+            ki = np.flatnonzero(blocked)[np.argmax(w[blocked])]
+            # Second leg, for every other squad player at once: counts and money after both legs
+            others = members[members != ko]
+            after = counts.copy()
+            after[code[ki]] += 1
+            after[code[ko]] -= 1
+            if after[code[ki]] > constraints.max_per_club and not (code[others] == code[ki]).any():
+                continue
+            money = slack + price[ko] - price[ki] + price[others]
+            club_ok = after[code][None, :] - (code[None, :] == code[others][:, None]) < constraints.max_per_club
+            frees_club = (after[code[ki]] <= constraints.max_per_club) | (code[others] == code[ki])
+            mask = (free[None, :] & (np.arange(len(rows)) != ki)[None, :]
+                    & (position[None, :] == position[others][:, None])
+                    & (price[None, :] <= money[:, None]) & club_ok & frees_club[:, None])
+            has = mask.any(axis=1)
+            if not has.any():
+                continue
+            best2 = np.where(mask, w[None, :], -np.inf).argmax(axis=1)
+            for k2 in np.flatnonzero(has):
+                ko2, ki2 = others[k2], best2[k2]
+                o2 = int(rows[ko2])
+                estimate = role[o] * (w[ki] - w[ko]) + role[o2] * (w[ki2] - w[ko2])
+                chains.append((estimate, o, int(rows[ki]), o2, int(rows[ki2])))
+
+        best = None
+        for o, i in singles:
+            candidate = [i if j == o else j for j in squad]
+            gain = value(candidate) - current
+            if gain > 1e-9 and (best is None or gain > best[0]):
+                best = (gain, candidate)
+        for _, o, i, o2, i2 in sorted(chains, reverse=True)[:FAST_CHAIN_EVALS]:
+            candidate = [i if j == o else i2 if j == o2 else j for j in squad]
+            gain = value(candidate) - current
+            if gain > 1e-9 and (best is None or gain > best[0]):
+                best = (gain, candidate)
+        if best is None:
+            break
+        current += best[0]
+        squad = best[1]
+    return squad
+
+
+def optimize_squad(
+    predictions: PredictionTable | list[Prediction],
+    constraints: SquadConstraints = SquadConstraints(),
+    risk_profile: str = "balanced",  # safe, balanced, aggressive
+) -> OptimizedSquad | None:
+    """
+    Find optimal squad, XI, captain and bench order (see adjusted_points for
+    risk profiles). One-off solve; keep a SquadModel to re-solve the same
+    prediction set.
+    """
+    return SquadModel(predictions, constraints).solve(risk_profile)
+
+
+def optimize_squads(
+    predictions: PredictionTable | list[Prediction],
+    k: int,
+    constraints: SquadConstraints = SquadConstraints(),
+    risk_profile: str = "balanced",
+    min_difference: int = 1,
+) -> list[OptimizedSquad]:
+    """K best distinct squads (see SquadModel.solve_top)."""
+    return SquadModel(predictions, constraints, prune=False).solve_top(k, min_difference, risk_profile)
+
+
+def _build_squad(table: PredictionTable, squad_rows, xi_rows, captain_row, bench_rows,
+                 weight: np.ndarray, stats: SolveStats | None = None) -> OptimizedSquad:
+    """OptimizedSquad from the solved rows; only these become Prediction objects."""
+    preds = {i: table.prediction(i) for i in squad_rows}
+    squad = [preds[i] for i in sorted(squad_rows, key=lambda i: -weight[i])]
+    starting_xi = [preds[i] for i in sorted(xi_rows, key=lambda i: -weight[i])]
+    bench = [preds[i] for i in bench_rows]  # outfield in sub priority, then GK
+    captain = preds[captain_row]
 
     # Determine formation
     def_count = sum(1 for p in starting_xi if p.position == Position.DEF)
@@ -143,35 +667,5 @@ def optimize_squad(
         total_expected=round(total_exp, 2),
         total_cost=round(total_cost, 2),
         formation=formation,
+        solve_stats=stats,
     )
-
-
-def _pick_starting_xi(squad: list[Prediction]) -> list[Prediction]:
-    """Pick best 11 from 15 satisfying min formation: 1 GK, 3 DEF, 2 MID, 1 FWD."""
-    by_pos = {pos: [] for pos in Position}
-    for p in squad:
-        by_pos[p.position].append(p)
-
-    for pos in by_pos:
-        by_pos[pos].sort(key=lambda p: -p.expected_points)
-
-    # Mandatory minimums
-    xi = []
-    xi.append(by_pos[Position.GK][0])  # 1 GK
-    xi.extend(by_pos[Position.DEF][:3])  # 3 DEF
-    xi.extend(by_pos[Position.MID][:2])  # 2 MID
-    xi.extend(by_pos[Position.FWD][:1])  # 1 FWD
-
-    # Fill remaining 4 spots with best available (max 1 GK in XI)
-    remaining = [p for p in squad if p not in xi]
-    remaining.sort(key=lambda p: -p.expected_points)
-
-    for p in remaining:
-        if len(xi) >= 11:
-            break
-        # Don't add second GK to starting XI
-        if p.position == Position.GK:
-            continue
-        xi.append(p)
-
-    return xi
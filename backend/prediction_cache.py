@@ -0,0 +1,154 @@
+"""
+In-process cache for prediction results.
+
+Predictions only change when players, fixtures, match_stats or snapshots
+change, so results are cached per (key, data version). Every write path
+that touches those tables calls bump_data_version() after its commit,
+which drops all cached entries at once. Each cache is a bounded LRU.
+Writes that only touch a few fixtures can patch entries forward instead.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_SIZE", "8"))
+
+_version_lock = threading.Lock()
+_data_version = 0
+_caches = []  # every VersionedCache, cleared on bump
+
+
+def data_version() -> int:
+    return _data_version
+
+
+def bump_data_version(patches: dict | None = None) -> int:
+    """Invalidate all cached predictions. Call after the write has committed.
+
+    patches maps a VersionedCache to patch(key, value) -> value | None. That
+    cache's entries are patched forward to the new version instead of being
+    dropped (None drops the entry); use it when a write touches few rows.
+    """
+    global _data_version
+    patches = patches or {}
+    with _version_lock:
+        old = _data_version
+        _data_version += 1
+        version = _data_version
+    carried = {}
+    for cache in _caches:
+        if cache in patches:
+            carried[cache] = cache.take(old)
+        else:
+            cache.clear()
+    for cache, entries in carried.items():
+        for key, entry in entries:
+            value = patches[cache](key, entry.value)
+            if value is not None:
+                cache.put(key, value, version)
+    return version
+
+
+class CachedResult:
+    """A cached value plus its JSON encoding, built on first use.
+
+    Values that aren't plain JSON (e.g. HorizonMatrix) encode via to_dict().
+    """
+    __slots__ = ("value", "_json", "_derived")
+
+    def __init__(self, value):
+        self.value = value
+        self._json = None
+        self._derived = {}
+
+    def derived(self, name: str, build):
+        """build(value), computed once per entry (e.g. a columnar view)."""
+        result = self._derived.get(name)
+        if result is None:
+            result = self._derived[name] = build(self.value)
+        return result
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            # Same encoding FastAPI's JSONResponse uses
+            value = self.value.to_dict() if hasattr(self.value, "to_dict") else self.value
+            self._json = json.dumps(
+                value, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode("utf-8")
+        return self._json
+
+
+class VersionedCache:
+    """Bounded LRU of CachedResult keyed by (key, data version)."""
+
+    def __init__(self, name: str, max_entries: int = MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        _caches.append(self)
+
+    def get_or_compute(self, key, compute) -> CachedResult:
+        """Cached result for key, computing (outside the lock) on a miss.
+
+        The value is shared between callers: treat it as read-only.
+        """
+        version = _data_version
+        full_key = (key, version)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = CachedResult(compute())
+
+        with self._lock:
+            # A write landed while computing: the result may be stale, don't keep it
+            if version == _data_version:
+                self._store(full_key, entry)
+        return entry
+
+    def _store(self, full_key, entry: CachedResult):
+        self._entries[full_key] = entry
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, value, version: int):
+        """Store value for key at version, unless a newer write already landed."""
+        with self._lock:
+            if version == _data_version:
+                self._store((key, version), CachedResult(value))
+
+    def take(self, version: int) -> list[tuple]:
+        """Remove every entry and return (key, entry) for those at version."""
+        with self._lock:
+            entries = [(k, e) for (k, v), e in self._entries.items() if v == version]
+            self._entries.clear()
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+predictions_cache = VersionedCache("predictions")
+distributions_cache = VersionedCache("distributions", max_entries=4)
+horizon_cache = VersionedCache("horizon", max_entries=4)
@@ -0,0 +1,177 @@
+"""
+Bulk loader for everything the predictor needs for one matchday.
+
+get_predictions used to run ~3 queries per player (form window, snapshot,
+match_stats actual). This loads the same data in a fixed number of queries
+and hands it over as in-memory maps keyed by player id.
+"""
+
+from dataclasses import dataclass, field
+
+from scoring import Position
+from predictor import PlayerProfile, FixtureInfo
+
+FORM_WINDOW = 5  # last N matchdays with match_stats
+
+
+@dataclass
+class PredictionContext:
+    matchday: dict
+    players: list  # sqlite3.Row from players
+    club_fixtures: dict[str, FixtureInfo] = field(default_factory=dict)  # club name/code -> fixture
+    played_clubs: set[str] = field(default_factory=set)
+    form: dict[int, tuple[float, float, int]] = field(default_factory=dict)  # pid -> (avg_pts, avg_min, n)
+    snapshot_points: dict[int, int] = field(default_factory=dict)  # pid -> matchday_points
+    stats_points: dict[int, int] = field(default_factory=dict)  # pid -> match_stats fantasy_points
+
+    def fixture_for(self, p) -> FixtureInfo | None:
+        return self.club_fixtures.get(p["club"]) or self.club_fixtures.get(p["club_code"] or "")
+
+    def is_played(self, p) -> bool:
+        code = p["club_code"]
+        return p["club"] in self.played_clubs or bool(code and code in self.played_clubs)
+
+    def actual_points(self, player_id: int, is_played: bool) -> int | None:
+        """Snapshot points win; match_stats only count once the fixture is played."""
+        snap = self.snapshot_points.get(player_id)
+        if snap is not None:
+            return snap
+        if is_played:
+            return self.stats_points.get(player_id)
+        return None
+
+
+def load_fixtures(conn, matchday) -> tuple[dict[str, FixtureInfo], set[str]]:
+    """Club name/code -> FixtureInfo for a matchday, plus clubs already played."""
+    is_knockout = matchday["stage"] != "league_phase"
+    club_fixtures = {}
+    played_clubs = set()
+    for f in conn.execute("SELECT * FROM fixtures WHERE matchday_id = ?", (matchday["id"],)):
+        home_name, away_name = f["home_club"], f["away_club"]
+        home_code, away_code = f["home_code"] or "", f["away_code"] or ""
+
+        if (f["status"] or "scheduled") == "played":
+            played_clubs.update(c for c in (home_name, away_name, home_code, away_code) if c)
+
+        home_fix = FixtureInfo(
+            opponent_club=away_name,
+            opponent_strength=f["away_strength"],
+            is_home=True,
+            is_knockout=is_knockout,
+        )
+        away_fix = FixtureInfo(
+            opponent_club=home_name,
+            opponent_strength=f["home_strength"],
+            is_home=False,
+            is_knockout=is_knockout,
+        )
+        club_fixtures[home_name] = home_fix
+        club_fixtures[away_name] = away_fix
+        if home_code:
+            club_fixtures[home_code] = home_fix
+        if away_code:
+            club_fixtures[away_code] = away_fix
+    return club_fixtures, played_clubs
+
+
+def _id_filter(column: str, ids) -> tuple[str, list]:
+    """SQL condition and params restricting column to ids (no-op for None)."""
+    if ids is None:
+        return "1", []
+    ids = list(ids)
+    return f"{column} IN ({','.join('?' * len(ids))})", ids
+
+
+def load_form(conn, player_ids=None) -> dict[int, tuple[float, float, int]]:
+    """Last-FORM_WINDOW form for every player (or player_ids) in one window-function query."""
+    where, params = _id_filter("player_id", player_ids)
+    rows = conn.execute(f"""
+        SELECT player_id, SUM(fantasy_points) AS pts, SUM(minutes) AS mins, COUNT(*) AS n
+        FROM (
+            SELECT player_id, fantasy_points, minutes,
+                   ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY matchday_id DESC) AS rn
+            FROM match_stats
+            WHERE {where}
+        )
+        WHERE rn <= {FORM_WINDOW}
+        GROUP BY player_id
+    """, params).fetchall()
+    return {r["player_id"]: (r["pts"] / r["n"], r["mins"] / r["n"], r["n"]) for r in rows}
+
+
+def load_actuals(conn, matchday_id: int, player_ids=None) -> tuple[dict[int, int], dict[int, int]]:
+    """Snapshot and match_stats points for a matchday in one joined query."""
+    where, params = _id_filter("p.id", player_ids)
+    rows = conn.execute(f"""
+        SELECT p.id, ps.matchday_points AS snap_pts, ms.fantasy_points AS stat_pts
+        FROM players p
+        LEFT JOIN player_snapshots ps ON ps.player_id = p.id AND ps.matchday_id = ?
+        LEFT JOIN match_stats ms ON ms.player_id = p.id AND ms.matchday_id = ?
+        WHERE (ps.matchday_points IS NOT NULL OR ms.fantasy_points IS NOT NULL) AND {where}
+    """, [matchday_id, matchday_id, *params]).fetchall()
+    snapshot_points = {r["id"]: r["snap_pts"] for r in rows if r["snap_pts"] is not None}
+    stats_points = {r["id"]: r["stat_pts"] for r in rows if r["stat_pts"] is not None}
+    return snapshot_points, stats_points
+
+
+def load_prediction_context(conn, matchday_id: int | None = None, clubs=None) -> PredictionContext | None:
+    """Everything get_predictions needs; None if the matchday doesn't exist.
+
+    clubs (names or codes) restricts players to those clubs, for patching
+    cached predictions after a few fixtures changed.
+    """
+    if matchday_id:
+        md = conn.execute("SELECT * FROM matchdays WHERE id = ?", (matchday_id,)).fetchone()
+    else:
+        md = conn.execute("SELECT * FROM matchdays WHERE is_active = 1").fetchone()
+    if not md:
+        return None
+
+    if clubs is None:
+        players = conn.execute("SELECT * FROM players").fetchall()
+        player_ids = None
+    else:
+        clubs = list(clubs)
+        marks = ",".join("?" * len(clubs))
+        players = conn.execute(
+            f"SELECT * FROM players WHERE club IN ({marks}) OR club_code IN ({marks})", clubs + clubs
+        ).fetchall()
+        player_ids = [p["id"] for p in players]
+
+    club_fixtures, played_clubs = load_fixtures(conn, md)
+    snapshot_points, stats_points = load_actuals(conn, md["id"], player_ids)
+    return PredictionContext(
+        matchday=dict(md),
+        players=players,
+        club_fixtures=club_fixtures,
+        played_clubs=played_clubs,
+        form=load_form(conn, player_ids),
+        snapshot_points=snapshot_points,
+        stats_points=stats_points,
+    )
+
+
+def build_profile(p, form: tuple[float, float, int] | None) -> PlayerProfile:
+    """PlayerProfile from a players row and its form window (if any)."""
+    if form:
+        avg_pts, avg_min, matches = form
+    else:
+        # No match_stats yet: use UEFA season data
+        _mins = p["minutes_played"] or 0
+        avg_pts = p["avg_points"] or ((p["total_points"] or 0) / max(1, (_mins // 90)))
+        avg_min = _mins / max(1, 8)
+        matches = max(1, _mins // 60) if _mins > 0 else 0
+
+    return PlayerProfile(
+        player_id=p["id"],
+        name=p["name"],
+        club=p["club"],
+        position=Position(p["position"]),
+        price=p["price"],
+        avg_minutes_last5=avg_min,
+        avg_points_last5=avg_pts if avg_pts else p["avg_points"],
+        matches_played=matches,
+        is_starter=bool(p["is_starter"]),
+        is_set_piece_taker=bool(p["is_set_piece_taker"]),
+        injury_status=p["injury_status"],
+    )
@@ -10,11 +10,14 @@ widely (2-20+) due to variance. The value is in RANKING players correctly,
 not predicting exact scores.
 """
 
-from dataclasses import dataclass, field
-from scoring import Position
+from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass
+from scoring import Position, label_array
+
+
+@dataclass(slots=True, frozen=True)
 class PlayerProfile:
     player_id: int
     name: str
@@ -32,7 +35,7 @@ class PlayerProfile:
     injury_status: str = "fit"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FixtureInfo:
     opponent_club: str
     opponent_strength: float
@@ -40,7 +43,7 @@ class FixtureInfo:
     is_knockout: bool = False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Prediction:
     player_id: int
     name: str
@@ -51,7 +54,36 @@ class Prediction:
     confidence: str
     points_per_million: float = 0
     risk_level: str = "medium"
-    reasoning: list[str] = field(default_factory=list)
+    factors: tuple = ()  # structured reasoning, see render_reasoning
+
+    @property
+    def reasoning(self) -> list[str]:
+        return render_reasoning(self.factors)
+
+
+# Reasoning factors are plain tuples (kind, *values); text is only built on request
+def render_reasoning(factors) -> list[str]:
+    """Human-readable reasoning lines for a prediction's factors."""
+    lines = []
+    for kind, *v in factors:
+        if kind == "unavailable":
+            lines.append("Injured / unavailable")
+        elif kind == "avg":
+            avg, mp, blended = v
+            lines.append(f"Avg: {avg:.1f} pts/game ({mp}gp), price adj → {blended:.1f}")
+        elif kind == "est":
+            base, price = v
+            lines.append(f"Est: {base:.1f} (no history, €{price}M)")
+        elif kind == "fixture":
+            is_home, opponent, opp, mod = v
+            loc = "🏠" if is_home else "✈️"
+            difficulty = "easy" if opp < 0.4 else "medium" if opp < 0.7 else "hard"
+            lines.append(f"{loc} vs {opponent} ({difficulty}): x{mod:.2f}")
+        elif kind == "set_piece":
+            lines.append(f"Set pieces: +{v[0]:.1f}")
+        elif kind == "minutes":
+            lines.append(f"Mins prob: {v[0]:.0%}")
+    return lines
 
 
 # Fallback when no avg data (by position, for a "generic" starter)
@@ -63,7 +95,7 @@ POSITION_BASELINE = {
 }
 
 
-def _estimate_base(player: PlayerProfile) -> tuple[float, str]:
+def _estimate_base(player: PlayerProfile) -> tuple[float, tuple]:
     """
     Core prediction base. Uses avg_points as primary signal.
     Falls back to price-based estimate if no data.
@@ -86,15 +118,15 @@ def _estimate_base(player: PlayerProfile) -> tuple[float, str]:
         else:
             blended = avg * 0.65 + price_expected * 0.35  # less data → lean more on price
         
-        return blended, f"Avg: {avg:.1f} pts/game ({mp}gp), price adj → {blended:.1f}"
+        return blended, ("avg", avg, mp, blended)
     
     # No history: use price as primary signal
     price_expected = 2.5 + player.price * 0.6
     base = max(price_expected, POSITION_BASELINE[player.position])
-    return base, f"Est: {base:.1f} (no history, €{player.price}M)"
+    return base, ("est", base, player.price)
 
 
-def _fixture_modifier(fixture: FixtureInfo, position: Position) -> tuple[float, str]:
+def _fixture_modifier(fixture: FixtureInfo, position: Position) -> tuple[float, tuple]:
     """
     Fixture difficulty creates the spread between matchdays.
     
@@ -125,10 +157,8 @@ def _fixture_modifier(fixture: FixtureInfo, position: Position) -> tuple[float,
         mod *= 1.04
     
     mod = max(0.60, min(1.55, mod))
-    
-    loc = "🏠" if fixture.is_home else "✈️"
-    difficulty = "easy" if opp < 0.4 else "medium" if opp < 0.7 else "hard"
-    return mod, f"{loc} vs {fixture.opponent_club} ({difficulty}): x{mod:.2f}"
+
+    return mod, ("fixture", fixture.is_home, fixture.opponent_club, opp, mod)
 
 
 def _minutes_probability(player: PlayerProfile) -> float:
@@ -158,7 +188,7 @@ def predict_points(player: PlayerProfile, fixture: FixtureInfo) -> Prediction:
             player_id=player.player_id, name=player.name,
             position=player.position, club=player.club, price=player.price,
             expected_points=0, confidence="high", risk_level="high",
-            reasoning=["Injured / unavailable"]
+            factors=(("unavailable",),)
         )
 
     # 1. Base from avg_points + price signal
@@ -175,7 +205,7 @@ def predict_points(player: PlayerProfile, fixture: FixtureInfo) -> Prediction:
     if player.is_set_piece_taker:
         sp_bonus = 1.2 + max(0, (0.5 - fixture.opponent_strength)) * 0.8
         pts += sp_bonus
-        reasons.append(f"Set pieces: +{sp_bonus:.1f}")
+        reasons.append(("set_piece", sp_bonus))
 
     # 4. Upside factor: UCL Fantasy points are right-skewed.
     # Players often score above their average due to haul potential.
@@ -198,7 +228,7 @@ def predict_points(player: PlayerProfile, fixture: FixtureInfo) -> Prediction:
     if 0 < min_prob < 0.5:
         expected += (1 - min_prob) * 0.15 * 1.5
 
-    reasons.append(f"Mins prob: {min_prob:.0%}")
+    reasons.append(("minutes", min_prob))
 
     # Confidence & risk
     if player.matches_played >= 5 and min_prob > 0.8:
@@ -225,5 +255,209 @@ def predict_points(player: PlayerProfile, fixture: FixtureInfo) -> Prediction:
         points_per_million=round(expected / max(player.price, 0.1), 1),
         confidence=confidence,
         risk_level=risk,
-        reasoning=reasons,
+        factors=tuple(reasons),
     )
+
+
+# ─── Batch (vectorized) prediction ───
+
+@dataclass
+class BatchPredictions:
+    """Column arrays, one element per player-fixture (same shape as the inputs)."""
+    expected_points: np.ndarray  # int64, rounded like predict_points
+    points_per_million: np.ndarray  # float64, 1 decimal
+    confidence: np.ndarray  # "high" / "medium" / "low"
+    risk_level: np.ndarray  # "high" / "medium" / "low"
+    minutes_probability: np.ndarray  # float64
+    per_game_points: np.ndarray  # float64, base × fixture (+ set pieces): mean if he plays, before upside
+
+
+def _round_1dp(x: np.ndarray) -> np.ndarray:
+    """round(x, 1) with Python's exact semantics.
+
+    np.round(x, 1) rounds x*10, which disagrees with Python's correctly
+    rounded round() when x*10 lands near a .5 tie (0.15 → 0.2 vs 0.1).
+    Those rare elements are redone with the builtin.
+    """
+    scaled = x * 10
+    out = np.rint(scaled) / 10
+    frac = np.abs(scaled - np.floor(scaled) - 0.5)
+    for idx in zip(*np.nonzero(frac < 1e-6)):
+        out[idx] = round(float(x[idx]), 1)
+    return out
+
+
+def predict_points_batch(
+    price, avg_points, matches_played, avg_minutes,
+    is_starter, opponent_strength, is_home, is_knockout,
+    position, injury_status=None, is_set_piece_taker=None,
+) -> BatchPredictions:
+    """
+    Vectorized predict_points over column arrays.
+
+    All arguments broadcast together, so player columns shaped (n, 1) and
+    fixture columns shaped (1, m) score every player against every fixture
+    in one call. position / injury_status take Position or plain strings.
+    Output matches predict_points element for element (reasoning aside).
+    """
+    price, avg, mp, avg_min, starter, opp, home, ko, pos = np.broadcast_arrays(
+        np.asarray(price, dtype=np.float64),
+        np.asarray(avg_points, dtype=np.float64),
+        np.asarray(matches_played, dtype=np.int64),
+        np.asarray(avg_minutes, dtype=np.float64),
+        np.asarray(is_starter, dtype=bool),
+        np.asarray(opponent_strength, dtype=np.float64),
+        np.asarray(is_home, dtype=bool),
+        np.asarray(is_knockout, dtype=bool),
+        label_array(position),
+    )
+    shape = price.shape
+    injury = np.broadcast_to(label_array("fit" if injury_status is None else injury_status), shape)
+    set_piece = np.broadcast_to(np.asarray(False if is_set_piece_taker is None else is_set_piece_taker, dtype=bool), shape)
+
+    # Minutes probability (same ladder as _minutes_probability)
+    is_out = injury == "out"
+    is_doubt = injury == "doubt"
+    min_prob = np.select(
+        [is_out, is_doubt, ~starter, avg_min >= 80, avg_min >= 60, avg_min >= 30, mp == 0],
+        [0.0, 0.25, 0.30, 0.95, 0.85, 0.55, 0.70],
+        default=0.45,
+    )
+
+    # 1. Base (_estimate_base)
+    price_expected = 2.5 + price * 0.6
+    has_history = (mp >= 2) & (avg > 0)
+    blended = np.where(mp >= 5, avg * 0.80 + price_expected * 0.20, avg * 0.65 + price_expected * 0.35)
+    baseline = np.select(
+        [pos == p.value for p in POSITION_BASELINE],
+        list(POSITION_BASELINE.values()),
+        default=0.0,
+    )
+    base = np.where(has_history, blended, np.maximum(price_expected, baseline))
+
+    # 2. Fixture modifier (_fixture_modifier)
+    edge = 0.5 - opp
+    mod = 1.0 + edge * 2.0
+    is_attacker = (pos == Position.FWD.value) | (pos == Position.MID.value)
+    is_defender = (pos == Position.GK.value) | (pos == Position.DEF.value)
+    mod = np.where(is_attacker, mod + np.maximum(0, edge * 0.3), mod)
+    mod = np.where(is_defender, mod + np.maximum(0, edge * 0.25), mod)
+    mod = mod + np.where(home, 0.08, 0)
+    mod = np.where(ko, mod * 1.04, mod)
+    mod = np.clip(mod, 0.60, 1.55)
+
+    pts = base * mod
+
+    # 3. Set pieces
+    pts = np.where(set_piece, pts + (1.2 + np.maximum(0, edge) * 0.8), pts)
+
+    per_game = pts
+
+    # 4. Upside
+    upside = np.select([price >= 8, price >= 6], [1.35 + 0.08, 1.35 + 0.04], default=1.35)
+    pts = pts * upside
+
+    # 5. Minutes probability + sub cameo
+    expected = pts * min_prob
+    cameo = (min_prob > 0) & (min_prob < 0.5)
+    expected = np.where(cameo, expected + (1 - min_prob) * 0.15 * 1.5, expected)
+
+    unavailable = min_prob == 0
+    expected_points = np.where(unavailable, 0, np.rint(expected)).astype(np.int64)
+    ppm = np.where(unavailable, 0.0, _round_1dp(expected / np.maximum(price, 0.1)))
+
+    confidence = np.select(
+        [unavailable, (mp >= 5) & (min_prob > 0.8), (mp >= 2) & (min_prob > 0.5)],
+        ["high", "high", "medium"],
+        default="low",
+    ).astype(object)
+    risk = np.select(
+        [(min_prob < 0.5) | is_doubt, (min_prob < 0.8) | (mp < 3)],
+        ["high", "medium"],
+        default="low",
+    ).astype(object)
+
+    return BatchPredictions(
+        expected_points=expected_points,
+        points_per_million=ppm,
+        confidence=confidence,
+        risk_level=risk,
+        minutes_probability=min_prob,
+        per_game_points=per_game,
+    )
+
+
+# ─── Columnar prediction set ───
+
+@dataclass
+class PredictionTable:
+    """
+    One matchday's predictions as parallel columns (row i = one player).
+
+    Built once per cached prediction set; the optimizer and suggestion
+    endpoints filter and score on the columns and only materialise
+    Prediction objects for the rows they return.
+    """
+    player_id: np.ndarray  # int64
+    name: np.ndarray  # object
+    position: np.ndarray  # str: "GK" / "DEF" / "MID" / "FWD"
+    club: np.ndarray  # object
+    price: np.ndarray  # float64
+    expected_points: np.ndarray  # int64
+    points_per_million: np.ndarray  # float64
+    confidence: np.ndarray  # str
+    risk_level: np.ndarray  # str
+    fixture_played: np.ndarray  # bool
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "PredictionTable":
+        """From get_predictions rows (same order, so row i is rows[i])."""
+        def col(key, dtype):
+            return np.array([r[key] for r in rows], dtype=dtype)
+
+        return cls(
+            player_id=col("player_id", np.int64),
+            name=col("name", object),
+            position=col("position", str),
+            club=col("club", object),
+            price=col("price", np.float64),
+            expected_points=col("expected_points", np.int64),
+            points_per_million=col("points_per_million", np.float64),
+            confidence=col("confidence", str),
+            risk_level=col("risk_level", str),
+            fixture_played=col("fixture_played", bool),
+        )
+
+    @classmethod
+    def from_predictions(cls, predictions: list[Prediction]) -> "PredictionTable":
+        return cls.from_rows([
+            {
+                "player_id": p.player_id, "name": p.name, "position": p.position.value,
+                "club": p.club, "price": p.price, "expected_points": p.expected_points,
+                "points_per_million": p.points_per_million, "confidence": p.confidence,
+                "risk_level": p.risk_level, "fixture_played": False,
+            }
+            for p in predictions
+        ])
+
+    def __len__(self) -> int:
+        return len(self.player_id)
+
+    def take(self, mask_or_index) -> "PredictionTable":
+        """Sub-table of the selected rows."""
+        return PredictionTable(**{
+            name: getattr(self, name)[mask_or_index] for name in self.__dataclass_fields__
+        })
+
+    def prediction(self, i: int) -> Prediction:
+        return Prediction(
+            player_id=int(self.player_id[i]),
+            name=self.name[i],
+            position=Position(self.position[i]),
+            club=self.club[i],
+            price=float(self.price[i]),
+            expected_points=int(self.expected_points[i]),
+            confidence=str(self.confidence[i]),
+            points_per_million=float(self.points_per_million[i]),
+            risk_level=str(self.risk_level[i]),
+        )
@@ -0,0 +1,195 @@
+"""
+Rescore job: recompute match_stats.fantasy_points for the whole table.
+
+Run after a scoring rule change or a corrected stats feed. Rows stream in
+fixed-size chunks by (player, matchday) (constant memory), are scored in
+one batch per chunk under their matchday's season rules, and only changed
+rows are written back. Each chunk is one short write transaction on the
+job's own connection, taken before the chunk is read (BEGIN IMMEDIATE): it
+updates match_stats and carries the point deltas into player_snapshots
+(that matchday's points, and the running totals from it on) and
+players.total_points, so an interrupted job leaves consistent data and
+re-running it finishes the rest. Readers are never blocked (WAL) and API
+writes interleave between chunks.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from database import connect
+from rules import season_of
+from scoring import FLAG_FIELDS, STAT_FIELDS, ScoringRules, calculate_fantasy_points_batch, scoring_rules
+
+CHUNK_ROWS = 5000
+
+_job_lock = threading.Lock()
+_job: "RescoreJob | None" = None
+
+
+@dataclass
+class RescoreJob:
+    total: int = 0  # match_stats rows when the job started
+    done: int = 0
+    changed: int = 0
+    status: str = "running"  # running, done, failed
+    error: str | None = None
+    started: float = field(default_factory=time.time)
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "changed": self.changed,
+            "progress": round(self.done / self.total, 4) if self.total else float(self.status == "done"),
+            "seconds": round(self.seconds, 2),
+            "error": self.error,
+        }
+
+
+def matchday_scoring_rules(conn, matchday_id: int) -> ScoringRules:
+    """Scoring rules for a matchday's season: its season column, else its deadline's season, else the latest."""
+    row = conn.execute("SELECT season, deadline FROM matchdays WHERE id = ?", (matchday_id,)).fetchone()
+    return scoring_rules(_season(row) if row else None)
+
+
+def _season(matchday) -> str | None:
+    return matchday["season"] or season_of(matchday["deadline"])
+
+
+def current_job() -> RescoreJob | None:
+    return _job
+
+
+def start_job(db_path: str | None = None, chunk_rows: int = CHUNK_ROWS, on_done=None) -> RescoreJob | None:
+    """Start the rescore in a background thread; None if one is already running."""
+    global _job
+    with _job_lock:
+        if _job is not None and _job.status == "running":
+            return None
+        job = _job = RescoreJob()
+
+    def run():
+        try:
+            rescore_match_stats(db_path, chunk_rows, job)
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+        if on_done:
+            on_done(job)
+
+    threading.Thread(target=run, name="rescore", daemon=True).start()
+    return job
+
+
+def rescore_match_stats(db_path: str | None = None, chunk_rows: int = CHUNK_ROWS,
+                        job: RescoreJob | None = None) -> RescoreJob:
+    """Rescore every match_stats row (see module docstring); job is updated as chunks commit."""
+    job = job or RescoreJob()
+    conn = connect(db_path)
+    try:
+        rules_by_md = {md["id"]: scoring_rules(_season(md))
+                       for md in conn.execute("SELECT id, season, deadline FROM matchdays")}
+        job.total = conn.execute("SELECT COUNT(*) FROM match_stats").fetchone()[0]
+        # Keyset over UNIQUE(player_id, matchday_id): a player's rows stay together,
+        # so their snapshots are rewritten about once for the whole job
+        select = f"""
+            SELECT ms.id, ms.player_id, ms.matchday_id, ms.fantasy_points, p.position,
+                   {", ".join(f"ms.{name}" for name in STAT_FIELDS)}
+            FROM match_stats ms JOIN players p ON p.id = ms.player_id
+            WHERE (ms.player_id, ms.matchday_id) > (?, ?)
+            ORDER BY ms.player_id, ms.matchday_id LIMIT ?
+        """
+        last = (0, 0)
+        while True:
+            # The chunk is read, scored and written under one write lock: a
+            # concurrent stats import (INSERT OR REPLACE, a new row id) can't
+            # land between the read and the deltas carried from it
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(select, (*last, chunk_rows)).fetchall()
+                changes = _rescore_chunk(rows, rules_by_md) if rows else []
+                if changes:
+                    _write_chunk(conn, changes)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            if not rows:
+                break
+            last = (rows[-1]["player_id"], rows[-1]["matchday_id"])
+            job.done += len(rows)
+            job.changed += len(changes)
+            job.seconds = time.time() - job.started
+        job.done = max(job.done, job.total)
+        job.status = "done"
+    finally:
+        conn.close()
+        job.seconds = time.time() - job.started
+    return job
+
+
+def _rescore_chunk(rows, rules_by_md: dict) -> list[tuple[int, int, int, int, int]]:
+    """(match_stats id, player_id, matchday_id, new points, delta) for the rows whose points change."""
+    columns = {name: np.array([r[name] or 0 for r in rows], dtype=np.int64) for name in STAT_FIELDS}
+    for name in FLAG_FIELDS:
+        columns[name] = (columns[name] != 0).astype(np.int64)
+    positions = np.array([r["position"] for r in rows], dtype=str)
+    old = np.array([r["fantasy_points"] or 0 for r in rows], dtype=np.int64)
+
+    # One batch per rule set (usually the whole chunk)
+    by_version, rule_sets = {}, {}
+    for k, r in enumerate(rows):
+        rules = rules_by_md.get(r["matchday_id"]) or scoring_rules()
+        rule_sets[rules.version] = rules
+        by_version.setdefault(rules.version, []).append(k)
+    new = np.empty_like(old)
+    for version, at in by_version.items():
+        rules = rule_sets[version]
+        new[at] = calculate_fantasy_points_batch(positions[at], **{k: v[at] for k, v in columns.items()}, rules=rules)
+
+    changed = np.flatnonzero(new != old)
+    return [(rows[k]["id"], rows[k]["player_id"], rows[k]["matchday_id"], int(new[k]), int(new[k] - old[k]))
+            for k in changed.tolist()]
+
+
+def _write_chunk(conn, changes):
+    """New points, plus their deltas carried into snapshots and player totals (in the caller's transaction)."""
+    deltas = {}  # player_id -> [(matchday_id, delta)] ascending (changes come in key order)
+    for _, player_id, md, _, delta in changes:
+        deltas.setdefault(player_id, []).append((md, delta))
+
+    # Per snapshot: that matchday's delta; running totals move by the deltas
+    # up to it ("after") and before it ("before")
+    snapshot_updates = []
+    snapshots = conn.execute(
+        "SELECT player_id, matchday_id FROM player_snapshots WHERE player_id BETWEEN ? AND ? "
+        "ORDER BY player_id, matchday_id",
+        (changes[0][1], changes[-1][1]),
+    )
+    current, k, before = None, 0, 0
+    for player_id, md in snapshots:
+        player_deltas = deltas.get(player_id)
+        if not player_deltas:
+            continue
+        if player_id != current:
+            current, k, before = player_id, 0, 0
+        while k < len(player_deltas) and player_deltas[k][0] < md:
+            before += player_deltas[k][1]
+            k += 1
+        own = player_deltas[k][1] if k < len(player_deltas) and player_deltas[k][0] == md else 0
+        if before or own:
+            snapshot_updates.append((own, before, before + own, player_id, md))
+
+    conn.executemany("UPDATE match_stats SET fantasy_points = ? WHERE id = ?",
+                     [(points, row_id) for row_id, _, _, points, _ in changes])
+    conn.executemany("""
+        UPDATE player_snapshots SET matchday_points = matchday_points + ?,
+            total_points_before = total_points_before + ?, total_points_after = total_points_after + ?
+        WHERE player_id = ? AND matchday_id = ?
+    """, snapshot_updates)
+    conn.executemany("UPDATE players SET total_points = total_points + ? WHERE id = ?",
+                     [(sum(d for _, d in player_deltas), player_id) for player_id, player_deltas in deltas.items()])
@@ -143,3 +143,57 @@ def get_all_stages():
 
 # Keep backward compat
 STAGES = {k: get_stage_rules(k) for k in STAGE_LABELS}
+
+
+# ─── Scoring rules ───
+#
+# Rule sets by the first season they apply to ("2024-25" = from the 2024/25
+# season on); a season is scored by the latest set starting at or before it.
+# Add a new set when UEFA changes the scoring, never edit a shipped one.
+# Keys are MatchStats fields plus appearance (minutes > 0) and sixty_minutes
+# (minutes >= 60); a red card replaces the yellow. Values are points per
+# unit, for every position or per position ({"GK": 6, ...}, missing = 0);
+# (every, points) scores points per full `every` units.
+SCORING_RULE_SETS = {
+    "2024-25": {
+        "appearance": 1,
+        "sixty_minutes": 1,
+        "goals": {"GK": 6, "DEF": 6, "MID": 5, "FWD": 4},
+        "goals_outside_box": 1,
+        "assists": 3,
+        "balls_recovered": (3, 1),
+        "player_of_match": 3,
+        "penalty_won": 2,
+        "penalty_conceded": -1,
+        "penalty_missed": -2,
+        "penalty_saved": {"GK": 5},
+        "yellow_card": -1,
+        "red_card": -3,
+        "own_goal": -2,
+        "saves": {"GK": (3, 1)},
+        "goals_conceded": {"GK": (2, -1), "DEF": (2, -1)},
+        "clean_sheet": {"GK": 4, "DEF": 4, "MID": 1},
+    },
+}
+
+SEASON_START_MONTH = 7  # a season runs July to June
+
+
+def season_of(date: str | None) -> str | None:
+    """Season ("2025-26") of an ISO date, None if there's no date."""
+    if not date or len(date) < 7 or not date[:4].isdigit() or not date[5:7].isdigit():
+        return None
+    year = int(date[:4]) - (int(date[5:7]) < SEASON_START_MONTH)
+    return f"{year}-{(year + 1) % 100:02d}"
+
+
+def get_scoring_rules(season: str | None = None) -> tuple[str, dict]:
+    """
+    (version, rule set) for a season: the latest set from that season or
+    before; None = the latest set. A season older than every set uses the
+    earliest one (there are no older rules to apply).
+    """
+    versions = sorted(SCORING_RULE_SETS)
+    if season is not None:
+        versions = [v for v in versions if v <= season] or versions[:1]
+    return versions[-1], SCORING_RULE_SETS[versions[-1]]
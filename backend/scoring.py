@@ -1,10 +1,23 @@
 """
 UCL Fantasy Football Scoring Engine
 Full implementation of UEFA Champions League Fantasy scoring rules.
+
+The rules themselves are data (rules.SCORING_RULE_SETS, versioned by
+season). scoring_rules() compiles a set into per-position vectors: every
+rule scores (stat // every) * points with that position's every and
+points, and every = 1 for the per-unit rules, so a player's score is a dot
+product of their stats with their position's coefficients plus a few
+floor-division terms.
 """
 
 from enum import Enum
 from dataclasses import dataclass
+from functools import cache
+from operator import attrgetter
+
+import numpy as np
+
+from rules import get_scoring_rules
 
 
 class Position(str, Enum):
@@ -14,7 +27,7 @@ class Position(str, Enum):
     FWD = "FWD"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MatchStats:
     """Raw match statistics for a single player in a single match."""
     player_id: int
@@ -37,65 +50,184 @@ class MatchStats:
     clean_sheet: bool = False
 
 
-def calculate_fantasy_points(stats: MatchStats) -> int:
-    """Calculate fantasy points based on UCL Fantasy rules."""
-    pts = 0
-
-    # Appearance
-    if stats.minutes > 0:
-        pts += 1
-    # 60+ minutes
-    if stats.minutes >= 60:
-        pts += 1
-
-    # Goals by position
-    goal_pts = {Position.GK: 6, Position.DEF: 6, Position.MID: 5, Position.FWD: 4}
-    pts += stats.goals * goal_pts[stats.position]
-
-    # Goals from outside box
-    pts += stats.goals_outside_box
-
-    # Assists
-    pts += stats.assists * 3
-
-    # Balls recovered (every 3)
-    pts += stats.balls_recovered // 3
-
-    # Player of the Match
-    if stats.player_of_match:
-        pts += 3
-
-    # Penalties
-    pts += stats.penalty_won * 2
-    pts -= stats.penalty_conceded
-    pts -= stats.penalty_missed * 2
-
-    # Cards
-    if stats.red_card:
-        pts -= 3
-    elif stats.yellow_card:
-        pts -= 1
-
-    # Own goals
-    pts -= stats.own_goal * 2
-
-    # GK specific
-    if stats.position == Position.GK:
-        pts += stats.penalty_saved * 5
-        if stats.clean_sheet:
-            pts += 4
-        pts += stats.saves // 3
-        pts -= stats.goals_conceded // 2
-
-    # DEF specific
-    if stats.position == Position.DEF:
-        if stats.clean_sheet:
-            pts += 4
-        pts -= stats.goals_conceded // 2
+STAT_FIELDS = tuple(name for name in MatchStats.__dataclass_fields__ if name not in ("player_id", "position"))
+FLAG_FIELDS = tuple(name for name in STAT_FIELDS if MatchStats.__dataclass_fields__[name].type is bool)
+POSITIONS = tuple(Position)  # column order of the compiled vectors
+
+# Rules scored on something other than the stat of the same name
+_DERIVED = {
+    "appearance": lambda s: s.minutes > 0,
+    "sixty_minutes": lambda s: s.minutes >= 60,
+    "yellow_card": lambda s: s.yellow_card and not s.red_card,  # a red replaces it
+}
+_DERIVED_BATCH = {
+    "appearance": lambda c: c["minutes"] > 0,
+    "sixty_minutes": lambda c: c["minutes"] >= 60,
+    "yellow_card": lambda c: np.asarray(c["yellow_card"], dtype=bool) & ~np.asarray(c["red_card"], dtype=bool),
+}
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """One rule set compiled for scoring: rule r scores (feature // every[r, pos]) * points[r, pos]."""
+    version: str
+    rules: tuple[str, ...]
+    points: np.ndarray  # int64 (rules, POSITIONS)
+    every: np.ndarray  # int64 (rules, POSITIONS), 1 = per unit
+    scorers: dict  # Position -> fn(MatchStats) -> int, the scalar path
+
+
+@cache
+def scoring_rules(season: str | None = None) -> ScoringRules:
+    """Compiled rules for a season (None = the latest rule set)."""
+    return _compile(get_scoring_rules(season)[0])
+
+
+@cache
+def _compile(version: str) -> ScoringRules:
+    _, table = get_scoring_rules(version)
+    points = np.zeros((len(table), len(POSITIONS)), dtype=np.int64)
+    every = np.ones_like(points)
+    for r, (rule, value) in enumerate(table.items()):
+        if rule not in STAT_FIELDS and rule not in _DERIVED:
+            raise ValueError(f"Scoring rule set {version}: unknown rule {rule}")
+        per_position = value if isinstance(value, dict) else {pos.value: value for pos in POSITIONS}
+        for p, pos in enumerate(POSITIONS):
+            term = per_position.get(pos.value, 0)
+            every[r, p], points[r, p] = term if isinstance(term, tuple) else (1, term)
+    scorers = {pos: _scalar_scorer(table, every[:, p], points[:, p]) for p, pos in enumerate(POSITIONS)}
+    return ScoringRules(version, tuple(table), points, every, scorers)
+
+
+def _scalar_scorer(table: dict, every: np.ndarray, points: np.ndarray):
+    """One position's rules as a fn(MatchStats) -> int over its scoring (feature, every, points) terms."""
+    terms = tuple(
+        (_DERIVED.get(rule) or attrgetter(rule), e, pts)
+        for rule, e, pts in zip(table, every.tolist(), points.tolist()) if pts
+    )
+
+    def score(stats: MatchStats) -> int:
+        return int(sum(feature(stats) // e * pts for feature, e, pts in terms))
+
+    return score
+
+
+def calculate_fantasy_points(stats: MatchStats, rules: ScoringRules | None = None) -> int:
+    """Fantasy points for one player's match (reference implementation of the batch scorer)."""
+    return (rules or scoring_rules()).scorers[stats.position](stats)
+
+
+# ─── Batch scoring ───
+
+def label_array(values) -> np.ndarray:
+    """Plain str array from strings or str-Enums like Position (numpy mangles str-Enums)."""
+    arr = np.asarray(values, dtype=object)
+    flat = [getattr(v, "value", v) for v in arr.ravel()]
+    return np.asarray(flat, dtype=str).reshape(arr.shape)
+
+
+# Position labels differ in their first letter: index by its code point
+_POSITION_BY_LETTER = np.full(128, -1, dtype=np.intp)
+for _p, _pos in enumerate(POSITIONS):
+    _POSITION_BY_LETTER[ord(_pos.value[0])] = _p
+_POSITION_LABELS = label_array(POSITIONS)
+
+
+def position_index(position) -> np.ndarray:
+    """
+    Column in the compiled vectors for a str array of positions (see
+    label_array). Raises ValueError on a label that is not a Position.
+    """
+    position = np.ascontiguousarray(position)
+    if position.dtype.kind != "U" or not position.size:
+        index = np.full(position.shape, -1, dtype=np.intp)
+        for p, pos in enumerate(POSITIONS):
+            index[position == pos.value] = p
+        unknown = index < 0
+    else:
+        letters = position.view(np.uint32).reshape(*position.shape, -1)[..., 0]
+        index = _POSITION_BY_LETTER[np.minimum(letters, 127)]
+        # An unknown first letter gives -1, i.e. "FWD", which only an F... label can match
+        unknown = position != _POSITION_LABELS[index]
+    if unknown.any():
+        labels = sorted(set(np.asarray(position, dtype=object)[unknown].tolist()), key=str)
+        raise ValueError(f"Unknown position: {labels[:5]}")
+    return index
+
+
+def score_breakdown_batch(
+    position, minutes, goals=0, goals_outside_box=0, assists=0,
+    balls_recovered=0, player_of_match=0, penalty_won=0, penalty_conceded=0,
+    penalty_missed=0, penalty_saved=0, yellow_card=0, red_card=0, own_goal=0,
+    saves=0, goals_conceded=0, clean_sheet=0, rules: ScoringRules | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Points per rule (in rule set order) for arrays of stats; the rules sum
+    to calculate_fantasy_points. All stat arguments broadcast together;
+    position must be a str array of "GK"/"DEF"/"MID"/"FWD" (see
+    label_array). A structured array or column dict passes as
+    **{name: col[name]}. rules defaults to the latest rule set.
+    """
+    columns = dict(
+        minutes=minutes, goals=goals, goals_outside_box=goals_outside_box, assists=assists,
+        balls_recovered=balls_recovered, player_of_match=player_of_match, penalty_won=penalty_won,
+        penalty_conceded=penalty_conceded, penalty_missed=penalty_missed, penalty_saved=penalty_saved,
+        yellow_card=yellow_card, red_card=red_card, own_goal=own_goal, saves=saves,
+        goals_conceded=goals_conceded, clean_sheet=clean_sheet,
+    )
+    shape, terms = _batch_terms(position, columns, rules or scoring_rules())
+    return {rule: np.broadcast_to(np.asarray(value, dtype=np.int64), shape) for rule, value in terms}
+
+
+def calculate_fantasy_points_batch(
+    position, minutes, goals=0, goals_outside_box=0, assists=0,
+    balls_recovered=0, player_of_match=0, penalty_won=0, penalty_conceded=0,
+    penalty_missed=0, penalty_saved=0, yellow_card=0, red_card=0, own_goal=0,
+    saves=0, goals_conceded=0, clean_sheet=0, rules: ScoringRules | None = None,
+) -> np.ndarray:
+    """
+    calculate_fantasy_points over arrays (all arguments broadcast together).
+    position must be a str array of "GK"/"DEF"/"MID"/"FWD" (see label_array).
+    Returns int64 points with the same shape.
+    """
+    columns = dict(
+        minutes=minutes, goals=goals, goals_outside_box=goals_outside_box, assists=assists,
+        balls_recovered=balls_recovered, player_of_match=player_of_match, penalty_won=penalty_won,
+        penalty_conceded=penalty_conceded, penalty_missed=penalty_missed, penalty_saved=penalty_saved,
+        yellow_card=yellow_card, red_card=red_card, own_goal=own_goal, saves=saves,
+        goals_conceded=goals_conceded, clean_sheet=clean_sheet,
+    )
+    shape, terms = _batch_terms(position, columns, rules or scoring_rules())
+    pts = np.zeros(shape, dtype=np.int64)
+    for _, value in terms:
+        pts += value
+    return pts
 
-    # MID specific
-    if stats.position == Position.MID:
-        if stats.clean_sheet:
-            pts += 1
 
-    return pts
+def _batch_terms(position, columns: dict, rules: ScoringRules):
+    """(broadcast shape, [(rule, points array or scalar)]) for the non-zero rules."""
+    columns = {name: np.asarray(value) for name, value in columns.items()}
+    shape = np.broadcast_shapes(np.shape(position), *(c.shape for c in columns.values()))
+    pos = None
+    terms = []
+    for r, rule in enumerate(rules.rules):
+        every, points = rules.every[r], rules.points[r]
+        if not points.any():
+            terms.append((rule, 0))
+            continue
+        feature = _DERIVED_BATCH[rule](columns) if rule in _DERIVED_BATCH else columns[rule]
+        # every only matters where the rule scores: saves are every 3 for GK, 0 points elsewhere
+        scored_every = every[points != 0]
+        uniform_every, uniform_points = (scored_every == scored_every[0]).all(), (points == points[0]).all()
+        if (not uniform_every or not uniform_points) and pos is None:
+            pos = position_index(position)
+        if uniform_every:
+            if scored_every[0] != 1:
+                feature = feature // scored_every[0]
+        else:
+            feature = feature // every[pos]
+        if uniform_points:
+            terms.append((rule, feature if points[0] == 1 else feature * points[0]))
+        else:
+            terms.append((rule, feature * points[pos]))
+    return shape, terms
@@ -0,0 +1,249 @@
+"""
+Monte Carlo points distributions.
+
+predict_points gives one number and a fixed upside multiplier standing in
+for a percentile. This samples whole matches instead: minutes, goals,
+assists, clean sheets, goals conceded, saves, recoveries, cards and Player
+of the Match for every player-fixture, scores each draw with
+calculate_fantasy_points_batch, and reports mean / p10 / p50 / p90 and haul
+probability per player.
+
+Attacking rates are calibrated so that, for a player who plays, goals and
+assists fill the gap between the predictor's per-game mean (base × fixture,
+without upside) and the expected non-attacking points. Club goals conceded
+are sampled once per team per draw, so teammates' clean sheets correlate.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from scoring import calculate_fantasy_points_batch, label_array
+from predictor import predict_points_batch
+from prediction_context import build_profile
+
+HAUL_POINTS = 10
+DRAW_CHUNK = 2000  # draws per batch, bounds memory at ~chunk × players
+POINTS_RANGE = (-15, 60)  # histogram bounds for exact integer percentiles
+
+# Per-90 priors by position
+RECOVERIES_PER_90 = {"GK": 1.5, "DEF": 5.0, "MID": 5.5, "FWD": 2.5}
+YELLOW_PROB = {"GK": 0.03, "DEF": 0.12, "MID": 0.12, "FWD": 0.08}
+RED_PROB = 0.006
+GOAL_SHARE = {"GK": 0.5, "DEF": 0.45, "MID": 0.5, "FWD": 0.65}  # of attacking points
+OUTSIDE_BOX_SHARE = {"GK": 0.0, "DEF": 0.10, "MID": 0.20, "FWD": 0.08}  # of goals
+GOAL_POINTS = {"GK": 6, "DEF": 6, "MID": 5, "FWD": 4}
+CLEAN_SHEET_POINTS = {"GK": 4, "DEF": 4, "MID": 1, "FWD": 0}
+CAMEO_SHARE = 0.3  # rate scale for a sub appearance (<60 min)
+MIN_ATTACK_POINTS = 0.1  # floor on per-90 attacking points
+
+
+@dataclass
+class PointsDistribution:
+    """Per player-fixture summary of the simulated points."""
+    mean: np.ndarray
+    std: np.ndarray
+    p10: np.ndarray
+    p50: np.ndarray
+    p90: np.ndarray
+    haul_probability: np.ndarray  # P(points >= haul_points)
+    draws: int
+
+
+def _by_position(pos: np.ndarray, table: dict) -> np.ndarray:
+    return np.select([pos == k for k in table], list(table.values()), default=0.0)
+
+
+def _expected_floor_div(lam: np.ndarray, d: int, terms: int = 40) -> np.ndarray:
+    """E[X // d] for X ~ Poisson(lam): (lam - E[X mod d]) / d."""
+    k = np.arange(terms)
+    log_pmf = k[:, None] * np.log(np.maximum(lam, 1e-12))[None, :] - lam[None, :] - np.cumsum(
+        np.log(np.maximum(k, 1)))[:, None]
+    e_mod = ((k % d)[:, None] * np.exp(log_pmf)).sum(axis=0)
+    return (lam - e_mod) / d
+
+
+def _quantiles_from_hist(hist: np.ndarray, qs, lo: int) -> list[np.ndarray]:
+    """Inverted-CDF quantiles per row of an integer-points histogram."""
+    cdf = np.cumsum(hist, axis=1)
+    n = cdf[:, -1:]
+    return [np.argmax(cdf >= np.ceil(q * n), axis=1) + lo for q in qs]
+
+
+def simulate_points(
+    position, price, avg_points, matches_played, avg_minutes, is_starter,
+    opponent_strength, team_strength, is_home, is_knockout,
+    injury_status=None, is_set_piece_taker=None, team_index=None,
+    draws: int = 20000, seed: int | None = None, haul_points: int = HAUL_POINTS,
+) -> PointsDistribution:
+    """
+    Simulate `draws` matches for n player-fixtures (1-D columns of length n).
+
+    team_index groups players of the same club-fixture (ints 0..t-1) so they
+    share goals conceded; without it every player gets an independent team.
+    seed makes the run reproducible.
+    """
+    pos = label_array(position)
+    n = pos.shape[0]
+    rng = np.random.default_rng(seed)
+
+    det = predict_points_batch(
+        price, avg_points, matches_played, avg_minutes, is_starter,
+        opponent_strength, is_home, is_knockout, pos, injury_status, is_set_piece_taker,
+    )
+    play_prob = det.minutes_probability
+    per_game = det.per_game_points
+
+    avg_minutes = np.asarray(avg_minutes, dtype=np.float64)
+    is_starter = np.asarray(is_starter, dtype=bool)
+    opp = np.asarray(opponent_strength, dtype=np.float64)
+    own = np.asarray(team_strength, dtype=np.float64)
+    home = np.asarray(is_home, dtype=bool)
+    if team_index is None:
+        team_index = np.arange(n)
+    team_index = np.asarray(team_index)
+    n_teams = int(team_index.max()) + 1 if n else 0
+
+    # P(60+ | plays)
+    full_prob = np.where(~is_starter, 0.15,
+                np.where(avg_minutes >= 60, 0.92, np.where(avg_minutes >= 30, 0.55, 0.35)))
+
+    # Team goals conceded (per team): stronger opponent and weaker own side concede more
+    conceded_rate = np.clip(1.3 * (0.5 + opp) * (1.4 - own * 0.8) * np.where(home, 0.9, 1.1), 0.2, 4.0)
+    team_conceded_rate = np.zeros(n_teams)
+    team_conceded_rate[team_index] = conceded_rate
+
+    recov_rate = _by_position(pos, RECOVERIES_PER_90)
+    saves_rate = np.where(pos == "GK", 2.0 + 3.0 * opp, 0.0)
+    yellow = _by_position(pos, YELLOW_PROB)
+    goal_pts = _by_position(pos, GOAL_POINTS)
+    cs_pts = _by_position(pos, CLEAN_SHEET_POINTS)
+    concede_penalised = (pos == "GK") | (pos == "DEF")
+    gk_cols = np.flatnonzero(pos == "GK")
+
+    # Expected non-attacking points for a full (60+) appearance
+    e_full = (
+        2.0
+        + cs_pts * np.exp(-conceded_rate)
+        - np.where(concede_penalised, _expected_floor_div(conceded_rate, 2), 0.0)
+        + _expected_floor_div(recov_rate, 3)
+        + _expected_floor_div(saves_rate, 3)
+        - (RED_PROB * 3 + (1 - RED_PROB) * yellow)
+    )
+    e_cameo = 1.0 + _expected_floor_div(recov_rate * CAMEO_SHARE, 3) - (RED_PROB * 3 + (1 - RED_PROB) * yellow) * CAMEO_SHARE
+    e_nonattack = full_prob * e_full + (1 - full_prob) * e_cameo
+    attack_scale = full_prob + (1 - full_prob) * CAMEO_SHARE
+
+    # Per-90 attacking points that make E[points | plays] match the predictor
+    attack = np.maximum(MIN_ATTACK_POINTS, (per_game - e_nonattack) / attack_scale)
+    share = _by_position(pos, GOAL_SHARE)
+    outside = _by_position(pos, OUTSIDE_BOX_SHARE)
+    goal_rate = attack * share / (goal_pts + outside)
+    assist_rate = attack * (1 - share) / 3
+
+    lo, hi = POINTS_RANGE
+    hist = np.zeros((n, hi - lo + 1), dtype=np.int64)
+    total = np.zeros(n)
+    total_sq = np.zeros(n)
+    offsets = np.arange(n) * (hi - lo + 1)
+
+    done = 0
+    while done < draws:
+        k = min(DRAW_CHUNK, draws - done)
+        shape = (k, n)
+        plays = rng.random(shape) < play_prob
+        full = plays & (rng.random(shape) < full_prob)
+        cameo = plays & ~full
+        minutes = np.where(full, 90, np.where(cameo, 25, 0))
+        scale = np.where(full, 1.0, np.where(cameo, CAMEO_SHARE, 0.0))
+
+        goals = rng.poisson(goal_rate * scale)
+        outside_goals = rng.binomial(goals, outside)
+        assists = rng.poisson(assist_rate * scale)
+        recoveries = rng.poisson(recov_rate * scale)
+        saves = np.zeros(shape, dtype=np.int64)
+        saves[:, gk_cols] = rng.poisson(saves_rate[gk_cols] * scale[:, gk_cols])
+        red = plays & (rng.random(shape) < RED_PROB * scale)
+        yellow_card = plays & ~red & (rng.random(shape) < yellow * scale)
+
+        conceded = rng.poisson(team_conceded_rate, (k, n_teams))[:, team_index]
+        on_pitch_conceded = np.where(full, conceded, 0)
+        clean_sheet = full & (conceded == 0)
+
+        returns = goals + assists
+        potm_draw = rng.random(shape)
+        potm = (returns >= 2) & (potm_draw < 0.5) | (returns == 1) & (potm_draw < 0.1)
+
+        pts = calculate_fantasy_points_batch(
+            pos, minutes, goals=goals, goals_outside_box=outside_goals, assists=assists,
+            balls_recovered=recoveries, player_of_match=potm, yellow_card=yellow_card,
+            red_card=red, saves=saves, goals_conceded=on_pitch_conceded, clean_sheet=clean_sheet,
+        )
+        total += pts.sum(axis=0)
+        total_sq += (pts.astype(np.float64) ** 2).sum(axis=0)
+        bins = np.clip(pts, lo, hi) - lo + offsets
+        hist += np.bincount(bins.ravel(), minlength=hist.size).reshape(hist.shape)
+        done += k
+
+    mean = total / max(draws, 1)
+    std = np.sqrt(np.maximum(total_sq / max(draws, 1) - mean ** 2, 0))
+    p10, p50, p90 = _quantiles_from_hist(hist, (0.10, 0.50, 0.90), lo)
+    haul = hist[:, haul_points - lo:].sum(axis=1) / max(draws, 1)
+    return PointsDistribution(mean=mean, std=std, p10=p10, p50=p50, p90=p90,
+                              haul_probability=haul, draws=draws)
+
+
+def simulate_matchday(ctx, draws: int = 20000, seed: int | None = None,
+                      haul_points: int = HAUL_POINTS) -> list[dict]:
+    """Distributions for every player with a fixture in a PredictionContext."""
+    profiles, fixtures = [], []
+    for p in ctx.players:
+        fixture = ctx.fixture_for(p)
+        if fixture:
+            profiles.append(build_profile(p, ctx.form.get(p["id"])))
+            fixtures.append(fixture)
+    if not profiles:
+        return []
+
+    # Own strength is the opponent's view of us; one team per club-fixture
+    team_ids = {}
+    team_index = [team_ids.setdefault(id(f), len(team_ids)) for f in fixtures]
+    own_strength = []
+    for f in fixtures:
+        opp_fix = ctx.club_fixtures.get(f.opponent_club)
+        own_strength.append(opp_fix.opponent_strength if opp_fix else 0.5)
+
+    dist = simulate_points(
+        position=[p.position for p in profiles],
+        price=[p.price for p in profiles],
+        avg_points=[p.avg_points_last5 for p in profiles],
+        matches_played=[p.matches_played for p in profiles],
+        avg_minutes=[p.avg_minutes_last5 for p in profiles],
+        is_starter=[p.is_starter for p in profiles],
+        opponent_strength=[f.opponent_strength for f in fixtures],
+        team_strength=own_strength,
+        is_home=[f.is_home for f in fixtures],
+        is_knockout=[f.is_knockout for f in fixtures],
+        injury_status=[p.injury_status for p in profiles],
+        is_set_piece_taker=[p.is_set_piece_taker for p in profiles],
+        team_index=team_index,
+        draws=draws,
+        seed=seed,
+        haul_points=haul_points,
+    )
+    return [
+        {
+            "player_id": p.player_id,
+            "name": p.name,
+            "position": p.position.value,
+            "club": p.club,
+            "price": p.price,
+            "mean": round(float(dist.mean[i]), 2),
+            "std": round(float(dist.std[i]), 2),
+            "p10": int(dist.p10[i]),
+            "p50": int(dist.p50[i]),
+            "p90": int(dist.p90[i]),
+            "haul_probability": round(float(dist.haul_probability[i]), 3),
+        }
+        for i, p in enumerate(profiles)
+    ]
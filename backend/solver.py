@@ -0,0 +1,162 @@
+"""
+Solver configuration for the PuLP models.
+
+Every MILP solve goes through solve() with a SolverConfig: the backend
+(CBC bundled with PuLP, HiGHS when highspy is installed, or the in-process
+"python" fallback the squad optimizer provides), a time limit, a relative
+gap and a thread count. A solve never runs past its time limit; if it
+stops early the best incumbent is kept and flagged "feasible". SolveStats
+report status, wall time, nodes, gap and bound for the API.
+"""
+
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import cache
+
+from pulp import (
+    HiGHS, PULP_CBC_CMD, LpStatus, LpSolutionIntegerFeasible, LpSolutionOptimal, PulpSolverError,
+)
+
+BACKENDS = ("auto", "highs", "cbc", "python")
+DEFAULT_TIME_LIMIT = 1.0  # seconds
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    backend: str = "auto"  # see BACKENDS; auto = best installed MILP solver
+    time_limit: float = DEFAULT_TIME_LIMIT
+    gap_rel: float | None = None  # stop within this relative gap (None = solver default)
+    threads: int | None = None
+
+
+@dataclass
+class SolveStats:
+    backend: str
+    status: str  # optimal, feasible (stopped early, incumbent kept), infeasible, no_solution, error
+    seconds: float
+    nodes: int | None = None
+    gap: float | None = None  # relative gap between incumbent and bound
+    objective: float | None = None
+    bound: float | None = None
+    bound_source: str | None = None  # "lagrangian" or "ilp" for the python backend
+
+    @property
+    def has_solution(self) -> bool:
+        return self.status in ("optimal", "feasible")
+
+
+@cache
+def available_backends() -> tuple[str, ...]:
+    installed = [name for name, solver in (("highs", HiGHS), ("cbc", PULP_CBC_CMD)) if solver(msg=False).available()]
+    return (*installed, "python")
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """Concrete backend for a config: auto picks HiGHS, then CBC, then python."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown solver backend: {backend}")
+    installed = available_backends()
+    if backend == "auto":
+        return installed[0]
+    if backend not in installed:
+        raise ValueError(f"Solver backend not installed: {backend}")
+    return backend
+
+
+def solve(prob, config: SolverConfig = SolverConfig(), warm_start: bool = False) -> SolveStats:
+    """
+    Solve a PuLP problem with an MILP backend ("python" is model-specific and
+    handled by the caller). warm_start passes the variables' current values;
+    CBC can crash on a large start, so a failed warm-started run is retried
+    cold.
+    """
+    backend = resolve_backend(config.backend)
+    if backend == "python":
+        raise ValueError("The python backend has no generic MILP solver")
+    started = time.perf_counter()
+    try:
+        stats = _solve_highs(prob, config) if backend == "highs" else _solve_cbc(prob, config, warm_start)
+    except PulpSolverError:
+        if not warm_start:
+            return SolveStats(backend, "error", round(time.perf_counter() - started, 3))
+        return solve(prob, config, warm_start=False)
+    stats.seconds = round(time.perf_counter() - started, 3)
+    if stats.status == "infeasible" and stats.seconds >= config.time_limit:
+        # Out of time in presolve: CBC reports "infeasible" without having searched
+        stats.status = "no_solution"
+    return stats
+
+
+def _status(prob) -> str:
+    if LpStatus[prob.status] == "Optimal":
+        if prob.sol_status == LpSolutionIntegerFeasible:
+            return "feasible"
+        if prob.sol_status == LpSolutionOptimal:
+            return "optimal"
+    if LpStatus[prob.status] == "Infeasible":
+        return "infeasible"
+    return "no_solution"
+
+
+def relative_gap(objective: float | None, bound: float | None) -> float | None:
+    if objective is None or bound is None:
+        return None
+    return round(abs(bound - objective) / max(abs(objective), 1e-9), 6)
+
+
+# CBC's summary lines; the bound is "Upper bound" when maximising
+_CBC_LOG = {
+    "objective": re.compile(r"^Objective value:\s+(\S+)", re.M),
+    "bound": re.compile(r"^(?:Lower|Upper) bound:\s+(\S+)", re.M),
+    "nodes": re.compile(r"^Enumerated nodes:\s+(\d+)", re.M),
+}
+
+
+def _solve_cbc(prob, config: SolverConfig, warm_start: bool) -> SolveStats:
+    fd, log_path = tempfile.mkstemp(prefix="cbc-", suffix=".log")
+    os.close(fd)
+    try:
+        prob.solve(PULP_CBC_CMD(
+            msg=False, warmStart=warm_start, timeLimit=config.time_limit,
+            gapRel=config.gap_rel, threads=config.threads, logPath=log_path,
+        ))
+        with open(log_path) as f:
+            log = f.read()
+    finally:
+        os.remove(log_path)
+
+    found = {key: pattern.search(log) for key, pattern in _CBC_LOG.items()}
+    status = _status(prob)
+    objective = float(found["objective"].group(1)) if found["objective"] and status != "no_solution" else None
+    bound = float(found["bound"].group(1)) if found["bound"] else None
+    if status == "optimal" and bound is None:
+        bound = objective
+    return SolveStats(
+        backend="cbc",
+        status=status,
+        seconds=0.0,
+        nodes=int(found["nodes"].group(1)) if found["nodes"] else None,
+        gap=relative_gap(objective, bound),
+        objective=objective,
+        bound=bound,
+    )
+
+
+def _solve_highs(prob, config: SolverConfig) -> SolveStats:
+    prob.solve(HiGHS(msg=False, timeLimit=config.time_limit, gapRel=config.gap_rel, threads=config.threads))
+    status = _status(prob)
+    info = prob.solverModel.getInfo()
+    objective = info.objective_function_value if status in ("optimal", "feasible") else None
+    bound = getattr(info, "mip_dual_bound", None)
+    return SolveStats(
+        backend="highs",
+        status=status,
+        seconds=0.0,
+        nodes=getattr(info, "mip_node_count", None),
+        gap=relative_gap(objective, bound),
+        objective=objective,
+        bound=bound,
+    )
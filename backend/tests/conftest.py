@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other by bare name (the app runs from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+import random
+from collections import Counter
+
+import pytest
+from pydantic import ValidationError
+
+from main import OptimizeRequest
+from optimizer import FORMATION_BOUNDS, RISK_PROFILES, SquadConstraints, SquadModel, fast_squad, prune_dominated
+from predictor import PredictionTable
+from scoring import Position
+from solver import SolverConfig, available_backends
+
+POSITIONS = ("GK", "DEF", "MID", "FWD")
+
+
+def _table(points):
+    return PredictionTable.from_rows([
+        {"player_id": i, "name": f"P{i}", "position": POSITIONS[i % 4], "club": f"C{i % 7}", "price": 4.5 + i % 5,
+         "expected_points": p, "points_per_million": p / (4.5 + i % 5), "confidence": "medium",
+         "risk_level": "medium", "fixture_played": not p}
+        for i, p in enumerate(points)
+    ])
+
+
+def test_all_fixtures_played_gives_no_squad():
+    # Every player on 0 expected points: the pool is empty
+    table = _table([0] * 60)
+    assert len(prune_dominated(table, table.player_id[:0], SquadConstraints())) == 0
+
+    model = SquadModel(table)
+    assert model.pool == {"available": 0, "kept": 0}
+    assert model.solve("balanced", 105.0) is None
+    assert model.solve("balanced", 105.0, SolverConfig(backend="python")) is None
+    assert model.solve_top(3) == []
+    assert all(point.squad is None for point in model.frontier([95.0, 105.0]))
+
+
+def test_max_per_club_must_be_positive():
+    with pytest.raises(ValidationError):
+        OptimizeRequest(max_per_club=0)
+    assert OptimizeRequest(max_per_club=1).max_per_club == 1
+
+
+def _synthetic_table(seed: int, n: int = 160, clubs: int = 12) -> PredictionTable:
+    """A pool where price roughly follows points, with some unavailable players."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        points = rng.choice((0, rng.randint(1, 12), rng.randint(1, 12)))
+        price = round(min(12.5, max(4.0, 3.5 + points * 0.6 + rng.uniform(-1.5, 1.5))) * 2) / 2
+        rows.append({
+            "player_id": i + 1, "name": f"P{i + 1}", "position": POSITIONS[rng.choice((0, 1, 1, 2, 2, 3))],
+            "club": f"C{rng.randrange(clubs)}", "price": price, "expected_points": points,
+            "points_per_million": points / price, "confidence": rng.choice(("high", "medium", "low")),
+            "risk_level": rng.choice(("low", "medium", "high")), "fixture_played": False,
+        })
+    return PredictionTable.from_rows(rows)
+
+
+def _check_squad(squad, constraints: SquadConstraints, budget: float):
+    assert len(squad.squad) == constraints.squad_size
+    assert Counter(p.position.value for p in squad.squad) == {
+        "GK": constraints.gk_count, "DEF": constraints.def_count,
+        "MID": constraints.mid_count, "FWD": constraints.fwd_count,
+    }
+    assert sum(p.price for p in squad.squad) <= budget + 1e-6
+    assert max(Counter(p.club for p in squad.squad).values()) <= constraints.max_per_club
+
+    ids = {p.player_id for p in squad.squad}
+    xi = Counter(p.position for p in squad.starting_xi)
+    assert len(squad.starting_xi) == constraints.starters
+    assert all(lo <= xi[pos] <= hi for pos, (lo, hi) in FORMATION_BOUNDS.items())
+    assert {p.player_id for p in squad.starting_xi} | {p.player_id for p in squad.bench} == ids
+    assert squad.captain.player_id in {p.player_id for p in squad.starting_xi}
+
+
+@pytest.mark.skipif("cbc" not in available_backends(), reason="CBC not installed")
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("max_per_club", (2, 3))  # 2 makes the club repair do real work
+def test_fast_squad_is_feasible_and_bounds_the_exact_optimum(seed, max_per_club):
+    table = _synthetic_table(seed)
+    constraints = SquadConstraints(max_per_club=max_per_club)
+    exact_model = SquadModel(table, constraints)
+    for budget in (85.0, 100.0):
+        for profile in RISK_PROFILES:
+            # A fresh model each time: solve() would tighten the bound with a cached MILP bound
+            fast = SquadModel(table, constraints).solve(profile, budget, SolverConfig(backend="python"))
+            assert fast is not None
+            _check_squad(fast, constraints, budget)
+
+            exact = exact_model.solve(profile, budget, SolverConfig(backend="cbc", time_limit=30))
+            assert exact.solve_stats.status == "optimal"
+            _, stats = fast_squad(table, exact_model.rows, exact_model.weights(profile), constraints, budget)
+            assert stats.bound_source == "lagrangian"
+            optimum = exact.solve_stats.objective
+            assert stats.objective <= optimum + 1e-3  # reported to 4 decimals
+            assert stats.bound >= optimum - 1e-3
+            assert fast.solve_stats.objective == pytest.approx(stats.objective)
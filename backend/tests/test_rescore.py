@@ -0,0 +1,72 @@
+import random
+
+from database import connect, migrate
+from rescore import rescore_match_stats
+from scoring import STAT_FIELDS, MatchStats, Position, calculate_fantasy_points, scoring_rules
+
+BASE_POINTS = 10  # players' points from before the first matchday
+
+
+def _db(path, rng):
+    """Three matchdays, four players with stats on most of them, all stored at stale points."""
+    conn = connect(str(path))
+    migrate(conn)
+    conn.executemany("INSERT INTO matchdays (id, name, deadline, season) VALUES (?, ?, ?, '2024-25')",
+                     [(md, f"MD{md}", f"2024-10-0{md}") for md in (1, 2, 3)])
+    expected = {}
+    for pid, pos in enumerate(("GK", "DEF", "MID", "FWD"), start=1):
+        conn.execute("INSERT INTO players (id, name, club, position, total_points) VALUES (?, ?, 'C', ?, ?)",
+                     (pid, f"P{pid}", pos, BASE_POINTS))
+        total = BASE_POINTS
+        for md in (1, 2, 3):
+            if (pid, md) == (2, 2):
+                # No stats: the snapshot still moves with the earlier matchday
+                conn.execute("INSERT INTO player_snapshots (player_id, matchday_id, total_points_before, "
+                             "total_points_after, matchday_points) VALUES (2, 2, ?, ?, 0)", (total, total))
+                continue
+            stats = {name: rng.randint(0, 1) for name in STAT_FIELDS}
+            stats["minutes"] = rng.choice((0, 30, 90))
+            stats["saves"] = rng.randint(0, 7)
+            stale = rng.randint(-2, 3)
+            conn.execute(f"INSERT INTO match_stats (player_id, matchday_id, fantasy_points, {', '.join(stats)}) "
+                         f"VALUES (?, ?, ?, {', '.join('?' * len(stats))})", (pid, md, stale, *stats.values()))
+            expected[pid, md] = calculate_fantasy_points(MatchStats(pid, Position(pos), **stats), scoring_rules("2024-25"))
+            conn.execute("UPDATE players SET total_points = total_points + ? WHERE id = ?", (stale, pid))
+            conn.execute("INSERT INTO player_snapshots (player_id, matchday_id, total_points_before, "
+                         "total_points_after, matchday_points) VALUES (?, ?, ?, ?, ?)",
+                         (pid, md, total, total + stale, stale))
+            total += stale
+    conn.commit()
+    return conn, expected
+
+
+def _tables(conn):
+    return {table: [tuple(r) for r in conn.execute(f"SELECT * FROM {table} ORDER BY id")]
+            for table in ("match_stats", "player_snapshots", "players")}
+
+
+def test_rescore_carries_deltas_into_snapshots_and_totals(tmp_path):
+    path = tmp_path / "fantasy.db"
+    conn, expected = _db(path, random.Random(5))
+
+    job = rescore_match_stats(str(path), chunk_rows=2)  # a player's rows span chunks
+
+    assert job.status == "done" and job.done == job.total == len(expected)
+    points = {(r["player_id"], r["matchday_id"]): r["fantasy_points"]
+              for r in conn.execute("SELECT player_id, matchday_id, fantasy_points FROM match_stats")}
+    assert points == expected
+    for pid in (1, 2, 3, 4):
+        total = BASE_POINTS
+        for snap in conn.execute("SELECT * FROM player_snapshots WHERE player_id = ? ORDER BY matchday_id", (pid,)):
+            md_points = expected.get((pid, snap["matchday_id"]), 0)
+            assert (snap["total_points_before"], snap["matchday_points"], snap["total_points_after"]) == \
+                (total, md_points, total + md_points)
+            total += md_points
+        assert conn.execute("SELECT total_points FROM players WHERE id = ?", (pid,)).fetchone()[0] == total
+
+    # Nothing left to change: a second run is a no-op
+    before = _tables(conn)
+    again = rescore_match_stats(str(path), chunk_rows=2)
+    assert again.status == "done" and again.changed == 0
+    assert _tables(conn) == before
+    conn.close()
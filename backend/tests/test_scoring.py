@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+import pytest
+
+from scoring import (
+    FLAG_FIELDS, STAT_FIELDS, MatchStats, Position, calculate_fantasy_points, calculate_fantasy_points_batch,
+    label_array, position_index, score_breakdown_batch, scoring_rules,
+)
+from rules import SCORING_RULE_SETS, get_scoring_rules, season_of
+
+ROWS_PER_POSITION = 3000
+
+
+def _random_stats(rng: random.Random, position: Position) -> MatchStats:
+    values = {}
+    for name in STAT_FIELDS:
+        if name in FLAG_FIELDS:
+            values[name] = rng.random() < 0.3
+        elif name == "minutes":
+            values[name] = rng.choice((0, 1, 45, 59, 60, 61, 90, rng.randint(0, 120)))
+        else:
+            values[name] = rng.choice((0, 0, 1, 2, rng.randint(0, 12)))
+    return MatchStats(player_id=0, position=position, **values)
+
+
+def test_batch_matches_scalar_reference():
+    rng = random.Random(2024)
+    for position in Position:
+        stats = [_random_stats(rng, position) for _ in range(ROWS_PER_POSITION)]
+        columns = {name: np.array([getattr(s, name) for s in stats]) for name in STAT_FIELDS}
+        positions = label_array([s.position for s in stats])
+
+        scalar = np.array([calculate_fantasy_points(s) for s in stats])
+        batch = calculate_fantasy_points_batch(positions, **columns)
+        breakdown = score_breakdown_batch(positions, **columns)
+
+        np.testing.assert_array_equal(batch, scalar, err_msg=position.value)
+        np.testing.assert_array_equal(sum(breakdown.values()), scalar, err_msg=position.value)
+
+
+def test_batch_matches_scalar_on_mixed_positions():
+    rng = random.Random(7)
+    stats = [_random_stats(rng, rng.choice(list(Position))) for _ in range(ROWS_PER_POSITION)]
+    columns = {name: np.array([getattr(s, name) for s in stats]) for name in STAT_FIELDS}
+    positions = label_array([s.position for s in stats])
+
+    scalar = np.array([calculate_fantasy_points(s) for s in stats])
+    np.testing.assert_array_equal(calculate_fantasy_points_batch(positions, **columns), scalar)
+    np.testing.assert_array_equal(sum(score_breakdown_batch(positions, **columns).values()), scalar)
+
+
+def test_unknown_position_is_rejected():
+    assert position_index(label_array(list(Position))).tolist() == [0, 1, 2, 3]
+    for labels in (["GK", "GOALIE"], ["MID", "X"], np.array(["DEF", None], dtype=object)):
+        with pytest.raises(ValueError, match="Unknown position"):
+            position_index(labels if isinstance(labels, np.ndarray) else label_array(labels))
+    with pytest.raises(ValueError, match="Unknown position"):
+        calculate_fantasy_points_batch(label_array(["GOALIE"]), minutes=90, clean_sheet=1)
+
+
+# Known stat lines, scored by hand from the published 2024-25 rules
+KNOWN_LINES = [
+    # GK: appearance 1, 60' 1, clean sheet 4, 7 saves // 3 = 2, penalty save 5
+    ("GK", dict(minutes=90, clean_sheet=True, saves=7, penalty_saved=1), 13),
+    # GK: 1 + 1, 5 conceded // 2 = -2, 3 saves = 1, yellow -1
+    ("GK", dict(minutes=90, goals_conceded=5, saves=3, yellow_card=True), 0),
+    # DEF: 1 + 1, goal 6, assist 3, clean sheet 4, 7 recoveries // 3 = 2
+    ("DEF", dict(minutes=90, goals=1, assists=1, clean_sheet=True, balls_recovered=7), 17),
+    # DEF: appearance 1 (no 60'), 3 conceded // 2 = -1, own goal -2, red -3
+    ("DEF", dict(minutes=45, goals_conceded=3, own_goal=1, red_card=True), -5),
+    # MID: 1 + 1, 2 goals 10, one from outside the box 1, clean sheet 1, player of the match 3
+    ("MID", dict(minutes=90, goals=2, goals_outside_box=1, clean_sheet=True, player_of_match=True), 17),
+    # MID: 1 + 1, a red replaces the yellow: -3
+    ("MID", dict(minutes=70, yellow_card=True, red_card=True), -1),
+    # MID: appearance 1, penalty conceded -1
+    ("MID", dict(minutes=20, penalty_conceded=1), 0),
+    # FWD: 1 + 1, 3 goals 12, penalty won 2, penalty missed -2, 2 recoveries // 3 = 0
+    ("FWD", dict(minutes=90, goals=3, penalty_won=1, penalty_missed=1, balls_recovered=2), 14),
+    # FWD: clean sheet and goals conceded don't count for forwards
+    ("FWD", dict(minutes=60, clean_sheet=True, goals_conceded=4), 2),
+    ("FWD", dict(minutes=0), 0),
+]
+
+
+@pytest.mark.parametrize("position, stats, points", KNOWN_LINES)
+def test_known_stat_lines(position, stats, points):
+    rules = scoring_rules("2024-25")
+    assert calculate_fantasy_points(MatchStats(0, Position(position), **stats), rules) == points
+    columns = {name: np.array([value]) for name, value in stats.items()}
+    assert calculate_fantasy_points_batch(label_array([position]), **columns, rules=rules).tolist() == [points]
+
+
+@pytest.mark.parametrize("date, season", [
+    ("2024-09-17", "2024-25"),
+    ("2025-02-18T20:00:00", "2024-25"),
+    ("2025-06-30", "2024-25"),
+    ("2025-07-01", "2025-26"),
+    ("1999-12-31", "1999-00"),
+    (None, None),
+    ("", None),
+    ("2025", None),
+    ("TBD", None),
+])
+def test_season_of(date, season):
+    assert season_of(date) == season
+
+
+def test_get_scoring_rules_picks_latest_set_up_to_the_season(monkeypatch):
+    assert get_scoring_rules()[0] == "2024-25"
+    assert get_scoring_rules("2024-25")[0] == "2024-25"
+    assert get_scoring_rules("2030-31")[0] == "2024-25"
+
+    later = dict(SCORING_RULE_SETS["2024-25"], goals={"GK": 6, "DEF": 6, "MID": 5, "FWD": 5})
+    monkeypatch.setitem(SCORING_RULE_SETS, "2026-27", later)
+    assert get_scoring_rules() == ("2026-27", later)
+    assert get_scoring_rules("2025-26")[0] == "2024-25"
+    assert get_scoring_rules("2026-27")[0] == "2026-27"
+    assert get_scoring_rules("2027-28")[0] == "2026-27"
+
+
+def test_seasons_before_the_first_rule_set_use_the_earliest():
+    assert get_scoring_rules("2019-20") == ("2024-25", SCORING_RULE_SETS["2024-25"])
+    assert scoring_rules("2019-20").version == "2024-25"
@@ -0,0 +1,157 @@
+import random
+from itertools import combinations, permutations
+
+from predictor import PredictionTable
+from transfer_engine import SquadMember, TransferEngine
+
+SHAPE = {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
+
+
+def _table(players):
+    return PredictionTable.from_rows([
+        {"player_id": pid, "name": f"P{pid}", "position": pos, "club": club, "price": price,
+         "expected_points": points, "points_per_million": points / price, "confidence": "medium",
+         "risk_level": "medium", "fixture_played": False}
+        for pid, pos, club, price, points in players
+    ])
+
+
+def _apply(players, squad, moves, budget, max_per_club):
+    """Make the moves one at a time under /api/my-squad/transfer's checks; the squad after them."""
+    info = {pid: SquadMember(pid, pos, price, club) for pid, pos, club, price, _ in players}
+    squad = list(squad)
+    for move in moves:
+        out = next(m for m in squad if m.player_id == move.out_id)
+        bought = info[move.in_id]
+        assert all(m.player_id != bought.player_id for m in squad), "already in squad"
+        assert bought.position == out.position, "position mismatch"
+        after = [m for m in squad if m is not out]
+        assert round(sum(m.price for m in after) + bought.price, 1) <= budget, "over budget"
+        assert sum(m.club == bought.club for m in after) < max_per_club, "club limit"
+        squad = after + [bought]
+    return squad
+
+
+def _brute_force(players, squad, k, budget, max_per_club):
+    """Best gain with at most t transfers (made one at a time) for t = 1..k, by enumeration."""
+    points = {pid: pts for pid, _, _, _, pts in players}
+    owned = {m.player_id for m in squad}
+    pool = [(pid, pos, club, price) for pid, pos, club, price, _ in players if pid not in owned]
+    best = [0] * (k + 1)
+    for t in range(1, k + 1):
+        best[t] = best[t - 1]
+        for outs in combinations(squad, t):
+            for ins in combinations(pool, t):
+                if sorted(m.position for m in outs) != sorted(p[1] for p in ins):
+                    continue
+                gain = sum(points[p[0]] for p in ins) - sum(points.get(m.player_id, 0) for m in outs)
+                if gain > best[t] and any(_valid_order(squad, sold, bought, budget, max_per_club)
+                                          for sold in permutations(outs) for bought in permutations(ins)):
+                    best[t] = gain
+    return best[1:]
+
+
+def _valid_order(squad, outs, ins, budget, max_per_club):
+    squad = list(squad)
+    for out, (pid, pos, club, price) in zip(outs, ins):
+        after = [m for m in squad if m is not out]
+        if pos != out.position or round(sum(m.price for m in after) + price, 1) > budget:
+            return False
+        if sum(m.club == club for m in after) >= max_per_club:
+            return False
+        squad = after + [SquadMember(pid, pos, price, club)]
+    return True
+
+
+def test_unpredicted_member_counts_towards_budget_and_can_be_sold():
+    # 14 cheap predicted players plus a 10.8 FWD whose club has no fixture
+    players, squad = [], []
+    pid = 0
+    for pos, n in SHAPE.items():
+        for _ in range(n - (pos == "FWD")):
+            pid += 1
+            players.append((pid, pos, f"C{pid}", 4.0, 2))
+            squad.append(SquadMember(pid, pos, 4.0, f"C{pid}"))
+    squad.append(SquadMember(999, "FWD", 10.8, "Idle FC"))
+    for pos in SHAPE:  # better but pricier replacements
+        for price, points in ((5.5, 5), (9.0, 8)):
+            pid += 1
+            players.append((pid, pos, f"C{pid}", price, points))
+    budget = sum(m.price for m in squad)  # 66.8: no slack
+
+    levels = TransferEngine(_table(players)).best(squad, 2, budget, max_per_club=3)
+
+    for level in levels:
+        assert level.cost_diff <= 0
+    assert [m.out_id for m in levels[0].moves] == [999]
+    assert levels[0].points_gain == 8  # 10.8 FWD (0 points) out, 9.0 FWD (8 points) in
+    assert levels[1].points_gain == 8 + 3  # the 1.8 saved buys a 5.5 for a 4.0
+
+
+def test_unpredicted_member_counts_towards_club_limit():
+    players = [(1, "FWD", "A", 5.0, 1), (2, "FWD", "A", 5.0, 9), (3, "FWD", "B", 5.0, 4), (4, "MID", "A", 5.0, 3)]
+    squad = [SquadMember(1, "FWD", 5.0, "A"), SquadMember(4, "MID", 5.0, "A"), SquadMember(50, "GK", 5.0, "A")]
+    levels = TransferEngine(_table(players)).best(squad, 1, 15.0, max_per_club=2)
+    # Player 2 would make three from A with the unpredicted GK, so 1 goes for 3
+    assert [(m.out_id, m.in_id) for m in levels[0].moves] == [(1, 3)]
+
+
+def test_matches_brute_force_with_unpredicted_members():
+    rng = random.Random(7)
+    clubs = ["A", "B", "C", "D", "E"]
+    for _ in range(25):
+        players = []
+        for pid in range(1, 41):
+            pos = rng.choice(list(SHAPE))
+            players.append((pid, pos, rng.choice(clubs), rng.choice((4.0, 4.5, 5.5, 7.0, 9.5)), rng.randint(0, 9)))
+        by_pos = {pos: [p for p in players if p[1] == pos] for pos in SHAPE}
+        squad = []
+        for pos, n in SHAPE.items():
+            for p in rng.sample(by_pos[pos], min(n, len(by_pos[pos]))):
+                if rng.random() < 0.2:  # no prediction: not in the table
+                    players.remove(p)
+                squad.append(SquadMember(p[0], pos, p[3], p[2]))
+        budget = sum(m.price for m in squad) + rng.choice((0.0, 0.5, 2.0))
+        clubs_now = [m.club for m in squad]
+        max_per_club = max(clubs_now.count(c) for c in set(clubs_now))
+
+        levels = TransferEngine(_table(players)).best(squad, 2, budget, max_per_club)
+
+        assert [level.points_gain for level in levels] == _brute_force(players, squad, 2, budget, max_per_club)
+        for level in levels:
+            _apply(players, squad, level.moves, budget, max_per_club)
+
+
+def test_moves_come_in_an_order_the_transfer_endpoint_accepts():
+    # Club A is at its limit: the A MID can only come in after the A DEF has gone,
+    # and the DEF upgrade needs all the slack, so it has to go first
+    players = [
+        (1, "GK", "A", 5.0, 2), (2, "DEF", "A", 4.0, 2), (3, "FWD", "A", 5.0, 2), (4, "MID", "C", 5.0, 2),
+        (5, "MID", "A", 4.5, 7), (6, "DEF", "B", 6.0, 6),
+    ]
+    squad = [SquadMember(pid, pos, price, club) for pid, pos, club, price, _ in players[:4]]
+    budget = sum(m.price for m in squad) + 2.0
+
+    levels = TransferEngine(_table(players)).best(squad, 2, budget, max_per_club=3)
+
+    assert [(m.out_id, m.in_id) for m in levels[0].moves] == [(2, 6)]
+    assert levels[1].points_gain == 4 + 5
+    assert [(m.out_id, m.in_id) for m in levels[1].moves] == [(2, 6), (4, 5)]
+    _apply(players, squad, levels[1].moves, budget, max_per_club=3)
+
+
+def test_set_that_cannot_be_made_one_move_at_a_time_is_skipped():
+    # Selling the A DEF for the B DEF (+2.0) needs more than the 1.0 slack until
+    # the MID swap (-3.0) is made, which buys from A, at its limit until the A DEF goes
+    players = [
+        (1, "DEF", "A", 4.0, 1), (2, "MID", "C", 9.0, 1), (3, "FWD", "A", 5.0, 1),
+        (4, "DEF", "B", 6.0, 5), (5, "MID", "A", 6.0, 5),
+    ]
+    squad = [SquadMember(pid, pos, price, club) for pid, pos, club, price, _ in players[:3]]
+    budget = sum(m.price for m in squad) + 1.0
+
+    levels = TransferEngine(_table(players)).best(squad, 2, budget, max_per_club=2)
+
+    for level in levels:
+        _apply(players, squad, level.moves, budget, max_per_club=2)
+    assert [level.points_gain for level in levels] == _brute_force(players, squad, 2, budget, 2) == [0, 0]
@@ -0,0 +1,252 @@
+"""
+Best-k transfers engine.
+
+Given the current squad and at most k transfers, finds the provably best
+set of position-for-position swaps under the budget and club limit, for
+every level 1..k (best with at most that many transfers). Gain is squad
+expected points in minus out.
+
+Candidates are indexed once per prediction set: per position, sorted by
+expected points (then price). A query prunes each list to the players that
+could appear in an optimal answer (fewer than k cheaper-or-equal, better-or-
+equal alternatives that are always interchangeable with them), enumerates
+the sell sets by their upper bound and fills each with a bounded
+depth-first search over the indexed lists. A set only counts if its moves
+can be made one at a time, each within the budget and the club limit (as
+/api/my-squad/transfer checks them); its moves come back in such an order.
+
+The squad itself comes from the players table, not the prediction set: a
+member with no prediction (e.g. their club has no fixture) still counts
+towards the budget and the club limit, and is a sale worth 0 points.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import combinations
+
+import numpy as np
+
+from predictor import PredictionTable
+from scoring import Position
+
+MAX_TRANSFERS = 5
+POSITIONS = [pos.value for pos in Position]
+
+
+@dataclass
+class SquadMember:
+    player_id: int
+    position: str
+    price: float
+    club: str
+
+
+@dataclass
+class TransferMove:
+    out_id: int
+    in_id: int
+    points_gain: int
+    cost_diff: float
+
+
+@dataclass
+class TransferSet:
+    max_transfers: int  # level: best with at most this many transfers
+    moves: list[TransferMove] = field(default_factory=list)  # in order: each valid after the ones before
+    points_gain: int = 0
+    cost_diff: float = 0.0
+
+
+class TransferEngine:
+    """Per-position candidate index over one prediction set, queried per squad."""
+
+    def __init__(self, table: PredictionTable):
+        self.table = table
+        self.row_of = {int(pid): i for i, pid in enumerate(table.player_id)}
+        self.price10 = np.rint(table.price * 10).astype(np.int64)  # money in tenths: exact sums
+        clubs, self.club_code = np.unique(table.club.astype(str), return_inverse=True)
+        self.club_index = {str(club): code for code, club in enumerate(clubs)}
+        order = np.lexsort((table.player_id, self.price10, -table.expected_points))
+        self.by_position = {pos: order[table.position[order] == pos] for pos in POSITIONS}
+
+    def _candidates(self, pos: str, in_squad: np.ndarray, free_club: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indexed candidates for a position that can appear in an optimal set.
+
+        A player is dropped when k earlier players in the list (so at least
+        as many points) cost no more and are interchangeable with them: same
+        club, or a club that can't reach the limit within k transfers. At
+        most k-1 of those are already bought, so one can always take their
+        place.
+        """
+        rows = self.by_position[pos]
+        rows = rows[~in_squad[rows]]
+        price, club = self.price10[rows], self.club_code[rows]
+        earlier = np.tri(len(rows), k=-1, dtype=bool)
+        dominates = earlier & (price[None, :] <= price[:, None]) & (
+            (club[None, :] == club[:, None]) | free_club[club][None, :]
+        )
+        return rows[dominates.sum(axis=1) < k]
+
+    def best(self, squad: list[SquadMember], k: int, budget: float, max_per_club: int) -> list[TransferSet]:
+        """Best transfer set with at most 1..k transfers (index t-1 = level t)."""
+        table = self.table
+        exp = table.expected_points
+        # Squad members by index into `squad`; clubs outside the prediction set get their own codes
+        club_index = dict(self.club_index)
+        for member in squad:
+            club_index.setdefault(member.club, len(club_index))
+        rows = [self.row_of.get(member.player_id) for member in squad]
+        pos_of = [member.position for member in squad]
+        exp_of = [int(exp[row]) if row is not None else 0 for row in rows]
+        price_of = [int(round(member.price * 10)) for member in squad]
+        club_of = [club_index[member.club] for member in squad]
+
+        in_squad = np.zeros(len(exp), dtype=bool)
+        in_squad[[row for row in rows if row is not None]] = True
+        club_count = np.bincount(np.array(club_of, dtype=np.int64), minlength=len(club_index))
+        free_club = club_count + k - 1 < max_per_club
+
+        cands, cum = {}, {}
+        for pos in POSITIONS:
+            cand_rows = self._candidates(pos, in_squad, free_club, k)
+            cands[pos] = [(int(i), int(exp[i]), int(self.price10[i]), int(self.club_code[i])) for i in cand_rows]
+            cum[pos] = np.concatenate(([0], np.cumsum(exp[cand_rows]))).tolist()  # top-m sums
+        min_price = {pos: min((c[2] for c in cands[pos]), default=0) for pos in POSITIONS}
+        avail = int(round(budget * 10)) - sum(price_of)
+
+        # Sell sets by upper bound: best m candidates per position minus the sold points
+        out_sets = []
+        for t in range(1, k + 1):
+            for outs in combinations(range(len(squad)), t):
+                need = Counter(pos_of[i] for i in outs)
+                if any(m > len(cands.get(pos, ())) for pos, m in need.items()):
+                    continue
+                sold = sum(exp_of[i] for i in outs)
+                out_sets.append((sum(cum[pos][m] for pos, m in need.items()) - sold, outs, need, sold))
+        out_sets.sort(key=lambda o: -o[0])
+
+        best_gain = [0] * (k + 1)  # best_gain[t]: best with at most t transfers
+        best_set: list[tuple | None] = [None] * (k + 1)
+
+        for bound, outs, need, sold in out_sets:
+            t = len(outs)
+            if bound <= best_gain[t]:
+                continue
+            counts = club_count.tolist()
+            for i in outs:
+                counts[club_of[i]] -= 1
+            slots = [pos for pos in POSITIONS for _ in range(need.get(pos, 0))]
+            # Per slot: slots of its position left (itself included), best points
+            # of the later positions, cheapest spend after it
+            left = [slots[s:].count(slots[s]) for s in range(len(slots))]
+            later = [sum(cum[p][need[p]] for p in POSITIONS[POSITIONS.index(pos) + 1:] if p in need) for pos in slots]
+            rest_cost = [sum(min_price[p] for p in slots[s + 1:]) for s in range(len(slots))]
+            limit = avail + sum(price_of[i] for i in outs)
+            order = partial(self._order, outs, club_count.tolist(), avail, max_per_club, pos_of, price_of, club_of)
+            found = self._fill(slots, left, later, rest_cost, cands, cum, counts, max_per_club, limit, -sold,
+                               best_gain[t], order)
+            if found is not None:
+                gain, sequence = found
+                for level in range(t, k + 1):
+                    if gain > best_gain[level]:
+                        best_gain[level], best_set[level] = gain, sequence
+
+        return [self._transfer_set(level, best_set[level], exp_of, squad) for level in range(1, k + 1)]
+
+    def _order(self, outs, counts, avail, max_per_club, pos_of, price_of, club_of, ins):
+        """
+        The set's (sold, bought) moves in an order that make_transfer accepts
+        one at a time (every prefix within budget and the club limit), or
+        None if no pairing and order does. Cheapest move first where there
+        is a choice; failed (sold left, bought left) states are remembered,
+        so at most 2^k * 2^k states are tried.
+        """
+        table = self.table
+        failed = set()
+        sequence = []
+
+        def step(outs_left, ins_left, avail):
+            if not outs_left:
+                return True
+            if (outs_left, ins_left) in failed:
+                return False
+            moves = sorted(
+                (int(self.price10[i]) - price_of[o], o, i)
+                for o in outs_left for i in ins_left if table.position[i] == pos_of[o]
+            )
+            for diff, o, i in moves:
+                if diff > avail:
+                    break
+                sold_club, bought_club = club_of[o], int(self.club_code[i])
+                if counts[bought_club] - (sold_club == bought_club) >= max_per_club:
+                    continue
+                counts[sold_club] -= 1
+                counts[bought_club] += 1
+                sequence.append((o, i))
+                if step(outs_left - {o}, ins_left - {i}, avail - diff):
+                    return True
+                sequence.pop()
+                counts[bought_club] -= 1
+                counts[sold_club] += 1
+            failed.add((outs_left, ins_left))
+            return False
+
+        return list(sequence) if step(frozenset(outs), frozenset(ins), avail) else None
+
+    @staticmethod
+    def _fill(slots, left, later, rest_cost, cands, cum, counts, max_per_club, limit, base, target, order):
+        """
+        Best buys for the sell set's slots that beat target, as (gain, the
+        moves in order) with order(buys) giving the moves (None if no set
+        can be made one transfer at a time).
+
+        Slots of one position take candidates in increasing list order, so
+        every buy set is visited once; the list is sorted by points, so once
+        the bound drops to the target the rest of the position is skipped.
+        """
+        best = [target, None]
+        picked = []
+        n = len(slots)
+
+        def visit(s, start, gain, spent):
+            if s == n:
+                if gain > best[0] and (sequence := order(picked)) is not None:
+                    best[0], best[1] = gain, sequence
+                return
+            pc, pcum, m = cands[slots[s]], cum[slots[s]], left[s]
+            for j in range(start, len(pc) - m + 1):
+                if gain + pcum[j + m] - pcum[j] + later[s] <= best[0]:
+                    break
+                row, points, price, club = pc[j]
+                if spent + price + rest_cost[s] > limit or counts[club] >= max_per_club:
+                    continue
+                counts[club] += 1
+                picked.append(row)
+                visit(s + 1, j + 1 if m > 1 else 0, gain + points, spent + price)
+                picked.pop()
+                counts[club] -= 1
+
+        visit(0, 0, base, 0)
+        return None if best[1] is None else (best[0], best[1])
+
+    def _transfer_set(self, level: int, sequence, exp_of: list[int], squad: list[SquadMember]) -> TransferSet:
+        if sequence is None:
+            return TransferSet(max_transfers=level)
+        table = self.table
+        moves = [
+            TransferMove(
+                out_id=squad[o].player_id,
+                in_id=int(table.player_id[i]),
+                points_gain=int(table.expected_points[i]) - exp_of[o],
+                cost_diff=round((int(self.price10[i]) - int(round(squad[o].price * 10))) / 10, 1),
+            )
+            for o, i in sequence  # already in an order make_transfer accepts one at a time
+        ]
+        return TransferSet(
+            max_transfers=level,
+            moves=moves,
+            points_gain=sum(m.points_gain for m in moves),
+            cost_diff=round(sum(m.cost_diff for m in moves), 1),
+        )
@@ -0,0 +1,243 @@
+"""
+Multi-matchday transfer planner.
+
+Starting from the current squad, chooses which transfers to make before
+each of the next N matchdays to maximise horizon expected points (XI +
+captain, small bench weight) minus transfer hits. One ILP covers all
+matchdays, so it can take a hit now to save one later or bank a free
+transfer. Per-matchday budget and club limits come from the stage rules;
+free transfers follow rules.FREE_TRANSFERS ("before_<stage>" = unlimited
+when entering a stage) and the league-phase carry-forward.
+
+CBC runs under a time limit and is warm-started with the "no transfers"
+plan, so it always has a feasible incumbent: when the limit hits, the best
+plan found so far is returned and flagged as not proven optimal.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from pulp import LpMaximize, LpProblem, LpVariable, lpSum
+
+from horizon import HorizonMatrix
+from optimizer import FORMATION_BOUNDS
+from rules import FREE_TRANSFERS, get_stage_rules
+from scoring import Position
+from solver import SolverConfig, solve as solve_milp
+
+SQUAD_COMPOSITION = {Position.GK: 2, Position.DEF: 5, Position.MID: 5, Position.FWD: 3}
+STARTERS = 11
+BENCH_WEIGHT = 0.05  # bench points count a little (auto-subs)
+HIT_TIEBREAK = 0.01  # never pay a hit just to bank a free transfer
+POOL_PER_POSITION = {Position.GK: 8, Position.DEF: 25, Position.MID: 25, Position.FWD: 15}
+DEFAULT_TIME_LIMIT = 5.0  # seconds
+
+
+@dataclass
+class MatchdayPlan:
+    matchday_id: int
+    matchday_name: str
+    stage: str
+    transfers_in: list[dict] = field(default_factory=list)
+    transfers_out: list[dict] = field(default_factory=list)
+    free_transfers: int | None = None  # None = unlimited
+    hits: int = 0
+    penalty: int = 0
+    expected_points: int = 0  # XI + captain
+    captain_id: int | None = None
+    starting_ids: list[int] = field(default_factory=list)
+    squad_cost: float = 0.0
+
+
+@dataclass
+class TransferPlan:
+    matchdays: list[MatchdayPlan]
+    total_expected: int  # expected points minus penalties
+    baseline_expected: int  # same horizon with no transfers
+    status: str  # "optimal", "time_limit" (best found), or the solver's failure status
+    solve_seconds: float
+    pool_size: int
+
+
+def free_transfer_schedule(stages: list[str], previous_stage: str | None, made_now: int = 0) -> list[dict]:
+    """
+    Per matchday: free transfers (None = unlimited), whether unused ones can
+    carry to the next matchday, and the max carry.
+    """
+    schedule = []
+    prev = previous_stage
+    for j, stage in enumerate(stages):
+        rules = get_stage_rules(stage)
+        if stage != prev and f"before_{stage}" in FREE_TRANSFERS:
+            free = None
+        else:
+            ft = FREE_TRANSFERS.get(stage, 2)
+            free = None if ft == "unlimited" else int(ft)
+            if j == 0 and free is not None:
+                free = max(0, free - made_now)
+        schedule.append({
+            "free": free,
+            "carry": bool(rules.get("can_carry_forward")) and free is not None,
+            "max_carry": rules.get("max_carry", 0),
+            "penalty": rules["transfer_penalty"],
+        })
+        prev = stage
+    return schedule
+
+
+def _candidate_pool(horizon: HorizonMatrix, squad_rows: set[int]) -> list[int]:
+    """Current squad plus the best players per position by horizon total."""
+    totals = horizon.totals()
+    positions = np.array([p["position"] for p in horizon.players])
+    pool = set(squad_rows)
+    for pos, k in POOL_PER_POSITION.items():
+        rows = np.flatnonzero((positions == pos.value) & (totals > 0))
+        pool.update(rows[np.argsort(-totals[rows], kind="stable")][:k].tolist())
+    return sorted(pool)
+
+
+def plan_transfers(
+    horizon: HorizonMatrix,
+    squad_ids: list[int],
+    previous_stage: str | None = None,
+    transfers_made: int = 0,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+) -> TransferPlan:
+    """Best transfer plan over the horizon's matchdays for the given squad."""
+    started = time.perf_counter()
+    row_of = horizon.row_index()
+    squad_rows = {row_of[pid] for pid in squad_ids if pid in row_of}
+    pool = _candidate_pool(horizon, squad_rows)
+    mds = range(len(horizon.matchdays))
+    stages = [md["stage"] for md in horizon.matchdays]
+    schedule = free_transfer_schedule(stages, previous_stage, transfers_made)
+    points = np.where(horizon.played, 0, horizon.expected).astype(float)
+    players = horizon.players
+    price = {i: float(players[i]["price"]) for i in pool}
+    squad_cost = sum(price[i] for i in squad_rows)
+
+    prob = LpProblem("Transfer_Plan", LpMaximize)
+
+    def binary(name, i, j):
+        return LpVariable(f"{name}_{players[i]['player_id']}_{j}", cat="Binary")
+
+    x = {(i, j): binary("x", i, j) for i in pool for j in mds}  # in squad
+    buy = {(i, j): binary("buy", i, j) for i in pool for j in mds}
+    sell = {(i, j): binary("sell", i, j) for i in pool for j in mds}
+    s = {(i, j): binary("s", i, j) for i in pool for j in mds}  # starts
+    c = {(i, j): binary("c", i, j) for i in pool for j in mds}  # captain
+    hits = {j: LpVariable(f"hits_{j}", lowBound=0, cat="Integer") for j in mds}
+    unused = {j: LpVariable(f"unused_{j}", lowBound=0) for j in mds}
+    carry = {j: LpVariable(f"carry_{j}", lowBound=0, cat="Integer") for j in mds}
+
+    objective = []
+    for j in mds:
+        rules = get_stage_rules(stages[j])
+        ft = schedule[j]
+        n_transfers = lpSum(buy[i, j] for i in pool)
+
+        for i in pool:
+            before = x[i, j - 1] if j > 0 else (1 if i in squad_rows else 0)
+            prob += x[i, j] == before + buy[i, j] - sell[i, j]
+            prob += s[i, j] <= x[i, j]
+            prob += c[i, j] <= s[i, j]
+
+        # Budget (an over-budget current squad may keep its value) and club limits
+        prob += lpSum(price[i] * x[i, j] for i in pool) <= max(rules["budget"], squad_cost), f"budget_{j}"
+        by_club = {}
+        for i in pool:
+            by_club.setdefault(players[i]["club"], []).append(x[i, j])
+        for n, members in enumerate(by_club.values()):
+            prob += lpSum(members) <= rules["max_per_club"], f"club_{j}_{n}"
+
+        # Squad composition and XI formation
+        for pos, count in SQUAD_COMPOSITION.items():
+            members = [i for i in pool if players[i]["position"] == pos.value]
+            lo, hi = FORMATION_BOUNDS[pos]
+            prob += lpSum(x[i, j] for i in members) == count
+            prob += lpSum(s[i, j] for i in members) >= lo
+            prob += lpSum(s[i, j] for i in members) <= hi
+        prob += lpSum(s[i, j] for i in pool) == STARTERS
+        prob += lpSum(c[i, j] for i in pool) == 1
+
+        # Free transfers: transfers - hits + unused == free (+ carried in)
+        if ft["free"] is None:
+            prob += hits[j] == 0
+            prob += carry[j] == 0
+            prob += unused[j] == 0
+        else:
+            carried_in = carry[j] if j > 0 and schedule[j - 1]["carry"] else 0
+            if not (j > 0 and schedule[j - 1]["carry"]):
+                prob += carry[j] == 0
+            prob += n_transfers - hits[j] + unused[j] == ft["free"] + carried_in
+        if j + 1 in mds and ft["carry"]:
+            prob += carry[j + 1] <= unused[j]
+            prob += carry[j + 1] <= ft["max_carry"]
+
+        objective += [points[i, j] * (s[i, j] + c[i, j]) + BENCH_WEIGHT * points[i, j] * (x[i, j] - s[i, j])
+                      for i in pool]
+        objective.append(-(ft["penalty"] + HIT_TIEBREAK) * hits[j])
+    prob += lpSum(objective)
+
+    # Anytime baseline: keep the current squad
+    for (i, j), var in x.items():
+        var.setInitialValue(1 if i in squad_rows else 0)
+    for var in list(buy.values()) + list(sell.values()) + list(hits.values()):
+        var.setInitialValue(0)
+
+    stats = solve_milp(prob, SolverConfig(time_limit=time_limit), warm_start=True)
+    elapsed = round(time.perf_counter() - started, 3)
+    baseline = _baseline_points(points, squad_rows, players, mds)
+    if not stats.has_solution:
+        return TransferPlan([], 0, baseline, stats.status, elapsed, len(pool))
+
+    def picked(var):
+        return var.varValue is not None and var.varValue > 0.5
+
+    plans, total = [], 0.0
+    for j in mds:
+        md = horizon.matchdays[j]
+        squad = [i for i in pool if picked(x[i, j])]
+        xi = [i for i in squad if picked(s[i, j])]
+        captain = next(i for i in xi if picked(c[i, j]))
+        n_hits = round(hits[j].varValue or 0)
+        penalty = n_hits * schedule[j]["penalty"]
+        expected = int(sum(points[i, j] for i in xi) + points[captain, j])
+        total += expected - penalty
+        plans.append(MatchdayPlan(
+            matchday_id=md["id"],
+            matchday_name=md["name"],
+            stage=md["stage"],
+            transfers_in=[{**players[i], "expected": int(points[i, j])} for i in pool if picked(buy[i, j])],
+            transfers_out=[{**players[i], "expected": int(points[i, j])} for i in pool if picked(sell[i, j])],
+            free_transfers=schedule[j]["free"] if schedule[j]["free"] is None
+            else schedule[j]["free"] + round(carry[j].varValue or 0),
+            hits=n_hits,
+            penalty=penalty,
+            expected_points=expected,
+            captain_id=players[captain]["player_id"],
+            starting_ids=[players[i]["player_id"] for i in xi],
+            squad_cost=round(sum(price[i] for i in squad), 1),
+        ))
+
+    status = "time_limit" if stats.status == "feasible" else "optimal"
+    return TransferPlan(plans, int(total), baseline, status, elapsed, len(pool))
+
+
+def _baseline_points(points, squad_rows, players, mds) -> int:
+    """Horizon points of the current squad with its best XI each matchday, no transfers."""
+    total = 0
+    for j in mds:
+        by_pos = {pos: sorted((points[i, j] for i in squad_rows if players[i]["position"] == pos.value), reverse=True)
+                  for pos in SQUAD_COMPOSITION}
+        xi = []
+        for pos, (lo, _) in FORMATION_BOUNDS.items():
+            xi += by_pos[pos][:lo]
+        rest = []
+        for pos, (lo, hi) in FORMATION_BOUNDS.items():
+            if pos != Position.GK:
+                rest += by_pos[pos][lo:hi]
+        xi += sorted(rest, reverse=True)[:STARTERS - len(xi)]
+        total += sum(xi) + (max(xi) if xi else 0)
+    return int(total)
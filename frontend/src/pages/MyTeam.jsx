@@ -111,6 +111,8 @@ export default function MyTeam() {
   const [transferPlayer, setTransferPlayer] = useState(null)
   const [suggestions, setSuggestions] = useState([])
   const [showSuggestions, setShowSuggestions] = useState(false)
+  const [bestK, setBestK] = useState(2)
+  const [bestTransfers, setBestTransfers] = useState(null)
   const [msg, setMsg] = useState('')
   const [boosters, setBoosters] = useState(null)
   
@@ -146,6 +148,7 @@ export default function MyTeam() {
       setMsg(`❌ ${d.detail}`)
     }
     setTimeout(() => setMsg(''), 5000)
+    return r.ok
   }
 
   const setCaptain = async (pid) => {
@@ -165,6 +168,19 @@ export default function MyTeam() {
     })
   }
 
+  const loadBestTransfers = (k = bestK) => {
+    setBestK(k)
+    fetch(`/api/my-squad/best-transfers?k=${k}`).then(r => r.json()).then(setBestTransfers)
+  }
+
+  const applyMoves = async (moves) => {
+    // In order: each move is only valid after the ones before it
+    for (const m of moves) {
+      if (!(await doTransfer(m.out_id, m.in_id))) break
+    }
+    setBestTransfers(null)
+  }
+
   const REQUIRED = { GK: 2, DEF: 5, MID: 5, FWD: 3 }
 
   const buildCounts = () => {
@@ -510,8 +526,59 @@ export default function MyTeam() {
           className="flex items-center gap-2 px-4 py-2.5 bg-purple-500/20 hover:bg-purple-500/30 text-purple-400 rounded-xl text-sm font-medium transition">
           <Zap size={16} /> Long-term
         </button>
+        <button onClick={() => loadBestTransfers()}
+          className="flex items-center gap-2 px-4 py-2.5 bg-ucl-green/20 hover:bg-ucl-green/30 text-ucl-green rounded-xl text-sm font-medium transition">
+          <ArrowLeftRight size={16} /> Best transfers
+        </button>
       </div>
 
+      {/* Best 1..k transfers */}
+      {bestTransfers?.levels && (
+        <div className="bg-ucl-blue/20 border border-ucl-accent/10 rounded-xl p-5 space-y-3">
+          <div className="flex items-center justify-between">
+            <h3 className="text-sm font-semibold text-ucl-green flex items-center gap-2">
+              <ArrowLeftRight size={16} /> Best transfers
+            </h3>
+            <div className="flex items-center gap-1">
+              {[1, 2, 3, 4, 5].map(k => (
+                <button key={k} onClick={() => loadBestTransfers(k)}
+                  className={`w-7 h-7 rounded-lg text-xs font-medium transition ${k === bestK ? 'bg-ucl-green/30 text-ucl-green' : 'bg-ucl-dark/40 text-gray-400 hover:text-white'}`}>
+                  {k}
+                </button>
+              ))}
+              <button onClick={() => setBestTransfers(null)} className="text-gray-500 hover:text-white text-xs ml-2">✕</button>
+            </div>
+          </div>
+          {bestTransfers.levels.map(l => (
+            <div key={l.max_transfers} className="py-2 px-3 rounded-lg bg-ucl-dark/30 border border-ucl-accent/10">
+              <div className="flex items-center justify-between text-xs text-gray-400 mb-1">
+                <span>≤ {l.max_transfers} transfer{l.max_transfers > 1 ? 's' : ''}</span>
+                <span>
+                  <span className="font-bold text-ucl-green">+{l.points_gain}</span>
+                  {l.penalty > 0 && <span className="text-ucl-red"> −{l.penalty}</span>}
+                  <span className="text-gray-600"> · €{l.cost_diff > 0 ? '+' : ''}{l.cost_diff}M</span>
+                </span>
+              </div>
+              {l.moves.length === 0 && <div className="text-xs text-gray-500">No improving transfers</div>}
+              {l.moves.map(m => (
+                <div key={m.out_id} className="flex items-center gap-2 text-sm">
+                  <span className="text-gray-400 flex-1">{m.player_out?.name}</span>
+                  <ArrowLeftRight size={12} className="text-gray-500 shrink-0" />
+                  <span className="text-white flex-1">{m.player_in?.name}</span>
+                  <span className="text-xs text-ucl-green shrink-0">+{m.points_gain}</span>
+                </div>
+              ))}
+              {l.moves.length > 0 && (
+                <button onClick={() => applyMoves(l.moves)}
+                  className="mt-2 px-3 py-1 bg-ucl-accent/20 hover:bg-ucl-accent/30 text-ucl-accent rounded-lg text-xs font-medium transition">
+                  Do it
+                </button>
+              )}
+            </div>
+          ))}
+        </div>
+      )}
+
       {/* Boosters */}
       {boosters && (
         <div className="bg-ucl-blue/20 border border-ucl-accent/10 rounded-xl p-4">
@@ -8,9 +8,19 @@ const confColor = { high: 'text-ucl-green', medium: 'text-yellow-400', low: 'tex
 const riskColor = { low: 'text-ucl-green', medium: 'text-yellow-400', high: 'text-ucl-red' }
 const riskDot = { low: 'bg-ucl-green', medium: 'bg-yellow-400', high: 'bg-ucl-red' }
 
-function PlayerRow({ p, i, expanded, setExpanded, isPast, t }) {
+function PlayerRow({ p, i, expanded, setExpanded, isPast, matchdayId, t }) {
   const isExp = expanded === `${isPast ? 'past' : 'cur'}-${i}`
   const toggleExp = () => setExpanded(isExp ? null : `${isPast ? 'past' : 'cur'}-${i}`)
+  const [reasoning, setReasoning] = useState(null)
+
+  useEffect(() => {
+    if (!isExp || reasoning) return
+    const q = matchdayId ? `?matchday_id=${matchdayId}` : ''
+    fetch(`/api/predictions/${p.player_id}/explain${q}`)
+      .then(r => r.ok ? r.json() : { reasoning: [] })
+      .then(d => setReasoning(d.reasoning))
+      .catch(() => setReasoning([]))
+  }, [isExp])
 
   return (
     <div className="bg-ucl-blue/20 border border-ucl-accent/10 rounded-xl overflow-hidden hover:border-ucl-accent/25 transition">
@@ -54,7 +64,7 @@ function PlayerRow({ p, i, expanded, setExpanded, isPast, t }) {
           <div className="text-gray-400">
             <span className="font-medium text-gray-300">{t('reasoning')}:</span>
             <ul className="list-disc list-inside mt-1 space-y-0.5">
-              {p.reasoning.map((r, j) => <li key={j}>{r}</li>)}
+              {(reasoning || []).map((r, j) => <li key={j}>{r}</li>)}
             </ul>
           </div>
         </div>
@@ -181,7 +191,7 @@ export default function Predictions() {
       {/* Player List */}
       <div className="space-y-1.5">
         {activePreds.map((p, i) => (
-          <PlayerRow key={p.player_id} p={p} i={i} expanded={expanded} setExpanded={setExpanded} isPast={tab === 'past'} t={t} />
+          <PlayerRow key={`${tab}-${p.player_id}`} p={p} i={i} expanded={expanded} setExpanded={setExpanded} isPast={tab === 'past'} matchdayId={tab === 'past' ? pastMd?.id : currentMd?.id} t={t} />
         ))}
       </div>
 
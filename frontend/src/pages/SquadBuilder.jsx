@@ -87,21 +87,38 @@ export default function SquadBuilder() {
     }).catch(() => {})
   }, [])
   const [profile, setProfile] = useState('balanced')
-  const [result, setResult] = useState(null)
+  const [results, setResults] = useState(null) // all risk profiles from one solve
+  const [alternatives, setAlternatives] = useState(null) // K best squads for the selected profile
+  const [altIndex, setAltIndex] = useState(0)
+  const result = alternatives ? alternatives[altIndex] : results ? results[profile] : null
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [showBench, setShowBench] = useState(false)
 
   const build = async () => {
-    setLoading(true); setError(''); setResult(null)
+    setLoading(true); setError(''); setResults(null); setAlternatives(null)
     try {
-      const r = await fetch('/api/optimize', {
+      const r = await fetch('/api/optimize/profiles', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ budget, max_per_club: maxClub, risk_profile: profile })
+        body: JSON.stringify({ budget, max_per_club: maxClub })
       })
       if (!r.ok) { const e = await r.json(); throw new Error(e.detail || 'Error') }
-      setResult(await r.json())
+      setResults((await r.json()).profiles)
+    } catch (e) { setError(e.message) }
+    setLoading(false)
+  }
+
+  const loadAlternatives = async () => {
+    setLoading(true); setError('')
+    try {
+      const r = await fetch('/api/optimize/alternatives', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ budget, max_per_club: maxClub, risk_profile: profile, count: 5, min_difference: 2 })
+      })
+      if (!r.ok) { const e = await r.json(); throw new Error(e.detail || 'Error') }
+      setAlternatives((await r.json()).squads); setAltIndex(0)
     } catch (e) { setError(e.message) }
     setLoading(false)
   }
@@ -125,7 +142,7 @@ export default function SquadBuilder() {
             <label className="text-xs text-gray-400 mb-1 block">{t('riskProfile')}</label>
             <div className="flex rounded-lg overflow-hidden border border-ucl-accent/20">
               {['safe','balanced','aggressive'].map(p => (
-                <button key={p} onClick={() => setProfile(p)}
+                <button key={p} onClick={() => { setProfile(p); setAlternatives(null) }}
                   className={`flex-1 py-2.5 text-xs font-medium transition ${
                     profile === p ? 'bg-ucl-accent text-ucl-dark' : 'bg-ucl-dark text-gray-400 hover:text-white'
                   }`}>
@@ -147,6 +164,23 @@ export default function SquadBuilder() {
 
       {result && (
         <div className="space-y-6">
+          {/* Alternatives: K best distinct squads */}
+          <div className="flex items-center gap-2 flex-wrap">
+            {alternatives ? alternatives.map((a, i) => (
+              <button key={i} onClick={() => setAltIndex(i)}
+                className={`px-3 py-1.5 rounded-lg text-xs font-medium transition ${
+                  i === altIndex ? 'bg-ucl-accent text-ucl-dark' : 'bg-ucl-dark text-gray-400 hover:text-white border border-ucl-accent/20'
+                }`}>
+                #{i + 1} · {a.total_expected}{i > 0 && <span className="opacity-70"> · {a.changes_vs_best}↔</span>}
+              </button>
+            )) : (
+              <button onClick={loadAlternatives} disabled={loading}
+                className="px-3 py-1.5 rounded-lg text-xs font-medium bg-ucl-dark text-gray-400 hover:text-white border border-ucl-accent/20 transition disabled:opacity-50">
+                Alternatives
+              </button>
+            )}
+          </div>
+
           {/* Summary Cards */}
           <div className="grid grid-cols-3 gap-3">
             <div className="bg-ucl-blue/30 border border-ucl-accent/20 rounded-xl px-4 py-3 text-center">